@@ -0,0 +1,101 @@
+###############################################################################
+#  AST memory benchmark                                                       #
+#                                                                             #
+#  Parses a generated program of about a million nodes and shows how much     #
+#  memory the tree keeps alive per node once the tokens are gone, then the     #
+#  size of the same tree stored in an arena.                                  #
+#                                                                             #
+#  $ python benchmarks/bench_ast_memory.py [-n NODES]                         #
+###############################################################################
+import argparse
+import contextlib
+import gc
+import io
+import sys
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+file = Path(__file__).resolve()
+sys.path.append(str(file.parents[1]))
+
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter.ast import *
+from interpreter.arena import Arena
+
+
+FUNCTION = """function f{i}(a, b) {{
+    x = a * {i} + b - (a / 2);
+    if (x < b) {{ y = -x; }} else {{ y = "s"; }}
+    return g(x, 1);
+}}
+"""
+# nodes in the tree of one FUNCTION, NoOps included
+NODES_PER_FUNCTION = 33
+
+
+def children(node: AST) -> list:
+    if isinstance(node, Program):
+        return node.functions + node.statements
+    if isinstance(node, Function):
+        return node.args + node.statements
+    if isinstance(node, (BinOp, Assign)):
+        return [node.left, node.right]
+    if isinstance(node, UnaryOp):
+        return [node.expr]
+    if isinstance(node, ReturnVal):
+        return [node.return_val]
+    if isinstance(node, FunctionCall):
+        return node.args
+    if isinstance(node, IfCondition):
+        return [node.expr, *node.statements] + [node.follow_else] * bool(node.follow_else)
+    if isinstance(node, ElseCondition):
+        return node.statements
+    return []
+
+
+def count_nodes(root: AST) -> int:
+    count, stack = 0, [root]
+    while stack:
+        count += 1
+        stack += children(stack.pop())
+    return count
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Benchmark AST memory use.")
+    argparser.add_argument("-n", "--nodes", type=int, default=1_000_000)
+    args = argparser.parse_args()
+
+    functions = args.nodes // NODES_PER_FUNCTION + 1
+    input = "".join(FUNCTION.format(i=i) for i in range(functions))
+
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+    tokens = Lexer(input).get_tokens()
+    # the parser may print debug output, keep it out of the measure
+    with contextlib.redirect_stdout(io.StringIO()):
+        program = ASTParser(tokens).program()
+    seconds = perf_counter() - start
+    del tokens
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    nodes = count_nodes(program)
+    print(f"nodes               {nodes:10d}")
+    print(f"lex + parse         {seconds:10.2f} s")
+    print(f"retained            {size / 2**20:10.1f} MiB")
+    print(f"per node            {size / nodes:10.1f} bytes")
+
+    arena = Arena.from_ast(program)
+    del program
+    arena_size = len(arena.to_bytes())
+    print(f"arena serialized    {arena_size / 2**20:10.1f} MiB")
+    print(f"arena per node      {arena_size / nodes:10.1f} bytes")
+
+
+if __name__ == "__main__":
+    main()
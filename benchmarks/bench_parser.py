@@ -0,0 +1,68 @@
+###############################################################################
+#  Parser benchmark                                                           #
+#                                                                             #
+#  Parses the same generated program written compactly and with lots of       #
+#  newlines between statements and operators, then compactly with function    #
+#  bodies left for later (lazy) and with the table-driven parser (ll1).       #
+#                                                                             #
+#  $ python benchmarks/bench_parser.py [-n FUNCTIONS] [-r REPEAT]             #
+###############################################################################
+import argparse
+import contextlib
+import io
+import sys
+from pathlib import Path
+from timeit import repeat
+
+file = Path(__file__).resolve()
+sys.path.append(str(file.parents[1]))
+
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter.ll1 import LL1Parser
+
+
+FUNCTION = """function f{i}(a, b) {{
+    x = a * {i} + b - (a / 2);
+    if (x) {{ y = x + 1; }} else {{ y = 2; }}
+    return f{i}(x, y);
+}}
+"""
+
+
+def bench(input: str, repeat_count: int, make_parser=ASTParser) -> float:
+    tokens = Lexer(input).get_tokens()
+
+    def parse():
+        # the parser may print debug output, keep it out of the measure
+        with contextlib.redirect_stdout(io.StringIO()):
+            make_parser(tokens).program()
+
+    return min(repeat(parse, number=1, repeat=repeat_count)), len(tokens)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Benchmark the parser.")
+    argparser.add_argument("-n", "--functions", type=int, default=2000)
+    argparser.add_argument("-r", "--repeat", type=int, default=5)
+    args = argparser.parse_args()
+
+    compact = "".join(FUNCTION.format(i=i) for i in range(args.functions))
+    spaced = (
+        compact.replace(";", ";\n\n\n")
+        .replace("{", "{\n\n\n")
+        .replace(" + ", "\n+\n")
+        .replace(" * ", "\n*\n")
+    )
+    for name, input, make_parser in (
+        ("compact", compact, ASTParser),
+        ("newline-heavy", spaced, ASTParser),
+        ("lazy", compact, lambda tokens: ASTParser(tokens, lazy=True)),
+        ("ll1", compact, LL1Parser),
+    ):
+        seconds, count = bench(input, args.repeat, make_parser)
+        print(f"{name:14} {count:8d} tokens {seconds:8.3f} s {count / seconds:12,.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    main()
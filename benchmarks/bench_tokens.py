@@ -0,0 +1,72 @@
+###############################################################################
+#  Token construction benchmark                                               #
+#                                                                             #
+#  Compares the checked Token() constructor with Token.trusted() and shows    #
+#  how much memory the lexer allocates per token.                             #
+#                                                                             #
+#  $ python benchmarks/bench_tokens.py [-n COUNT]                             #
+###############################################################################
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+from timeit import timeit
+
+file = Path(__file__).resolve()
+sys.path.append(str(file.parents[1]))
+
+from interpreter.tokenizer import Token, TokenTypes as TT
+from interpreter.lexer import Lexer
+
+
+class DictToken:
+    """Same fields as Token but with a per-instance __dict__, for comparison"""
+
+    def __init__(self, type, value=None):
+        self._type = type
+        self._value = value
+
+
+SOURCE = """function f{i}(a, b) {{
+    x{i} = a * {i} + b;
+    if (x{i} <= 42) {{ return x{i} - 1; }}
+    return "done";
+}}
+"""
+
+
+def bench_constructors(count: int):
+    checked = timeit(lambda: Token(TT.ID, "name"), number=count)
+    trusted = timeit(lambda: Token.trusted(TT.ID, "name"), number=count)
+    print(f"Token() checked     {checked / count * 1e9:8.1f} ns/token")
+    print(f"Token.trusted()     {trusted / count * 1e9:8.1f} ns/token")
+    print(f"speedup             {checked / trusted:8.1f}x")
+
+    dict_token = DictToken(TT.ID, "a")
+    dict_size = sys.getsizeof(dict_token) + sys.getsizeof(dict_token.__dict__)
+    print(f"DictToken size      {dict_size:8d} bytes")
+    print(f"Token size          {sys.getsizeof(Token(TT.ID, 'a')):8d} bytes")
+
+
+def bench_lexer(functions: int):
+    input = "".join(SOURCE.format(i=i % 100) for i in range(functions))
+    tracemalloc.start()
+    tokens = Lexer(input).get_tokens()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"lexer               {len(tokens):8d} tokens")
+    print(f"lexer allocations   {peak / len(tokens):8.1f} bytes/token (peak)")
+    print(f"distinct tokens     {len(set(map(id, tokens))):8d}")
+
+
+def main():
+    argparser = argparse.ArgumentParser(description="Benchmark token construction.")
+    argparser.add_argument("-n", "--count", type=int, default=1_000_000)
+    args = argparser.parse_args()
+
+    bench_constructors(args.count)
+    bench_lexer(args.count // 100)
+
+
+if __name__ == "__main__":
+    main()
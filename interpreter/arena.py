@@ -0,0 +1,453 @@
+import marshal
+from array import array
+from enum import IntEnum
+from sys import byteorder
+from typing import Dict, List, Optional, Union
+from interpreter.tokenizer import Token, TokenTypes
+from interpreter.token_buffer import token_kinds, token_kind_index, _U32
+from interpreter.exceptions import InterpreterError
+from interpreter.ast import (
+    AST,
+    Program,
+    Num,
+    Var,
+    BinOp,
+    UnaryOp,
+    NoOp,
+    Assign,
+    Function,
+    FunctionCall,
+    ReturnVal,
+    String,
+    IfCondition,
+    ElseCondition,
+)
+
+
+class NodeKind(IntEnum):
+    """
+    Kind of an arena row and what its operand1, operand2 and literal columns hold
+    """
+
+    NUM = 0  # literal: the integer
+    STRING = 1  # literal: the string
+    VAR = 2  # literal: the name
+    BINOP = 3  # operand1: left, operand2: right, literal: operator token type
+    UNARYOP = 4  # operand1: operand, literal: operator token type
+    ASSIGN = 5  # operand1: VAR node, operand2: value
+    NOOP = 6
+    RETURN = 7  # operand1: value
+    CALL = 8  # operand1: BLOCK of arguments, literal: function name
+    IF = 9  # operand1: condition, operand2: BLOCK, literal: ELSE node + 1 or 0
+    ELSE = 10  # operand1: BLOCK
+    FUNCTION = 11  # operand1: BLOCK of arguments, operand2: BLOCK, literal: name
+    PROGRAM = 12  # operand1: BLOCK of functions, operand2: BLOCK of statements
+    BLOCK = 13  # operand1: first index in children, operand2: how many
+
+
+_MAGIC = b"ARN1"
+_HEADER_SIZE = 24
+_BYTEORDER = {"little": 0, "big": 1}
+
+
+class Arena:
+    """
+    AST stored as rows of parallel columns, children are referred to by row
+    index and lists of children are runs of the children column. Rows are
+    appended children first, the last one is the root.
+    Token types of operators are stored as their index in token_kinds, values
+    as their index in a table of literals holding each one once
+    """
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.operand1 = array(_U32)
+        self.operand2 = array(_U32)
+        self.literal = array(_U32)
+        self.children = array(_U32)
+        self.literals: List[Union[int, str]] = []
+        self._literal_index: Dict[Union[int, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def root(self) -> int:
+        return len(self.kinds) - 1
+
+    def _literal(self, value: Union[int, str]) -> int:
+        # True == 1 would share an entry with 1, keep types apart
+        key = (type(value), value)
+        index = self._literal_index.get(key)
+        if index is None:
+            index = self._literal_index[key] = len(self.literals)
+            self.literals.append(value)
+        return index
+
+    def add(
+        self, kind: NodeKind, operand1: int = 0, operand2: int = 0, literal: int = 0
+    ) -> int:
+        self.kinds.append(kind)
+        self.operand1.append(operand1)
+        self.operand2.append(operand2)
+        self.literal.append(literal)
+        return len(self.kinds) - 1
+
+    def add_block(self, nodes: List[int]) -> int:
+        start = len(self.children)
+        self.children.extend(nodes)
+        return self.add(NodeKind.BLOCK, start, len(nodes))
+
+    def block(self, index: int) -> array:
+        start = self.operand1[index]
+        return self.children[start : start + self.operand2[index]]
+
+    @classmethod
+    def from_ast(cls, root: AST) -> "Arena":
+        """
+        Rows for the tree under root, without recursion
+        """
+        arena = cls()
+        # (node, True) once its children have been added and their rows are on rows
+        stack, rows = [(root, False)], []
+        while stack:
+            node, ready = stack.pop()
+            if not ready:
+                stack.append((node, True))
+                stack += ((child, False) for child in reversed(_children(node)))
+                continue
+            count = len(_children(node))
+            nodes = rows[len(rows) - count :]
+            del rows[len(rows) - count :]
+            rows.append(arena._add_node(node, nodes))
+        return arena
+
+    def _add_node(self, node: AST, nodes: List[int]) -> int:
+        node_type = type(node)
+        if node_type is Num:
+            return self.add(NodeKind.NUM, literal=self._literal(node.value))
+        if node_type is String:
+            return self.add(NodeKind.STRING, literal=self._literal(node.value))
+        if node_type is Var:
+            return self.add(NodeKind.VAR, literal=self._literal(node.value))
+        if node_type is BinOp:
+            op = token_kind_index[node.op_type]
+            return self.add(NodeKind.BINOP, nodes[0], nodes[1], op)
+        if node_type is UnaryOp:
+            op = token_kind_index[node.op_type]
+            return self.add(NodeKind.UNARYOP, nodes[0], 0, op)
+        if node_type is Assign:
+            return self.add(NodeKind.ASSIGN, nodes[0], nodes[1])
+        if node_type is NoOp:
+            return self.add(NodeKind.NOOP)
+        if node_type is ReturnVal:
+            return self.add(NodeKind.RETURN, nodes[0])
+        if node_type is FunctionCall:
+            args = self.add_block(nodes)
+            return self.add(NodeKind.CALL, args, 0, self._literal(node.name))
+        if node_type is IfCondition:
+            count = len(node.statements)
+            body = self.add_block(nodes[1 : 1 + count])
+            follow_else = nodes[1 + count] + 1 if node.follow_else is not None else 0
+            return self.add(NodeKind.IF, nodes[0], body, follow_else)
+        if node_type is ElseCondition:
+            return self.add(NodeKind.ELSE, self.add_block(nodes))
+        if isinstance(node, Function):
+            count = len(node.args)
+            args = self.add_block(nodes[:count])
+            body = self.add_block(nodes[count:])
+            return self.add(NodeKind.FUNCTION, args, body, self._literal(node.name))
+        if node_type is Program:
+            count = len(node.functions)
+            functions = self.add_block(nodes[:count])
+            statements = self.add_block(nodes[count:])
+            return self.add(NodeKind.PROGRAM, functions, statements)
+        raise TypeError(f"unknown node type {node_type.__name__}")
+
+    def to_ast(self, index: Optional[int] = None) -> AST:
+        """
+        Tree of ast.py nodes for the row at index, the root by default
+        """
+        index = self.root if index is None else index
+        nodes: Dict[int, AST] = {}
+        stack = [(index, False)]
+        while stack:
+            row, ready = stack.pop()
+            if not ready:
+                stack.append((row, True))
+                stack += ((child, False) for child in self._row_children(row))
+                continue
+            nodes[row] = self._make_node(row, nodes)
+        return nodes[index]
+
+    def _row_children(self, row: int) -> List[int]:
+        kind = self.kinds[row]
+        if kind in (NodeKind.BINOP, NodeKind.ASSIGN):
+            return [self.operand1[row], self.operand2[row]]
+        if kind in (NodeKind.UNARYOP, NodeKind.RETURN):
+            return [self.operand1[row]]
+        if kind in (NodeKind.CALL, NodeKind.ELSE):
+            return list(self.block(self.operand1[row]))
+        if kind == NodeKind.IF:
+            children = [self.operand1[row], *self.block(self.operand2[row])]
+            if self.literal[row]:
+                children.append(self.literal[row] - 1)
+            return children
+        if kind in (NodeKind.FUNCTION, NodeKind.PROGRAM):
+            return [*self.block(self.operand1[row]), *self.block(self.operand2[row])]
+        return []
+
+    def _make_node(self, row: int, nodes: Dict[int, AST]) -> AST:
+        kind, literal = self.kinds[row], self.literal[row]
+        operand1, operand2 = self.operand1[row], self.operand2[row]
+        if kind == NodeKind.NUM:
+            return Num(Token.trusted(TokenTypes.INTEGER, self.literals[literal]))
+        if kind == NodeKind.STRING:
+            return String(Token.trusted(TokenTypes.STRING, self.literals[literal]))
+        if kind == NodeKind.VAR:
+            return Var(Token.trusted(TokenTypes.ID, self.literals[literal]))
+        if kind == NodeKind.BINOP:
+            op = Token(token_kinds[literal])
+            return BinOp(op, nodes.pop(operand1), nodes.pop(operand2))
+        if kind == NodeKind.UNARYOP:
+            return UnaryOp(Token(token_kinds[literal]), nodes.pop(operand1))
+        if kind == NodeKind.ASSIGN:
+            op = Token(TokenTypes.ASSIGN)
+            return Assign(op, nodes.pop(operand1), nodes.pop(operand2))
+        if kind == NodeKind.NOOP:
+            return NoOp()
+        if kind == NodeKind.RETURN:
+            return ReturnVal(nodes.pop(operand1))
+        if kind == NodeKind.CALL:
+            name = Token.trusted(TokenTypes.ID, self.literals[literal])
+            return FunctionCall(name, self._pop_block(operand1, nodes))
+        if kind == NodeKind.IF:
+            expr = nodes.pop(operand1)
+            statements = self._pop_block(operand2, nodes)
+            follow_else = nodes.pop(literal - 1) if literal else None
+            return IfCondition(expr, statements, follow_else)
+        if kind == NodeKind.ELSE:
+            return ElseCondition(self._pop_block(operand1, nodes))
+        if kind == NodeKind.FUNCTION:
+            name = Token.trusted(TokenTypes.ID, self.literals[literal])
+            args = self._pop_block(operand1, nodes)
+            return Function(name, args, self._pop_block(operand2, nodes))
+        if kind == NodeKind.PROGRAM:
+            functions = self._pop_block(operand1, nodes)
+            return Program(functions, self._pop_block(operand2, nodes))
+        raise ValueError(f"row {row} of kind {NodeKind(kind).name} is not a node")
+
+    def _pop_block(self, block: int, nodes: Dict[int, AST]) -> List[AST]:
+        return [nodes.pop(child) for child in self.block(block)]
+
+    def to_bytes(self) -> bytes:
+        """
+        Header, then the columns as raw machine words, then the marshalled literals
+        """
+        return b"".join(
+            (
+                _MAGIC,
+                bytes([_BYTEORDER[byteorder], 0, 0, 0]),
+                len(self.kinds).to_bytes(8, "little"),
+                len(self.children).to_bytes(8, "little"),
+                bytes(self.operand1),
+                bytes(self.operand2),
+                bytes(self.literal),
+                bytes(self.children),
+                bytes(self.kinds),
+                marshal.dumps(self.literals),
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, memoryview]) -> "Arena":
+        """
+        Rebuild an arena from to_bytes() output, the columns are views on data
+        unless it was written with another byte order
+        """
+        data = memoryview(data)
+        if len(data) < _HEADER_SIZE or bytes(data[:4]) != _MAGIC:
+            raise ValueError("not a serialized arena")
+        count = int.from_bytes(data[8:16], "little")
+        children = int.from_bytes(data[16:24], "little")
+        pos, columns = _HEADER_SIZE, []
+        for size in (count, count, count, children):
+            columns.append(data[pos : pos + 4 * size])
+            pos += 4 * size
+
+        arena = cls.__new__(cls)
+        if data[4] == _BYTEORDER[byteorder]:
+            columns = [column.cast(_U32) for column in columns]
+        else:
+            for index, raw in enumerate(columns):
+                columns[index] = array(_U32)
+                columns[index].frombytes(raw)
+                columns[index].byteswap()
+        arena.operand1, arena.operand2, arena.literal, arena.children = columns
+        arena.kinds = data[pos : pos + count]
+        arena.literals = marshal.loads(data[pos + count :])
+        arena._literal_index = {
+            (type(value), value): index for index, value in enumerate(arena.literals)
+        }
+        return arena
+
+    def __str__(self) -> str:
+        return f"{Arena.__name__}({len(self)} nodes, {len(self.literals)} literals)"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+def _children(node: AST) -> List[AST]:
+    node_type = type(node)
+    if node_type in (BinOp, Assign):
+        return [node.left, node.right]
+    if node_type is UnaryOp:
+        return [node.expr]
+    if node_type is ReturnVal:
+        return [node.return_val]
+    if node_type is FunctionCall:
+        return node.args
+    if node_type is IfCondition:
+        follow_else = [node.follow_else] if node.follow_else is not None else []
+        return [node.expr, *node.statements, *follow_else]
+    if node_type is ElseCondition:
+        return node.statements
+    if isinstance(node, Function):
+        return [*node.args, *node.statements]
+    if node_type is Program:
+        return [*node.functions, *node.statements]
+    return []
+
+
+class _Return(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+class ArenaEvaluator:
+    """
+    Runs a program straight from its arena rows, with the semantics of
+    ASTVisitor: global statements first, then main()
+    """
+
+    def __init__(self, arena: Arena):
+        self._arena = arena
+        self._globals: dict = {}
+        self._functions: Dict[str, int] = {}
+        self._call_stack: List[dict] = []
+        self._binary = {
+            token_kind_index[TokenTypes.PLUS]: lambda a, b: a + b,
+            token_kind_index[TokenTypes.MINUS]: lambda a, b: a - b,
+            token_kind_index[TokenTypes.MUL]: lambda a, b: a * b,
+            token_kind_index[TokenTypes.DIV]: lambda a, b: a / b,
+            token_kind_index[TokenTypes.EQ]: lambda a, b: int(a == b),
+            token_kind_index[TokenTypes.LT]: lambda a, b: int(a < b),
+            token_kind_index[TokenTypes.LE]: lambda a, b: int(a <= b),
+            token_kind_index[TokenTypes.GT]: lambda a, b: int(a > b),
+            token_kind_index[TokenTypes.GE]: lambda a, b: int(a >= b),
+        }
+        self._minus = token_kind_index[TokenTypes.MINUS]
+
+    @property
+    def globals(self):
+        return self._globals
+
+    @property
+    def scope(self):
+        return self._call_stack[-1] if self._call_stack else self._globals
+
+    def run(self, program: Optional[int] = None) -> None:
+        arena = self._arena
+        program = arena.root if program is None else program
+        if arena.kinds[program] != NodeKind.PROGRAM:
+            raise InterpreterError("root of the arena is not a program")
+        for function in arena.block(arena.operand1[program]):
+            name = arena.literals[arena.literal[function]]
+            if name in self._functions:
+                raise InterpreterError(f"duplicate function name {name}")
+            self._functions[name] = function
+        if "main" not in self._functions:
+            raise InterpreterError("main function not found")
+
+        self._call_stack.append(self._globals)
+        try:
+            for stmt in arena.block(arena.operand2[program]):
+                if arena.kinds[stmt] == NodeKind.CALL:
+                    raise InterpreterError("no function call allowed in global scope")
+                self.execute(stmt)
+        finally:
+            self._call_stack.pop()
+        self.call(self._functions["main"], [])
+
+    def call(self, function: int, args: list):
+        arena = self._arena
+        params = arena.block(arena.operand1[function])
+        names = [arena.literals[arena.literal[param]] for param in params]
+        frame = dict(zip(names, args))
+        self._call_stack.append(frame)
+        try:
+            for stmt in arena.block(arena.operand2[function]):
+                self.execute(stmt)
+        except _Return as ret:
+            return ret.value
+        finally:
+            self._call_stack.pop()
+        return None
+
+    def execute(self, index: int) -> None:
+        arena = self._arena
+        kind = arena.kinds[index]
+        if kind == NodeKind.ASSIGN:
+            name = arena.literals[arena.literal[arena.operand1[index]]]
+            scope = self._globals if name in self._globals else self.scope
+            scope[name] = self.evaluate(arena.operand2[index])
+        elif kind == NodeKind.CALL:
+            self.evaluate(index)
+        elif kind == NodeKind.RETURN:
+            raise _Return(self.evaluate(arena.operand1[index]))
+        elif kind == NodeKind.IF:
+            if self.evaluate(arena.operand1[index]):
+                block = arena.operand2[index]
+            elif arena.literal[index]:
+                block = arena.operand1[arena.literal[index] - 1]
+            else:
+                return
+            for stmt in arena.block(block):
+                self.execute(stmt)
+
+    def evaluate(self, index: int):
+        arena = self._arena
+        kind = arena.kinds[index]
+        if kind == NodeKind.NUM or kind == NodeKind.STRING:
+            return arena.literals[arena.literal[index]]
+        if kind == NodeKind.VAR:
+            return self._resolve(arena.literals[arena.literal[index]])
+        if kind == NodeKind.BINOP:
+            left = self.evaluate(arena.operand1[index])
+            right = self.evaluate(arena.operand2[index])
+            return self._binary[arena.literal[index]](left, right)
+        if kind == NodeKind.UNARYOP:
+            value = self.evaluate(arena.operand1[index])
+            return -value if arena.literal[index] == self._minus else +value
+        if kind == NodeKind.CALL:
+            name = arena.literals[arena.literal[index]]
+            args = [self.evaluate(arg) for arg in arena.block(arena.operand1[index])]
+            if name == "print":
+                for arg in args:
+                    print(arg, end=" ")
+                return None
+            if name not in self._functions:
+                raise InterpreterError(f"no such function {name}")
+            return self.call(self._functions[name], args)
+        raise InterpreterError(
+            f"row {index} of kind {NodeKind(kind).name} has no value"
+        )
+
+    def _resolve(self, name: str):
+        scope = self.scope
+        if name in scope:
+            return scope[name]
+        if name in self._globals:
+            return self._globals[name]
+        raise InterpreterError(f"no such variable {name}")
@@ -1,39 +1,124 @@
-from typing import Union, Type, List
+from typing import Union, Type, List, Optional
 from abc import ABC, abstractmethod
-from interpreter.tokenizer import Token, TokenTypes
+from interpreter.tokenizer import Token, TokenTypes, valueless_tokens
 
 
-# TODO: don't do shit with tokens.. no useless token.. token is only useful if it is useful
-# lapalisse si c'est rugueux c'est pas lisse
+# Version of the node classes' layout, part of the key of the pickled programs
+# cached by cache.ProgramCache: bump it whenever the fields or __slots__ of a node
+# class change
+AST_FORMAT = 3
+
+# Nodes keep the values and operator types of their tokens in __slots__, the
+# tokens they were built from are rebuilt on demand by their token properties
 
 
 class AST(object):
+    # _hash is only set on nodes shared by a hashcons.NodeFactory, which must not
+    # be modified
+    __slots__ = ("_hash",)
+    # what equality and hashing look at, child nodes and lists of them included
+    _fields = ()
+
     def __str__(self):
         return f"AST()"
 
     def __repr__(self):
         return str(self)
 
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(self) != type(other):
+            return False
+        self_hash = getattr(self, "_hash", None)
+        other_hash = getattr(other, "_hash", None)
+        if self_hash is not None and other_hash is not None and self_hash != other_hash:
+            return False
+        for field in self._fields:
+            mine, theirs = getattr(self, field), getattr(other, field)
+            # 1 and 1.0 are different literals
+            if mine != theirs or type(mine) is not type(theirs):
+                return False
+        return True
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            return structural_hash(self)
+
+
+def is_node(value) -> bool:
+    return isinstance(value, (AST, NoOp))
+
+
+def child_nodes(node: AST) -> list:
+    children = []
+    for field in node._fields:
+        value = getattr(node, field)
+        if type(value) is list:
+            children += value
+        elif is_node(value):
+            children.append(value)
+    return children
+
+
+def node_hash(node: AST, child_hash=hash) -> int:
+    """
+    Hash of node from the hashes of its children as given by child_hash
+    """
+    key = [type(node)]
+    for field in node._fields:
+        value = getattr(node, field)
+        if type(value) is list:
+            key.append(tuple(child_hash(item) for item in value))
+        elif is_node(value):
+            key.append(child_hash(value))
+        else:
+            key.append(value)
+    return hash(tuple(key))
+
+
+def structural_hash(root: AST) -> int:
+    """
+    Hash of the tree under root, equal trees hash the same. Without recursion,
+    the hashes cached on shared subtrees are reused
+    """
+    hashes = {}
+    stack = [(root, False)]
+    while stack:
+        node, ready = stack.pop()
+        cached = getattr(node, "_hash", None)
+        if cached is not None:
+            hashes[id(node)] = cached
+        elif ready:
+            hashes[id(node)] = node_hash(node, lambda child: hashes[id(child)])
+        else:
+            stack.append((node, True))
+            stack += ((child, False) for child in child_nodes(node))
+    return hashes[id(root)]
+
 
 class Num(AST):
+    __slots__ = ("value",)
+    _fields = ("value",)
+
     def __init__(self, integer: Token):
         if integer.type not in (TokenTypes.INTEGER,):
             raise TypeError(f"invalid token type {integer.type} for {Num.__name__}")
-        super().__init__()
-        self._token = self._integer = integer
+        self.value: int = integer.value
 
     @property
     def integer(self):
-        return self._id
+        return Token.trusted(TokenTypes.INTEGER, self.value)
 
     @integer.setter
-    def id(self, new_integer):
-        self._id = new_integer
-        self._token = new_integer
+    def integer(self, new_integer):
+        self.value = new_integer.value
 
     @property
     def token(self):
-        return self._token
+        return self.integer
 
     def __str__(self):
         return f"{Num.__name__}({self.token})"
@@ -41,114 +126,100 @@ class Num(AST):
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        if type(self) != type(other):
-            return False
-        if self.token != other.token:
-            return False
-        return True
-
 
 class String(AST):
+    __slots__ = ("value",)
+    _fields = ("value",)
+
     def __init__(self, string: Token):
         if string.type != TokenTypes.STRING:
             raise TypeError(f"invalid token type {string.type} for {Num.__name__}")
-        super().__init__()
-        self._token = self._string = string
+        self.value: str = string.value
 
     @property
     def string(self):
-        return self._string
+        return Token.trusted(TokenTypes.STRING, self.value)
 
     @string.setter
     def string(self, new_string):
-        self._string = new_string
-        self._token = new_string
+        self.value = new_string.value
 
     @property
     def token(self):
-        return self._token
+        return self.string
 
     def __str__(self):
-        return f"{String.__name__}({self._string})"
+        return f"{String.__name__}({self.string})"
 
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        if type(self) != type(other):
-            return False
-        if self._token != other.token:
-            return False
-        return True
-
 
 class BinOp(AST):
+    __slots__ = ("op_type", "left", "right")
+    _fields = ("op_type", "left", "right")
+
     def __init__(self, op: Token, left: AST, right: AST):
         if op.type not in (
             TokenTypes.PLUS,
             TokenTypes.MINUS,
             TokenTypes.MUL,
             TokenTypes.DIV,
+            TokenTypes.EQ,
+            TokenTypes.LT,
+            TokenTypes.LE,
+            TokenTypes.GT,
+            TokenTypes.GE,
         ):
             raise TypeError(f"invalid token type {op.type} for {BinOp.__name__}")
         # ADD += and so on
-        super().__init__()
-        self._token = self._op = op
+        self.op_type: TokenTypes = op.type
         self.left, self.right = left, right
 
     @property
     def op(self):
-        return self._op
+        return valueless_tokens[self.op_type]
 
     @op.setter
     def op(self, new_op):
-        self._op = new_op
-        self._token = new_op
+        self.op_type = new_op.type
 
     @property
     def token(self):
-        return self._token
+        return self.op
 
-    # ADD SETTER AND GETTER
+    _op = _token = token
 
     def __str__(self):
-        return f"{BinOp.__name__}({self._token}, {self.left}, {self.right})"
+        return f"{BinOp.__name__}({self.op}, {self.left}, {self.right})"
 
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        if type(self) != type(other):
-            return False
-        if (self._token, self.left, self.right) != (
-            other.token,
-            other.left,
-            other.right,
-        ):
-            return False
-        return True
-
 
 class UnaryOp(AST):
+    __slots__ = ("op_type", "expr")
+    _fields = ("op_type", "expr")
+
     def __init__(self, op: Token, expr: AST):
         if op.type not in (TokenTypes.PLUS, TokenTypes.MINUS):
             raise TypeError(f"invalid token type {op.type} for {UnaryOp.__name__}")
-        super().__init__()
-        self._token = self._op = op
+        self.op_type: TokenTypes = op.type
         self.expr = expr
 
     @property
     def op(self):
-        return self._op
+        return valueless_tokens[self.op_type]
 
     @op.setter
-    def op(self, new_string):
-        self._op = self._token = new_string
+    def op(self, new_op):
+        self.op_type = new_op.type
 
     @property
     def token(self):
-        return self._token
+        return self.op
+
+    _op = _token = token
 
     def __str__(self):
         return f"{UnaryOp.__name__}({self.token}, {self.expr})"
@@ -156,109 +227,91 @@ class UnaryOp(AST):
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        if type(self) != type(other):
-            return False
-        if (self.token, self.expr) != (other.token, other.expr):
-            return False
-        return True
-
 
 class Var(AST):
+    # slot is where a resolver.ScopeResolver found the variable lives at run time
+    __slots__ = ("value", "slot")
+    _fields = ("value",)
+
     def __init__(self, id: Token):
         if id.type not in (TokenTypes.ID,):
             raise TypeError(f"invalid token type {id.type} for {Var.__name__}")
-        super().__init__()
-        self._id = self._token = id
+        self.value: str = id.value
+        self.slot: Optional[int] = None
 
     @property
     def id(self):
-        return self._id
+        return Token.trusted(TokenTypes.ID, self.value)
 
     @id.setter
     def id(self, new_id):
-        self._id = new_id
-        self._token = new_id
-
-    @property
-    def token(self):
-        return self._token
+        self.value = new_id.value
 
-    @token.setter
-    def token(self, new_id):
-        self._id = self._token = new_id
-
-    @property
-    def value(self):
-        return self._id.value
+    token = id
 
     def __str__(self):
-        return f"{Var.__name__}({self._id})"
+        return f"{Var.__name__}({self.id})"
 
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        if type(self) != type(other):
-            return False
-        if (self._id, self.value) != (other.id, other.value):
-            return False
-        return True
-
 
 class Assign(AST):
+    __slots__ = ("left", "right")
+    _fields = ("left", "right")
+
     def __init__(self, token: Token, left: Var, right: AST):
-        super().__init__()
-        self.token = token
         self.left, self.right = left, right
 
+    @property
+    def token(self):
+        return valueless_tokens[TokenTypes.ASSIGN]
+
     def __str__(self):
         return f"{Assign.__name__}({self.token}, {self.left}, {self.right})"
 
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        if type(self) != type(other):
-            return False
-        if (self.token, self.left, self.right) != (
-            other.token,
-            other.left,
-            other.right,
-        ):
-            return False
-        return True
-
 
 class NoOp:
+    __slots__ = ()
+    _fields = ()
+
     def __str__(self):
         return f"{NoOp.__name__}()"
 
     def __repr__(self):
         return str(self)
 
+    def __eq__(self, other):
+        return type(self) == type(other)
+
+    def __hash__(self):
+        return node_hash(self)
+
 
 class Function(AST):
+    __slots__ = ("name", "args", "statements", "locals")
+    _fields = ("name", "args", "statements")
+
     def __init__(self, id: Token, args: List[Var], statements: List[AST]):
         if id.type not in (TokenTypes.ID,):
             raise
-        super().__init__()
-        self._id = self._token = id
+        self.name: str = id.value
         self.args: List[Var] = args or []
         self.statements: List[AST] = statements
         self.locals = {}
 
     @property
     def id(self):
-        return self._id
+        return Token.trusted(TokenTypes.ID, self.name)
 
     @id.setter
-    def id(self, new_string):
-        self._id = self._token = new_string
+    def id(self, new_id):
+        self.name = new_id.value
 
-    @property
-    def token(self):
-        return self._token
+    token = id
 
     def __str__(self):
         return f"{Function.__name__}({self.id}, {self.args}, {self.statements})"
@@ -267,62 +320,59 @@ class Function(AST):
         return str(self)
 
     def __eq__(self, other):
-        if type(self) != type(other):
-            return False
-        if (self.token, self.args, self.statements, self.locals) != (
-            other.token,
-            other.args,
-            other.statements,
-            other.locals,
-        ):
-            return False
-        return True
+        return AST.__eq__(self, other) and self.locals == other.locals
 
+    __hash__ = AST.__hash__
 
-class ReturnVal(AST):
-    def __init__(self, return_val: AST):
-        super().__init__()
-        self._return_val = self._token = return_val
 
-    # FIXME: what is the use for those getters/setters???
-    @property
-    def return_val(self):
-        return self._return_val
+class ReturnVal(AST):
+    __slots__ = ("return_val",)
+    _fields = ("return_val",)
 
-    @return_val.setter
-    def return_val(self, new_return_val):
-        self._return_val = new_return_val
-        self._token = new_return_val
+    def __init__(self, return_val: AST):
+        self.return_val = return_val
 
     @property
     def token(self):
-        return self._token
+        return self.return_val
 
     @token.setter
     def token(self, new_return_val):
-        self._return_val = self._token = new_return_val
+        self.return_val = new_return_val
+
+    _return_val = _token = token
 
     def __repr__(self):
-        return f"{ReturnVal.__name__}({self._return_val})"
+        return f"{ReturnVal.__name__}({self.return_val})"
 
 
 class FunctionCall(AST):
+    __slots__ = ("name", "args")
+    _fields = ("name", "args")
+
     def __init__(self, func_id: Token, args: List[Union[Var, Num]]):
-        super().__init__()
-        self.func = func_id
+        self.name: str = func_id.value
         self.args = args
 
     @property
-    def token(self):
-        return self.func
+    def func(self):
+        return Token.trusted(TokenTypes.ID, self.name)
+
+    @func.setter
+    def func(self, new_func):
+        self.name = new_func.value
+
+    token = func
 
     def __repr__(self):
         return f"{FunctionCall.__name__}({self.func}, {self.args})"
 
 
 class Program(AST):
+    __slots__ = ("functions", "statements")
+    _fields = ("functions", "statements")
+
     def __init__(self, functions: List[Function], statements: List[AST]):
-        super().__init__()
         self.functions = functions
         self.statements = statements
 
@@ -332,37 +382,29 @@ class Program(AST):
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        if type(self) != type(other):
-            return False
-        if self.main_compound != other.main_compound:
-            return False
-        return True
-
 
 # TODO: class else if
 class ElseCondition(AST):
+    __slots__ = ("statements",)
+    _fields = ("statements",)
+
     def __init__(self, statements: List[Var]):
         self.statements = statements
 
     def __str__(self):
-        return f"{ElseCondition.__name__}({self.expr}, {self.statements})"
+        return f"{ElseCondition.__name__}({self.statements})"
 
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        return type(self) == type(other) and (self.expr, self.statements) == (
-            other.expr,
-            other.statements,
-        )
-
 
 class IfCondition(AST):
+    __slots__ = ("expr", "statements", "follow_else")
+    _fields = ("expr", "statements", "follow_else")
+
     def __init__(
         self, expr: AST, statements: List[AST], follow_else: ElseCondition | None
     ):
-        super().__init__()
         self.expr = expr
         self.statements = statements
         self.follow_else = follow_else
@@ -373,9 +415,3 @@ class IfCondition(AST):
     def __repr__(self):
         return str(self)
 
-    def __eq__(self, other):
-        return type(self) == type(other) and (self.expr, self.statements, self.follow_else) == (
-            other.expr,
-            other.statements,
-            other.follow_else
-        )
\ No newline at end of file
@@ -0,0 +1,124 @@
+import os
+import pickle
+import sys
+import tempfile
+from hashlib import blake2b, sha256
+from pathlib import Path
+from typing import Optional, Union
+from interpreter import __version__
+from interpreter.ast import AST_FORMAT, Program
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+
+
+# entries written by another interpreter, AST layout or python version are never
+# looked up
+CACHE_TAG = f"ajeanc-{__version__}-ast{AST_FORMAT}-{sys.implementation.cache_tag}"
+
+_MAGIC = b"AJCC"
+_SUFFIX = ".ajc"
+_DIGEST_SIZE = 16
+
+
+class ProgramCache:
+    """
+    Directory of parsed programs keyed by the hash of their source, like
+    __pycache__. Entries are written atomically, checked when read and the least
+    recently used ones are evicted once the directory grows past max_size bytes.
+    The check only catches corrupted entries: they are unpickled, so whoever can
+    write to the directory can run code, it must be trusted like the sources
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], max_size: int = 64 << 20):
+        self._directory = Path(directory)
+        self._max_size = max_size
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    def _path(self, source: str) -> Path:
+        data = source.encode("utf-8", "surrogatepass")
+        key = sha256(CACHE_TAG.encode() + b"\0" + data).hexdigest()
+        return self._directory / (key + _SUFFIX)
+
+    def get(self, source: str) -> Optional[Program]:
+        path = self._path(source)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        program = self._load(data)
+        if program is None:
+            path.unlink(missing_ok=True)
+            return None
+        # the modification time is what eviction orders entries by
+        os.utime(path)
+        return program
+
+    def _load(self, data: bytes) -> Optional[Program]:
+        header = _MAGIC + CACHE_TAG.encode()
+        if not data.startswith(header):
+            return None
+        digest = data[len(header) : len(header) + _DIGEST_SIZE]
+        payload = data[len(header) + _DIGEST_SIZE :]
+        if blake2b(payload, digest_size=_DIGEST_SIZE).digest() != digest:
+            return None
+        try:
+            program = pickle.loads(payload)
+        except Exception:
+            return None
+        return program if isinstance(program, Program) else None
+
+    def put(self, source: str, program: Program) -> bool:
+        """
+        Store program for source, return False if it can't be serialized (the
+        bodies of lazy functions parsed from a TokenBuffer are memoryviews)
+        """
+        try:
+            payload = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+        except (RecursionError, TypeError, pickle.PicklingError):
+            return False
+        digest = blake2b(payload, digest_size=_DIGEST_SIZE).digest()
+
+        self._directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(_MAGIC + CACHE_TAG.encode() + digest)
+                file.write(payload)
+            os.replace(tmp_path, self._path(source))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict()
+        return True
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self._directory.glob("*" + _SUFFIX):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self._max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for path in self._directory.glob("*" + _SUFFIX):
+            path.unlink(missing_ok=True)
+
+    def load(self, source: str) -> Program:
+        """
+        Program for source, only lexed and parsed when it isn't cached yet
+        """
+        program = self.get(source)
+        if program is None:
+            program = ASTParser(Lexer(source).get_tokens()).program()
+            self.put(source, program)
+        return program
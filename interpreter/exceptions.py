@@ -9,6 +9,11 @@ class ParserError(Exception):
         self.message = f"Parser error: {msg}"
 
 
+class GrammarError(Exception):
+    def __init__(self, msg):
+        self.message = f"Grammar error: {msg}"
+
+
 class InterpreterError(Exception):
     def __init__(self, msg):
         self.message = f"Interpreter error: {msg}"
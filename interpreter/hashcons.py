@@ -0,0 +1,82 @@
+import copy
+from typing import Dict, Type
+from interpreter.ast import AST, NoOp, Function, Program, is_node, node_hash
+
+
+class NodeFactory:
+    """
+    Hash-consing factory: nodes are built once per structure and shared, so
+    equal subtrees are the same object. Shared nodes carry their structural
+    hash, which makes hashing them and comparing them O(1). They must not be
+    modified after they are built.
+    Functions and programs are never shared, their children are
+    """
+
+    _unshared = (Function, Program)
+
+    def __init__(self):
+        self._nodes: Dict[tuple, AST] = {}
+        self._noop = NoOp()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __call__(self, cls: Type[AST], *args) -> AST:
+        """
+        cls(*args), or the node already built with the same structure. Child nodes
+        in args must come from this factory
+        """
+        return self._share(cls(*args))
+
+    def _share(self, node: AST) -> AST:
+        if type(node) is NoOp:
+            return self._noop
+        if isinstance(node, self._unshared):
+            return node
+        key = [type(node)]
+        for field in node._fields:
+            value = getattr(node, field)
+            if type(value) is list:
+                value = tuple(value)
+            elif not is_node(value):
+                # 1 and 1.0 are different literals
+                value = (type(value), value)
+            key.append(value)
+        key = tuple(key)
+        shared = self._nodes.get(key)
+        if shared is None:
+            node._hash = node_hash(node)
+            shared = self._nodes[key] = node
+        return shared
+
+    def intern(self, root: AST) -> AST:
+        """
+        Tree equal to the one under root, built from shared nodes. The nodes of
+        root are left as they are
+        """
+        shared = {}
+        stack = [(root, False)]
+        while stack:
+            node, ready = stack.pop()
+            if id(node) in shared:
+                continue
+            if not ready:
+                stack.append((node, True))
+                for field in node._fields:
+                    value = getattr(node, field)
+                    if type(value) is list:
+                        stack += ((item, False) for item in value)
+                    elif is_node(value):
+                        stack.append((value, False))
+                continue
+            node_copy = copy.copy(node)
+            for field in node._fields:
+                value = getattr(node, field)
+                if type(value) is list:
+                    setattr(node_copy, field, [shared[id(item)] for item in value])
+                elif is_node(value):
+                    setattr(node_copy, field, shared[id(value)])
+            if isinstance(node, Function):
+                node_copy.locals = {}
+            shared[id(node)] = self._share(node_copy)
+        return shared[id(root)]
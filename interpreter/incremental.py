@@ -0,0 +1,214 @@
+from array import array
+from bisect import bisect_right
+from sys import byteorder
+from typing import List, Optional, Tuple
+from interpreter.lexer import Lexer
+from interpreter.tokenizer import Token, TokenTypes
+from interpreter.exceptions import UnknownSymbolError
+
+
+# unsigned 32 bits typecode, "I" is 16 bits wide on some platforms
+_U32 = "I" if array("I").itemsize == 4 else "L"
+_UTF32 = f"utf-32-{byteorder[0]}e"
+
+# characters scanned past the edit at first, doubled until the scan synchronizes
+_WINDOW = 256
+
+
+def _encode(text: str) -> array:
+    return array(_U32, text.encode(_UTF32, "surrogatepass"))
+
+
+class _GapText:
+    """
+    Text kept as an array of code points with a gap at the last edit, so an edit
+    only moves the characters between it and the one before. Slices are decoded
+    on demand
+    """
+
+    def __init__(self, text: str = ""):
+        self._chars = _encode(text)
+        self._gap = self._gap_end = len(self._chars)
+
+    def __len__(self) -> int:
+        return len(self._chars) - (self._gap_end - self._gap)
+
+    def __getitem__(self, index: slice) -> str:
+        start, stop, _ = index.indices(len(self))
+        stop = max(start, stop)
+        chars, gap, size = self._chars, self._gap, self._gap_end - self._gap
+        if stop <= gap:
+            units = chars[start:stop]
+        elif start >= gap:
+            units = chars[start + size : stop + size]
+        else:
+            units = chars[start:gap] + chars[self._gap_end : stop + size]
+        return units.tobytes().decode(_UTF32, "surrogatepass")
+
+    def __str__(self) -> str:
+        return self[:]
+
+    def _move_gap(self, offset: int) -> None:
+        chars, size = self._chars, self._gap_end - self._gap
+        if offset < self._gap:
+            chars[offset + size : self._gap_end] = chars[offset : self._gap]
+        elif offset > self._gap:
+            chars[self._gap : offset] = chars[self._gap_end : offset + size]
+        self._gap, self._gap_end = offset, offset + size
+
+    def replace(self, offset: int, deleted: int, inserted: str) -> None:
+        self._move_gap(offset)
+        self._gap_end += deleted
+        units = _encode(inserted)
+        if len(units) > self._gap_end - self._gap:
+            # the gap doubles the array, growing it is amortized
+            grow = max(len(units), len(self._chars))
+            self._chars[self._gap : self._gap] = array(_U32, bytes(4 * grow))
+            self._gap_end += grow
+        self._chars[self._gap : self._gap + len(units)] = units
+        self._gap += len(units)
+
+
+class IncrementalLexer:
+    """
+    Keeps a text and its tokens in sync across edits, re-scanning only from the
+    token in front of the edit until a new token starts where an old one did
+    after the edited region.
+    The text and the token offsets are stored gap buffer style: the text with a
+    gap at the last edit, offsets in front of the gap as offsets from the start
+    of the text, after it as offsets from the end. An edit costs the characters
+    and tokens the gap moves over plus the window scanned, text is only built
+    in full when read
+    """
+
+    def __init__(self, text: str = ""):
+        self._text = _GapText(text)
+        self._length = len(text)
+        lexer = Lexer(text)
+        lexer._skip_spaces()
+        starts = []
+        self._tokens: List[Token] = lexer._tokenize(starts=starts)
+        self._tokens.append(lexer._get_next_token())
+        starts.append(len(text))
+        self._starts = array("q", starts)
+        self._gap = len(starts)
+
+    @property
+    def text(self) -> str:
+        return str(self._text)
+
+    @property
+    def tokens(self) -> List[Token]:
+        return self._tokens
+
+    def offset(self, index: int) -> int:
+        if index < self._gap:
+            return self._starts[index]
+        return self._length - self._starts[index]
+
+    def offsets(self) -> List[int]:
+        return [self.offset(index) for index in range(len(self._tokens))]
+
+    def _move_gap(self, gap: int) -> None:
+        starts, length = self._starts, self._length
+        low, high = sorted((gap, self._gap))
+        starts[low:high] = array("q", [length - start for start in starts[low:high]])
+        self._gap = gap
+
+    def _edited(self, start: int, stop: int, edit: Tuple[int, int, str]) -> str:
+        """
+        Characters start to stop of the text as it is once edit is applied
+        """
+        offset, deleted, inserted = edit
+        end = offset + len(inserted)
+        delta = len(inserted) - deleted
+        before = self._text[start : min(stop, offset)] if start < offset else ""
+        after = ""
+        if stop > end:
+            after = self._text[max(start, end) - delta : stop - delta]
+        return before + inserted[max(start - offset, 0) : max(stop - offset, 0)] + after
+
+    def _rescan(
+        self, edit: Tuple[int, int, str], first: int
+    ) -> Tuple[List[Token], List[int], int]:
+        """
+        Scan the edited text from the start of token first until a token starts
+        past the edit where an old token (shifted by the edit) started. Return the
+        new tokens, their offsets and the index of the old token the scan
+        synchronized on
+        """
+        offset, deleted, inserted = edit
+        length = self._length + len(inserted) - deleted
+        base = self.offset(first) if first else 0
+        size = offset + len(inserted) - base + _WINDOW
+        while True:
+            end = min(base + size, length)
+            window = self._edited(base, end, edit)
+            scanned = self._scan(window, base, edit, first, end == length)
+            if scanned is not None:
+                return scanned
+            size *= 2
+
+    def _scan(
+        self,
+        window: str,
+        base: int,
+        edit: Tuple[int, int, str],
+        first: int,
+        final: bool,
+    ) -> Optional[Tuple[List[Token], List[int], int]]:
+        """
+        _rescan() over the characters of window, starting at offset base. None if
+        the scan reached the end of window and final is not set: more text could
+        change the last token
+        """
+        offset, deleted, inserted = edit
+        edit_end, delta = offset + len(inserted), len(inserted) - deleted
+        tokens, starts = [], []
+        old = first
+        lexer = Lexer(window)
+        while True:
+            lexer._skip_spaces()
+            if not final and lexer._pos >= len(window):
+                return None
+            start = base + lexer._pos
+            if start >= edit_end:
+                while self.offset(old) < start - delta:
+                    old += 1
+                if self.offset(old) == start - delta:
+                    return tokens, starts, old
+            try:
+                tokens.append(lexer._get_next_token())
+            except (IndexError, UnknownSymbolError):
+                if final:
+                    raise
+                return None
+            if not final and lexer._pos >= len(window):
+                return None
+            starts.append(start)
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> Tuple[int, int, int]:
+        """
+        Replace deleted characters at offset by inserted and update the tokens.
+        Return the index of the first token replaced, how many old tokens were
+        replaced and by how many new ones. The edit is not applied if the new text
+        can't be tokenized
+        """
+        if offset < 0 or deleted < 0 or offset + deleted > self._length:
+            raise IndexError("edit out of range")
+        edit = (offset, deleted, inserted)
+
+        # start over from the token in front of the one holding the edit, an edit
+        # at its end can glue them together
+        index = bisect_right(range(len(self._tokens)), offset, key=self.offset) - 1
+        first = max(index - 1, 0)
+        tokens, starts, last = self._rescan(edit, first)
+
+        self._move_gap(first)
+        self._text.replace(offset, deleted, inserted)
+        self._length = len(self._text)
+        self._tokens[first:last] = tokens
+        self._starts[first:last] = array(
+            "q", [self._length - start for start in starts]
+        )
+        return first, last - first, len(tokens)
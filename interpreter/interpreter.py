@@ -1,4 +1,4 @@
-from typing import Union, Type, List, Any
+from typing import Union, Type, List, Any, Iterable, Optional
 from abc import ABC, abstractmethod
 from interpreter.tokenizer import TokenTypes as TT
 from interpreter.ast import (
@@ -18,13 +18,22 @@ from interpreter.ast import (
     ElseCondition,
 )
 from interpreter.exceptions import InterpreterError
+from interpreter.visitor import NodeVisitor
+from interpreter.optimizer import Optimizer
+from interpreter.resolver import GLOBAL, ScopeResolver
 from copy import copy
 
+# value of the slots of the locals not assigned yet
+_UNSET = object()
+
 
 class FunctionFrame:
     def __init__(self, func: Function):
         self.func: Function = func
+        # the variables of unresolved code, by name
         self.locals: dict = {}
+        # the values of the locals func.locals resolved to slots
+        self.slots: list = [_UNSET] * len(func.locals) if func is not None else []
 
     def __repr__(self):
         return f"{FunctionFrame.__name__}({self.func})"
@@ -33,13 +42,20 @@ class FunctionFrame:
         return str(self)
 
 
-class ASTVisitor:
-    def __init__(self, program_node: Program):
-        self._program: Program = program_node
+class ASTVisitor(NodeVisitor):
+    def __init__(self, program_node: Optional[Program] = None, opt_level: int = 0):
+        self._program: Optional[Program] = program_node
+        # runs between parsing and execution, its removed counts the nodes it saved
+        self.optimizer = Optimizer(opt_level)
         self._main_function = None
         self._globals: dict = {}
         self._call_stack: List[FunctionFrame] = []
         self._ret = None
+        # ids of the functions resolved for this run
+        self._resolved = set()
+        # name of a function -> the names it reads and does not set, found
+        # before it is optimized, unknown unless they are globals
+        self._unknown: dict = {}
 
     @property
     def globals(self):
@@ -59,7 +75,11 @@ class ASTVisitor:
         if var_name in self._globals:
             return self._globals[var_name]
 
-        raise InterpreterError(f"no such variable {var_name}")
+        raise InterpreterError(f"no such variable {self._source_name(var_name)}")
+
+    def _source_name(self, var_name: str) -> str:
+        # the optimizer renames the locals of the functions it inlines
+        return self.optimizer.names.get(var_name, var_name)
 
     @property
     def program(self):
@@ -74,30 +94,58 @@ class ASTVisitor:
         return self._globals
 
     def visit_String(self, node: Num):
-        return node.token.value
+        return node.value
 
     def visit_BinOp(self, node: BinOp):
-        if node._op.type == TT.PLUS:
+        if node.op_type == TT.PLUS:
             return self.visit(node.left) + self.visit(node.right)
-        elif node._op.type == TT.MINUS:
+        elif node.op_type == TT.MINUS:
             return self.visit(node.left) - self.visit(node.right)
-        elif node._op.type == TT.MUL:
+        elif node.op_type == TT.MUL:
             return self.visit(node.left) * self.visit(node.right)
-        elif node._op.type == TT.DIV:
+        elif node.op_type == TT.DIV:
             return self.visit(node.left) / self.visit(node.right)
+        elif node.op_type == TT.EQ:
+            return int(self.visit(node.left) == self.visit(node.right))
+        elif node.op_type == TT.LT:
+            return int(self.visit(node.left) < self.visit(node.right))
+        elif node.op_type == TT.LE:
+            return int(self.visit(node.left) <= self.visit(node.right))
+        elif node.op_type == TT.GT:
+            return int(self.visit(node.left) > self.visit(node.right))
+        elif node.op_type == TT.GE:
+            return int(self.visit(node.left) >= self.visit(node.right))
 
     def visit_UnaryOp(self, node: UnaryOp):
-        op = node.token.type
+        op = node.op_type
         if op == TT.PLUS:
             return +self.visit(node.expr)
         elif op == TT.MINUS:
             return -self.visit(node.expr)
 
     def visit_Var(self, node: Var):
-        return self._resolve_var(node.value)
+        slot = node.slot
+        if slot is None:
+            return self._resolve_var(node.value)
+        if slot == GLOBAL:
+            return self._globals[node.value]
+        value = self._call_stack[-1].slots[slot]
+        if value is _UNSET:
+            raise InterpreterError(
+                f"no such variable {self._source_name(node.value)}"
+            )
+        return value
 
     def visit_Assign(self, node: Assign):
         var_name = node.left.value
+        slot = node.left.slot
+        if slot is not None:
+            value = self.visit(node.right)
+            if slot == GLOBAL:
+                self._globals[var_name] = value
+            else:
+                self._call_stack[-1].slots[slot] = value
+            return
         if var_name in self._globals:
             scope = self._globals
         else:
@@ -105,110 +153,172 @@ class ASTVisitor:
         scope[var_name] = self.visit(node.right)
 
     def visit_Statements(self, statements: List[AST]):
+        """
+        Run statements until one of them returns, then return its ReturnVal
+        """
         for stmt in statements:
             visited_node = self.visit(stmt)
             if type(visited_node) == ReturnVal:
-                break
-        print("wtffff", self._ret)
-        _ = self._call_stack.pop()
+                return visited_node
+        return None
 
     def visit_main(self, node: Function):
         # TODO: parse stdin args
         self._call_stack.append(FunctionFrame(node))
-        self.visit_Statements(node.statements)
-        pass
+        try:
+            self.visit_Statements(node.statements)
+        finally:
+            self._call_stack.pop()
 
     def visit_FunctionCall(self, node: FunctionCall):
         builtins = ["print"]
-        if node.func.value in builtins:
+        if node.name in builtins:
             for arg in node.args:
-                if type(arg) == Num:
-                    print(arg.token.value, end=" ")
-                elif type(arg) == Var:
-                    print(self.scope[arg.token.value], end=" ")
+                print(self.visit(arg), end=" ")
             return
-        locals = {}
-        func_token = node.func
-        callee_func = self._globals[func_token.value]
+        callee_func = self._globals[node.name]
+        if id(callee_func) not in self._resolved:
+            # a lazy function parsed on its first call
+            self._resolve(callee_func)
+        frame = FunctionFrame(callee_func)
         for i, callee_arg in enumerate(callee_func.args):
-            callee_arg_name = callee_arg.value
-            locals[callee_arg_name] = self.visit(node.args[i])
-            pass
+            frame.slots[callee_arg.slot] = self.visit(node.args[i])
 
-        self._call_stack.append(FunctionFrame(callee_func))
-        self._call_stack[-1].locals = locals
-        self.visit_Statements(callee_func.statements)
-        return self._ret
+        self._call_stack.append(frame)
+        try:
+            returned = self.visit_Statements(callee_func.statements)
+        finally:
+            self._call_stack.pop()
+        return self._ret if returned is not None else None
 
     def visit_ReturnVal(self, node: ReturnVal):
-        self._ret = self.visit(node._return_val)
-        print("_ret=", self._ret)
+        self._ret = self.visit(node.return_val)
         return node
 
     def visit_IfCondition(self, node: IfCondition):
-        result = self.visit(node.expr)
-        print(f"lll{node.expr}ll\t->\t{result}")
-        if result:
+        if self.visit(node.expr):
             return self.visit_Statements(node.statements)
-        else:
-            return self.visit_Statements(node.follow_else)
+        if node.follow_else is not None:
+            return self.visit_Statements(node.follow_else.statements)
+        return None
+
+    visit_Num = visit_String
+
+    def visit_Function(self, node: Function):
+        return self.visit_Statements(node.statements)
 
     def visit(self, node: AST) -> Any:
-        print(f"len={len(self._call_stack)}")
         if not len(self._call_stack):
             return
-        if type(node) is NoOp:
+        return super().visit(node)
+
+    def generic_visit(self, node: AST) -> Any:
+        # NoOp and nodes that are not executed on their own
+        return None
+
+    def _declare_function(self, func: Function) -> None:
+        if func.name == "main":
+            self._main_function = func
             return
-        elif type(node) is Function:
-            return self.visit_Statements(node.statements)
-        elif type(node) is FunctionCall:
-            return self.visit_FunctionCall(node)
-        elif type(node) is BinOp:
-            return self.visit_BinOp(node)
-        elif type(node) is UnaryOp:
-            return self.visit_UnaryOp(node)
-        elif type(node) is Assign:
-            return self.visit_Assign(node)
-        elif type(node) is Var:
-            return self.visit_Var(node)
-        elif type(node) is Num:
-            return self.visit_String(node)
-        elif type(node) is String:
-            return self.visit_String(node)
-        elif type(node) is ReturnVal:
-            return self.visit_ReturnVal(node)
-        elif type(node) is IfCondition:
-            return self.visit_IfCondition(node)
-        # elif
-        #     raise NotImplementedError("unknown token:", type(node))
-
-    def visit_Program(self):
+        self._globals[func.name] = func
+
+    def _execute_global(self, stmt: AST) -> None:
+        if type(stmt) == NoOp:
+            return
+        if type(stmt) == FunctionCall:
+            raise InterpreterError("no function call allowed in global scope")
+        # global code runs in a frame of its own whose locals are the globals
+        depth = len(self._call_stack)
+        frame = FunctionFrame(None)
+        frame.locals = self._globals
+        self._call_stack.append(frame)
+        try:
+            self.visit(stmt)
+        finally:
+            del self._call_stack[depth:]
+
+    def _check(self, node: AST) -> AST:
+        if isinstance(node, Function) and getattr(node, "parsed", True):
+            names = ScopeResolver().unknown(node, bound=node.name != "main")
+            if names:
+                self._unknown[node.name] = names
+        return node
+
+    def _resolve(self, func: Function, bound: bool = True) -> None:
+        if not getattr(func, "parsed", True):
+            # a lazy function, parsed and optimized before it first runs
+            func.statements
+            self.optimizer.optimize(func)
+        ScopeResolver(self._globals.keys()).resolve(func, bound)
+        self._resolved.add(id(func))
+
+    def _run_main(self) -> None:
+        if self._main_function is None:
+            raise InterpreterError("main function not found")
+        # the globals are all set, unknown variables are reported and those of
+        # the functions already parsed resolved before any of them runs
+        for name, names in self._unknown.items():
+            unknown = [n for n in names if n not in self._globals]
+            if unknown:
+                raise InterpreterError(
+                    f"no such variable {', '.join(unknown)} in {name}"
+                )
+        for value in list(self._globals.values()):
+            if isinstance(value, Function) and getattr(value, "parsed", True):
+                self._resolve(value)
+        self._resolve(self._main_function, bound=False)
+        self.visit_main(self._main_function)
+
+    def _optimized(self, nodes: Iterable[AST]) -> Iterable[AST]:
+        for node in nodes:
+            node = self.optimizer.optimize(node)
+            if type(node) is list:
+                yield from node
+            else:
+                yield node
+
+    def visit_stream(self, nodes: Iterable[AST]) -> None:
+        """
+        Run the nodes of ASTParser.iter_program() as they come: functions are
+        declared and global statements executed on arrival, then main() is run
+        """
+        declared = set()
+        for node in self._optimized(map(self._check, nodes)):
+            if isinstance(node, Function):
+                if node.name in declared:
+                    raise InterpreterError(
+                        f"duplicate function name {node.name}"
+                    )
+                declared.add(node.name)
+                self._declare_function(node)
+            else:
+                self._execute_global(node)
+        self._run_main()
+
+    def visit_Program(self, node: Optional[Program] = None):
+        if node is not None:
+            self._program = node
         # check if duplicate function names
-        func_names = [f.id.value for f in self.program.functions]
+        func_names = [f.name for f in self.program.functions]
         if len(func_names) != len(set(func_names)):
             raise InterpreterError(
                 "duplicate function names"
             )  # TODO: explicit duplicates
 
         # check entrypoint 'main'
-        main_func = list(filter(lambda x: x.id.value == "main", self.program.functions))
+        main_func = list(filter(lambda x: x.name == "main", self.program.functions))
         if not main_func:
             raise InterpreterError("main function not found")
-        self._main_function = main_func[0]
 
         for func in self.program.functions:
-            if func.id.value == "main":
-                continue
-            scope = self.scope
-            self._globals[func.id.value] = func
+            self._check(func)
+        self._program = self.optimizer.optimize(self._program)
+        for func in self.program.functions:
+            self._declare_function(func)
 
         # execute global code
         for stmt in self._program.statements:
-            if type(stmt) == NoOp:
-                continue
-            if type(stmt) == FunctionCall:
-                raise InterpreterError("no function call allowed in global scope")
-            self.visit(stmt)
+            self._execute_global(stmt)
 
         # execute main()
-        self.visit_main(self._main_function)
+        self._run_main()
@@ -1,14 +1,19 @@
-from typing import Union, Optional, List
+import re
+import mmap
+from sys import intern
+from os import PathLike
+from typing import Union, Optional, List, Iterator, TextIO, Tuple
 from enum import Enum, auto
-from interpreter.tokenizer import Token, TokenTypes
+from interpreter.tokenizer import Token, TokenTypes, LazyToken, valueless_tokens
+from interpreter.token_buffer import TokenBuffer
 from interpreter.exceptions import UnknownSymbolError
 
 
 res_keywords_toks = {
-    "function": Token(TokenTypes.FUNCTION),
-    "return": Token(TokenTypes.RETURN),
-    "if": Token(TokenTypes.IF),
-    "else": Token(TokenTypes.ELSE),
+    "function": valueless_tokens[TokenTypes.FUNCTION],
+    "return": valueless_tokens[TokenTypes.RETURN],
+    "if": valueless_tokens[TokenTypes.IF],
+    "else": valueless_tokens[TokenTypes.ELSE],
 }
 
 whitespaces_no_nl_toks = (
@@ -23,29 +28,92 @@ kw_with_trailing_ws = ("function", "return")
 kw_with_trailing_lparen = ("if", "return")
 
 single_chr_toks = {
-    "+": Token(TokenTypes.PLUS),
-    "-": Token(TokenTypes.MINUS),
-    "*": Token(TokenTypes.MUL),
-    "/": Token(TokenTypes.DIV),
-    "=": Token(TokenTypes.ASSIGN),
-    "<": Token(TokenTypes.LT),
-    ">": Token(TokenTypes.GT),
-    "/": Token(TokenTypes.DIV),
-    "(": Token(TokenTypes.LPAREN),
-    ")": Token(TokenTypes.RPAREN),
-    "{": Token(TokenTypes.LBRACE),
-    "}": Token(TokenTypes.RBRACE),
-    ",": Token(TokenTypes.COMMA),
-    ";": Token(TokenTypes.SEMI),
-    "\n": Token(TokenTypes.EOL),
-    "[": Token(TokenTypes.LBRACE),
-    "]": Token(TokenTypes.RBRACE),
+    "+": valueless_tokens[TokenTypes.PLUS],
+    "-": valueless_tokens[TokenTypes.MINUS],
+    "*": valueless_tokens[TokenTypes.MUL],
+    "/": valueless_tokens[TokenTypes.DIV],
+    "=": valueless_tokens[TokenTypes.ASSIGN],
+    "<": valueless_tokens[TokenTypes.LT],
+    ">": valueless_tokens[TokenTypes.GT],
+    "/": valueless_tokens[TokenTypes.DIV],
+    "(": valueless_tokens[TokenTypes.LPAREN],
+    ")": valueless_tokens[TokenTypes.RPAREN],
+    "{": valueless_tokens[TokenTypes.LBRACE],
+    "}": valueless_tokens[TokenTypes.RBRACE],
+    ",": valueless_tokens[TokenTypes.COMMA],
+    ";": valueless_tokens[TokenTypes.SEMI],
+    "\n": valueless_tokens[TokenTypes.EOL],
+    "[": valueless_tokens[TokenTypes.LBRACE],
+    "]": valueless_tokens[TokenTypes.RBRACE],
 }
 
 mult_chr_toks = {
-    "==": Token(TokenTypes.EQ),
-    "<=": Token(TokenTypes.LE),
-    ">=": Token(TokenTypes.GE),
+    "==": valueless_tokens[TokenTypes.EQ],
+    "<=": valueless_tokens[TokenTypes.LE],
+    ">=": valueless_tokens[TokenTypes.GE],
+}
+
+
+def _make_string(text: str) -> Token:
+    return Token.trusted(TokenTypes.STRING, text[1:-1])
+
+
+def _make_integer(text: str) -> Token:
+    return Token.trusted(TokenTypes.INTEGER, int(text))
+
+
+def _make_id(text: str) -> Token:
+    keyword = res_keywords_toks.get(text)
+    if keyword is not None:
+        return keyword
+    return Token.trusted(TokenTypes.ID, intern(text))
+
+
+op_toks = {**single_chr_toks, **mult_chr_toks}
+
+
+def _token_pattern(non_ascii: str) -> str:
+    """
+    One alternative per token class, tried in order at each position. Identifiers and
+    integers are ASCII only and must not be followed by a non-ASCII character, anything
+    else ends up in FALLBACK and is scanned by Lexer._scan_fallback()
+    """
+    return (
+        r"[ \t\r\f\v]*(?:"
+        '(?P<STRING>"[^"]*")'
+        "|(?P<OP>"
+        + "|".join(re.escape(op) for op in sorted(op_toks, key=len, reverse=True))
+        + ")"
+        rf"|(?P<INTEGER>[0-9]+)(?![0-9{non_ascii}])"
+        rf"|(?P<ID>[A-Za-z][A-Za-z0-9]*)(?![A-Za-z0-9{non_ascii}])"
+        r"|(?P<FALLBACK>[^ \t\r\f\v])"
+        ")"
+    )
+
+
+_token_re = re.compile(_token_pattern(r"\x80-\U0010ffff"))
+_bytes_token_re = re.compile(_token_pattern(r"\x80-\xff").encode())
+
+# How much of the input a FALLBACK token may look at: a whole string literal, or
+# up to the whitespace ending the word the unknown symbol error would report
+_fallback_end_re = re.compile(r'"[^"]*"|(?!")\s*\S+\s')
+_bytes_fallback_end_re = re.compile(rb'"[^"]*"|(?!")\s*\S+\s')
+
+CHUNK_SIZE = 1 << 16
+
+bytes_res_keywords_toks = {kw.encode(): tok for kw, tok in res_keywords_toks.items()}
+bytes_op_toks = {op.encode(): tok for op, tok in op_toks.items()}
+_max_keyword_len = max(map(len, res_keywords_toks))
+
+# tokens shared by all the lexers, the ones with a value are only shared within
+# a call to Lexer._tokenize() so that streaming memory stays bounded by a chunk
+_shared_tokens = {**op_toks, **res_keywords_toks}
+
+_token_makers = {
+    "STRING": _make_string,
+    "OP": op_toks.__getitem__,
+    "INTEGER": _make_integer,
+    "ID": _make_id,
 }
 
 
@@ -94,9 +162,9 @@ class Lexer:
 
     def _is_eof(self) -> Optional[Token]:
         if not self._buffer:
-            return Token(TokenTypes.EOF)
+            return valueless_tokens[TokenTypes.EOF]
         if self._pos >= len(self._buffer):
-            return Token(TokenTypes.EOF)
+            return valueless_tokens[TokenTypes.EOF]
         return None
 
     def _num(self) -> Optional[Token]:
@@ -115,7 +183,7 @@ class Lexer:
             s += curr_char
             self._advance()
             curr_char = self.current_char
-        return Token(TokenTypes.ID, s)
+        return Token(TokenTypes.ID, intern(s))
 
     def _string(self):
         self._advance()
@@ -131,26 +199,22 @@ class Lexer:
         if eof:
             return eof
 
+        if self._buffer[self._pos] in whitespaces_no_nl_toks:
+            return self._scan_fallback()
+        match = _token_re.match(self._buffer, self._pos)
+        kind = match.lastgroup
+        if kind == "FALLBACK":
+            return self._scan_fallback()
+        self._pos = match.end()
+        return _token_makers[kind](match.group(kind))
+
+    def _scan_fallback(self) -> Optional[Token]:
+        """
+        Character by character scanner for what the master regex leaves out:
+        non-ASCII identifiers and numbers, unterminated strings and unknown symbols
+        """
         buffer, pos = self._buffer, self._pos
         curr_char = self.current_char
-        for tok in res_keywords_toks:
-            if self._look_ahead(len(tok)) == tok:
-                # TODO: check if it's robust enough
-                following_chr = self._peek(len(tok))
-                if following_chr and following_chr.isalnum():
-                    break
-                # if tok in kw_with_trailing_lparen and self._peek(len(tok)) not in whitespaces_no_nl_toks
-                not_res_kw = False
-                # print(tok)
-                for tok2 in res_keywords_toks:
-                    if tok == tok2:
-                        continue
-                    if self._look_ahead(len(tok) + len(tok2)) == tok + tok2:
-                        not_res_kw = True
-                if not_res_kw:
-                    break
-                self._advance(len(tok))
-                return res_keywords_toks[tok]
 
         for tok in mult_chr_toks:
             if self._look_ahead(len(tok)) == tok:
@@ -168,7 +232,8 @@ class Lexer:
             return self._num()
 
         elif curr_char and curr_char.isalnum():
-            return self._id()
+            id_token = self._id()
+            return res_keywords_toks.get(id_token.value, id_token)
 
         else:
             raise UnknownSymbolError({buffer[pos:].split()[0]})
@@ -182,13 +247,193 @@ class Lexer:
         ):
             self._pos += 1
 
-    def get_tokens(self) -> List[Token]:
+    def _tokenize(
+        self, final: bool = True, starts: Optional[List[int]] = None
+    ) -> List[Token]:
+        """
+        Scan from the current position to the end of the buffer, one master regex
+        match per token, handing over to _scan_fallback() when nothing else matches.
+        When the buffer is not final, stop in front of the first token that more
+        input could still change and leave _pos there. The offset each token starts
+        at is appended to starts if given
+        """
         tokens = []
+        append = tokens.append
+        buffer, makers = self._buffer, _token_makers
+        # token already built for a given piece of text, shared by its occurrences
+        tokens_by_text = _shared_tokens.copy()
+        pos, end = self._pos, len(self._buffer)
+        open_end = end if not final else -1
+        while pos < end:
+            for match in _token_re.finditer(buffer, pos):
+                kind = match.lastgroup
+                if match.end() == open_end:
+                    self._pos = match.start(kind)
+                    return tokens
+                if starts is not None:
+                    starts.append(match.start(kind))
+                if kind == "FALLBACK":
+                    self._pos = match.start(kind)
+                    if not final and not _fallback_end_re.match(buffer, self._pos):
+                        if starts is not None:
+                            starts.pop()
+                        return tokens
+                    append(self._scan_fallback())
+                    pos = self._pos
+                    break
+                text = match.group(kind)
+                token = tokens_by_text.get(text)
+                if token is None:
+                    token = tokens_by_text[text] = makers[kind](text)
+                append(token)
+            else:
+                break
+        self._pos = end
+        return tokens
+
+    def get_tokens(self) -> List[Token]:
         self._skip_spaces()
-        curr_token = self._get_next_token()
-        while curr_token and curr_token._type != TokenTypes.EOF:
-            self._skip_spaces()
-            tokens.append(curr_token)
-            curr_token = self._get_next_token()
-        tokens.append(Token(TokenTypes.EOF))
+        tokens = self._tokenize()
+        tokens.append(valueless_tokens[TokenTypes.EOF])
         return tokens
+
+    def get_token_buffer(self) -> TokenBuffer:
+        """
+        Same tokens as get_tokens(), stored in a TokenBuffer along with their offsets
+        """
+        self._skip_spaces()
+        starts = []
+        tokens = self._tokenize(starts=starts)
+        tokens.append(valueless_tokens[TokenTypes.EOF])
+        starts.append(len(self._buffer))
+        return TokenBuffer.from_tokens(tokens, starts)
+
+    def iter_tokens(
+        self, stream: Optional[TextIO] = None, chunk_size: int = CHUNK_SIZE
+    ) -> Iterator[Token]:
+        """
+        Generate the same tokens as get_tokens(), either from the buffer or by reading
+        stream chunk_size characters at a time. Only the chunk being scanned and the
+        token left unfinished at its end are kept in memory
+        """
+        if stream is None:
+            self._skip_spaces()
+            yield from self._tokenize()
+            yield valueless_tokens[TokenTypes.EOF]
+            return
+
+        self._buffer, self._pos = "", 0
+        final = False
+        while not final:
+            chunk = stream.read(chunk_size)
+            final = not chunk
+            self._buffer = self._buffer[self._pos :] + chunk
+            self._pos = 0
+            yield from self._tokenize(final)
+        yield valueless_tokens[TokenTypes.EOF]
+
+
+class MappedLexer:
+    """
+    Lexer working directly on the bytes of a memory-mapped UTF-8 file. Identifier,
+    integer and string values stay in the mapping until they are read, so tokens
+    must not be accessed after close()
+    """
+
+    def __init__(self, path: Union[str, PathLike]):
+        with open(path, "rb") as file:
+            try:
+                self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty files can't be mapped
+                self._map = b""
+        if hasattr(self._map, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+
+    @property
+    def buffer(self):
+        return self._map
+
+    def close(self) -> None:
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _scan_fallback(self, pos: int):
+        """
+        Decode just the text the fallback token spans and let Lexer scan it
+        """
+        source = self._map
+        match = _bytes_fallback_end_re.match(source, pos)
+        end = match.end() if match else len(source)
+        lexer = Lexer(str(source[pos:end], "utf-8"))
+        token = lexer._scan_fallback()
+        return token, pos + len(lexer.buffer[: lexer.pos].encode())
+
+    def _scan(self) -> Iterator[Tuple[Token, int]]:
+        """
+        Tokens of the mapping, up to but not including EOF, each with the byte
+        offset it starts at
+        """
+        source = self._map
+        pos, end = 0, len(source)
+        while pos < end:
+            for match in _bytes_token_re.finditer(source, pos):
+                kind = match.lastgroup
+                start, stop = match.span(kind)
+                if kind == "OP":
+                    yield bytes_op_toks[source[start:stop]], start
+                elif kind == "ID":
+                    if stop - start <= _max_keyword_len:
+                        keyword = bytes_res_keywords_toks.get(source[start:stop])
+                        if keyword is not None:
+                            yield keyword, start
+                            continue
+                    token = LazyToken(TokenTypes.ID, source, start, stop, _decode_ascii)
+                    yield token, start
+                elif kind == "INTEGER":
+                    yield LazyToken(TokenTypes.INTEGER, source, start, stop, int), start
+                elif kind == "STRING":
+                    token = LazyToken(
+                        TokenTypes.STRING, source, start + 1, stop - 1, _decode_utf8
+                    )
+                    yield token, start
+                else:
+                    token, pos = self._scan_fallback(start)
+                    yield token, start
+                    break
+            else:
+                break
+
+    def get_token_buffer(self) -> TokenBuffer:
+        """
+        Same tokens as get_tokens(), stored in a TokenBuffer along with their byte
+        offsets. The buffer holds decoded values, it stays valid after close()
+        """
+        tokens, starts = [], []
+        for token, start in self._scan():
+            tokens.append(token)
+            starts.append(start)
+        tokens.append(valueless_tokens[TokenTypes.EOF])
+        starts.append(len(self._map))
+        return TokenBuffer.from_tokens(tokens, starts)
+
+    def iter_tokens(self) -> Iterator[Token]:
+        for token, _ in self._scan():
+            yield token
+        yield valueless_tokens[TokenTypes.EOF]
+
+    def get_tokens(self) -> List[Token]:
+        return list(self.iter_tokens())
+
+
+def _decode_ascii(data: bytes) -> str:
+    return intern(str(data, "ascii"))
+
+
+def _decode_utf8(data: bytes) -> str:
+    return str(data, "utf-8")
@@ -0,0 +1,498 @@
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from interpreter.lexer import res_keywords_toks
+from interpreter.tokenizer import TokenTypes as TT
+from interpreter.exceptions import GrammarError
+from interpreter.parser import ASTParser
+from interpreter.ast import (
+    AST,
+    Program,
+    BinOp,
+    UnaryOp,
+    Num,
+    Var,
+    Assign,
+    Function,
+    NoOp,
+    String,
+    ReturnVal,
+    IfCondition,
+    ElseCondition,
+    FunctionCall,
+)
+
+
+GRAMMAR_PATH = Path(__file__).resolve().parents[1] / "poc" / "grammar.txt"
+TABLE_PATH = Path(__file__).resolve().with_name("ll1_table.py")
+
+EMPTY = "empty"
+
+# (rule, right-hand side, action)
+Production = Tuple[str, Tuple[str, ...], Optional[str]]
+
+_grammar_token_re = re.compile(r'\s*(?:(\w+)|"([^"]*)"|\{(\w+)\}|([()|*]))')
+
+
+class Grammar:
+    """
+    Rules read from a grammar file, groups and repetitions turned into rules of
+    their own named after the rule they appear in
+    """
+
+    def __init__(self, text: str):
+        definitions = self._definitions(text)
+        self.rules: List[str] = [name for name, _ in definitions]
+        self.productions: List[Production] = []
+        self._helpers: Dict[str, int] = {}
+        for name, body in definitions:
+            self._items = _grammar_token_re.findall(body)
+            self._pos = 0
+            for rhs, action in self._alternatives(name):
+                self.productions.append((name, rhs, action))
+            if self._pos != len(self._items):
+                raise GrammarError(f"unexpected {self._item_text()} in rule {name}")
+        for rule, rhs, _ in self.productions:
+            for symbol in rhs:
+                if not self.is_terminal(symbol) and symbol not in self.rules:
+                    raise GrammarError(f"undefined rule {symbol} in rule {rule}")
+
+    @property
+    def start(self) -> str:
+        return self.rules[0]
+
+    @staticmethod
+    def is_terminal(symbol: str) -> bool:
+        return symbol in TT.__members__
+
+    @staticmethod
+    def _definitions(text: str) -> List[Tuple[str, str]]:
+        definitions = []
+        for line in text.splitlines():
+            line = line.split("#", 1)[0].rstrip()
+            if not line:
+                continue
+            match = re.match(r"(\w+)\s*:(.*)", line)
+            if match:
+                definitions.append([match.group(1), match.group(2)])
+            elif definitions and line[0].isspace():
+                definitions[-1][1] += " " + line
+            else:
+                raise GrammarError(f"expected a rule definition: {line.strip()}")
+        return [tuple(definition) for definition in definitions]
+
+    def _item_text(self) -> str:
+        if self._pos >= len(self._items):
+            return "end of rule"
+        return next(text for text in self._items[self._pos] if text)
+
+    def _helper(
+        self, rule: str, alternatives: List[Tuple[Tuple[str, ...], None]]
+    ) -> str:
+        self._helpers[rule] = self._helpers.get(rule, 0) + 1
+        name = f"{rule}_{self._helpers[rule]}"
+        self.rules.append(name)
+        for rhs, action in alternatives:
+            self.productions.append((name, rhs, action))
+        return name
+
+    def _alternatives(self, rule: str) -> List[Tuple[Tuple[str, ...], Optional[str]]]:
+        alternatives = [self._sequence(rule)]
+        while self._pos < len(self._items) and self._items[self._pos][3] == "|":
+            self._pos += 1
+            alternatives.append(self._sequence(rule))
+        return alternatives
+
+    def _sequence(self, rule: str) -> Tuple[Tuple[str, ...], Optional[str]]:
+        symbols, action = [], None
+        while self._pos < len(self._items):
+            name, literal, action_name, punctuation = self._items[self._pos]
+            if punctuation in ("|", ")"):
+                break
+            self._pos += 1
+            if action_name:
+                action = action_name
+                break
+            if name == EMPTY:
+                continue
+            if name:
+                symbol = name
+            elif literal:
+                if literal not in res_keywords_toks:
+                    raise GrammarError(f'unknown keyword "{literal}" in rule {rule}')
+                symbol = res_keywords_toks[literal].type.name
+            elif punctuation == "(":
+                group = self._alternatives(rule)
+                if self._item_text() != ")":
+                    raise GrammarError(f"unclosed group in rule {rule}")
+                self._pos += 1
+                symbol = self._helper(rule, [(rhs, None) for rhs, _ in group])
+            else:
+                raise GrammarError(f"unexpected {punctuation} in rule {rule}")
+            if self._pos < len(self._items) and self._items[self._pos][3] == "*":
+                self._pos += 1
+                repeated = self._helper(rule, [])
+                self.productions += [
+                    (repeated, (symbol, repeated), None),
+                    (repeated, (), None),
+                ]
+                symbol = repeated
+            symbols.append(symbol)
+        return tuple(symbols), action
+
+    def first_sets(self) -> Tuple[Dict[str, Set[str]], Set[str]]:
+        """
+        Token types each rule can start with, and the rules that can match nothing
+        """
+        first = {rule: set() for rule in self.rules}
+        nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for rule, rhs, _ in self.productions:
+                starts, empty = self.sequence_first(rhs, first, nullable)
+                if not starts <= first[rule]:
+                    first[rule] |= starts
+                    changed = True
+                if empty and rule not in nullable:
+                    nullable.add(rule)
+                    changed = True
+        return first, nullable
+
+    def sequence_first(
+        self, rhs: Tuple[str, ...], first: Dict[str, Set[str]], nullable: Set[str]
+    ) -> Tuple[Set[str], bool]:
+        starts = set()
+        for symbol in rhs:
+            if self.is_terminal(symbol):
+                starts.add(symbol)
+                return starts, False
+            starts |= first[symbol]
+            if symbol not in nullable:
+                return starts, False
+        return starts, True
+
+    def follow_sets(
+        self, first: Dict[str, Set[str]], nullable: Set[str]
+    ) -> Dict[str, Set[str]]:
+        follow = {rule: set() for rule in self.rules}
+        follow[self.start].add(TT.EOF.name)
+        changed = True
+        while changed:
+            changed = False
+            for rule, rhs, _ in self.productions:
+                for index, symbol in enumerate(rhs):
+                    if self.is_terminal(symbol):
+                        continue
+                    rest = rhs[index + 1 :]
+                    starts, empty = self.sequence_first(rest, first, nullable)
+                    if empty:
+                        starts |= follow[rule]
+                    if not starts <= follow[symbol]:
+                        follow[symbol] |= starts
+                        changed = True
+        return follow
+
+    def table(self) -> Tuple[List[Dict[str, int]], List[Optional[int]]]:
+        """
+        For each rule, the production to expand on each token type, and the one to
+        expand on other token types: its empty production if it has one
+        """
+        first, nullable = self.first_sets()
+        follow = self.follow_sets(first, nullable)
+        table = {rule: {} for rule in self.rules}
+        defaults = {rule: None for rule in self.rules}
+        for index, (rule, rhs, _) in enumerate(self.productions):
+            starts, empty = self.sequence_first(rhs, first, nullable)
+            if empty:
+                if defaults[rule] is not None:
+                    raise GrammarError(f"rule {rule} can match nothing in two ways")
+                defaults[rule] = index
+                starts = starts | follow[rule]
+            for kind in starts:
+                if table[rule].setdefault(kind, index) != index:
+                    raise GrammarError(f"rule {rule} is not LL(1) on {kind}")
+        return (
+            [table[rule] for rule in self.rules],
+            [defaults[rule] for rule in self.rules],
+        )
+
+
+def generate_table(grammar: Grammar, source: str = "poc/grammar.txt") -> str:
+    """
+    Python source of the parse table module for grammar
+    """
+    rule_index = {rule: index for index, rule in enumerate(grammar.rules)}
+    kind_order = {kind: index for index, kind in enumerate(TT.__members__)}
+
+    def symbol(name: str) -> str:
+        return f"TT.{name}" if grammar.is_terminal(name) else str(rule_index[name])
+
+    def sequence(items: List[str]) -> str:
+        return f"({', '.join(items)}{',' if len(items) == 1 else ''})"
+
+    table, defaults = grammar.table()
+    lines = [
+        f"# Generated from {source} by `python -m interpreter.ll1`, do not edit",
+        "from interpreter.tokenizer import TokenTypes as TT",
+        "",
+        "",
+        "RULES = (",
+        *(f'    "{rule}",' for rule in grammar.rules),
+        ")",
+        "",
+        "# (rule, right-hand side, action), rules are indexes in RULES",
+        "PRODUCTIONS = (",
+    ]
+    for rule, rhs, action in grammar.productions:
+        action = f'"{action}"' if action else "None"
+        rhs = sequence([symbol(name) for name in rhs])
+        lines.append(f"    ({rule_index[rule]}, {rhs}, {action}),")
+    lines += [
+        ")",
+        "",
+        "# for each rule, the production to expand on each token type",
+        "TABLE = (",
+    ]
+    for rule, entries in zip(grammar.rules, table):
+        kinds = sorted(entries, key=kind_order.__getitem__)
+        entries = ", ".join(f"TT.{kind}: {entries[kind]}" for kind in kinds)
+        lines.append(f"    {{{entries}}},  # {rule}")
+    lines += [
+        ")",
+        "",
+        "# for each rule, the production to expand on other token types",
+        "DEFAULTS = (",
+        *(
+            f"    {default},  # {rule}"
+            for rule, default in zip(grammar.rules, defaults)
+        ),
+        ")",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def _program(values: list) -> Program:
+    return Program(values[1::2], values[0])
+
+
+def _function(values: list) -> Function:
+    return Function(values[1], values[3], values[6])
+
+
+def _params(values: list) -> List[Var]:
+    return [Var(token) for token in values[::2]]
+
+
+def _statements(values: list) -> List[AST]:
+    values.append(NoOp())
+    return values
+
+
+def _id_statement(values: list) -> AST:
+    if values[1]._type is TT.LPAREN:
+        return FunctionCall(values[0], values[2])
+    return Assign(values[1], Var(values[0]), values[2])
+
+
+def _return(values: list) -> ReturnVal:
+    return ReturnVal(values[1])
+
+
+def _if(values: list) -> IfCondition:
+    return IfCondition(values[2], values[5], values[7] if len(values) > 7 else None)
+
+
+def _else(values: list) -> ElseCondition:
+    return ElseCondition(values[2])
+
+
+def _call_args(values: list) -> List[AST]:
+    return [Var(token) if token._type is TT.ID else Num(token) for token in values[::2]]
+
+
+def _binary(values: list) -> AST:
+    node = values[0]
+    for index in range(1, len(values), 2):
+        node = BinOp(values[index], node, values[index + 1])
+    return node
+
+
+def _unary(values: list) -> UnaryOp:
+    return UnaryOp(values[0], values[1])
+
+
+def _num(values: list) -> Num:
+    return Num(values[0])
+
+
+def _string(values: list) -> String:
+    return String(values[0])
+
+
+def _paren(values: list) -> AST:
+    return values[1]
+
+
+def _id(values: list) -> AST:
+    if len(values) > 1:
+        return FunctionCall(values[0], values[2])
+    return Var(values[0])
+
+
+_actions = {
+    "program": _program,
+    "function": _function,
+    "params": _params,
+    "statements": _statements,
+    "id_statement": _id_statement,
+    "return": _return,
+    "if": _if,
+    "else": _else,
+    "call_args": _call_args,
+    "binary": _binary,
+    "unary": _unary,
+    "num": _num,
+    "string": _string,
+    "paren": _paren,
+    "id": _id,
+}
+
+
+class _ParseTable:
+    """
+    Table of interpreter/ll1_table.py with, for each rule and token type, the
+    symbols pushed by the whole chain of expansions the token selects: a rule
+    expands to a rule expanding to a rule... until a token type is on top
+    """
+
+    def __init__(self):
+        # imported on first use, the generator must run without a table
+        from interpreter import ll1_table
+
+        self.rules = {rule: index for index, rule in enumerate(ll1_table.RULES)}
+        self._table = ll1_table.TABLE
+        self._defaults = ll1_table.DEFAULTS
+        # right-hand sides reversed, the way they are pushed on the stack
+        self._productions = [
+            (tuple(reversed(rhs)), _actions[action] if action else None)
+            for _, rhs, action in ll1_table.PRODUCTIONS
+        ]
+        self.expansions: List[Dict[TT, Tuple[tuple, int]]] = [{} for _ in self._table]
+
+    def _production(self, rule: int, kind: TT) -> Optional[int]:
+        return self._table[rule].get(kind, self._defaults[rule])
+
+    def expand(self, rule: int, kind: TT) -> Optional[Tuple[tuple, int]]:
+        """
+        Symbols to push in place of rule when the current token is of type kind,
+        and how many of them are actions. None if rule can't start with kind
+        """
+        production = self._production(rule, kind)
+        if production is None:
+            return None
+        symbols, actions = [], 0
+        while True:
+            rhs, action = self._productions[production]
+            if action is not None:
+                symbols.append(action)
+                actions += 1
+            symbols += rhs
+            if not rhs or type(rhs[-1]) is not int:
+                break
+            production = self._production(rhs[-1], kind)
+            if production is None:
+                break
+            symbols.pop()
+        self.expansions[rule][kind] = expansion = (tuple(symbols), actions)
+        return expansion
+
+
+_parse_table: Optional[_ParseTable] = None
+
+
+class LL1Parser(ASTParser):
+    """
+    Parser running the table generated from poc/grammar.txt with an explicit
+    stack: the depth of blocks and expressions is only bounded by memory.
+    A production with an action leaves it under its symbols on the stack, with
+    the number of values pushed so far on the stack of marks. When the action is
+    popped, the values pushed since are replaced by the node it builds from them
+    """
+
+    def parse(self, rule: str) -> AST:
+        """
+        Parse rule of the grammar from the current token
+        """
+        global _parse_table
+        if _parse_table is None:
+            _parse_table = _ParseTable()
+        table = _parse_table
+        expansions = table.expansions
+        tokens = self._tokens
+        index = self._tok_idx
+        token = tokens[index]
+        kind = token._type
+        stack = [table.rules[rule]]
+        marks = []
+        values = []
+        pop, push = stack.pop, stack.extend
+        while stack:
+            symbol = pop()
+            if type(symbol) is TT:
+                if kind is not symbol:
+                    self._tok_idx = index
+                    self._eat(symbol)
+                values.append(token)
+                index += 1
+                token = tokens[index]
+                kind = token._type
+            elif type(symbol) is int:
+                expansion = expansions[symbol].get(kind) or table.expand(symbol, kind)
+                if expansion is None:
+                    self._tok_idx = index
+                    raise self._error(
+                        f"parsing was stopped due to invalid token {token}"
+                    )
+                symbols, actions = expansion
+                if actions:
+                    marks += [len(values)] * actions
+                push(symbols)
+            else:
+                height = marks.pop()
+                if symbol is _binary and height == len(values) - 1:
+                    # an operand without operators is its own node
+                    continue
+                node = symbol(values[height:])
+                del values[height:]
+                values.append(node)
+        self._tok_idx = index
+        return values[0]
+
+    def program(self) -> Program:
+        return self.parse("program")
+
+    def expr(self) -> AST:
+        return self.parse("expr")
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description="Generate the LL(1) parse table of a grammar."
+    )
+    argparser.add_argument("grammar", nargs="?", type=Path, default=GRAMMAR_PATH)
+    argparser.add_argument("-o", "--output", type=Path, default=TABLE_PATH)
+    args = argparser.parse_args()
+
+    try:
+        grammar = Grammar(args.grammar.read_text())
+    except GrammarError as e:
+        sys.exit(e.message)
+    args.output.write_text(generate_table(grammar))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# Generated from poc/grammar.txt by `python -m interpreter.ll1`, do not edit
+from interpreter.tokenizer import TokenTypes as TT
+
+
+RULES = (
+    "program",
+    "function_decl",
+    "params",
+    "param_list",
+    "statements",
+    "statement",
+    "if_block",
+    "else_block",
+    "call_args",
+    "arg_list",
+    "expr",
+    "arithmetic",
+    "term",
+    "unary",
+    "primary",
+    "program_1",
+    "program_2",
+    "param_list_1",
+    "statements_1",
+    "statement_1",
+    "arg_list_1",
+    "arg_list_2",
+    "expr_1",
+    "expr_2",
+    "expr_3",
+    "arithmetic_1",
+    "arithmetic_2",
+    "arithmetic_3",
+    "term_1",
+    "term_2",
+    "term_3",
+    "unary_1",
+    "primary_1",
+)
+
+# (rule, right-hand side, action), rules are indexes in RULES
+PRODUCTIONS = (
+    (15, (1, 4), None),
+    (16, (15, 16), None),
+    (16, (), None),
+    (0, (4, 16), "program"),
+    (1, (TT.FUNCTION, TT.ID, TT.LPAREN, 2, TT.RPAREN, TT.LBRACE, 4, TT.RBRACE), "function"),
+    (2, (3,), "params"),
+    (17, (TT.COMMA, 3), None),
+    (17, (), None),
+    (3, (TT.ID, 17), None),
+    (3, (), None),
+    (18, (5, 18), None),
+    (18, (), None),
+    (4, (18,), "statements"),
+    (19, (TT.LPAREN, 8, TT.RPAREN), None),
+    (19, (TT.ASSIGN, 10), None),
+    (5, (TT.ID, 19, TT.SEMI), "id_statement"),
+    (5, (TT.RETURN, 10, TT.SEMI), "return"),
+    (5, (6,), None),
+    (6, (TT.IF, TT.LPAREN, 10, TT.RPAREN, TT.LBRACE, 4, TT.RBRACE, 7), "if"),
+    (7, (TT.ELSE, TT.LBRACE, 4, TT.RBRACE), "else"),
+    (7, (), None),
+    (8, (9,), "call_args"),
+    (20, (TT.ID,), None),
+    (20, (TT.INTEGER,), None),
+    (21, (TT.COMMA, 9), None),
+    (21, (), None),
+    (9, (20, 21), None),
+    (9, (), None),
+    (22, (TT.EQ,), None),
+    (22, (TT.LT,), None),
+    (22, (TT.LE,), None),
+    (22, (TT.GT,), None),
+    (22, (TT.GE,), None),
+    (23, (22, 11), None),
+    (24, (23, 24), None),
+    (24, (), None),
+    (10, (11, 24), "binary"),
+    (25, (TT.PLUS,), None),
+    (25, (TT.MINUS,), None),
+    (26, (25, 12), None),
+    (27, (26, 27), None),
+    (27, (), None),
+    (11, (12, 27), "binary"),
+    (28, (TT.MUL,), None),
+    (28, (TT.DIV,), None),
+    (29, (28, 13), None),
+    (30, (29, 30), None),
+    (30, (), None),
+    (12, (13, 30), "binary"),
+    (31, (TT.PLUS,), None),
+    (31, (TT.MINUS,), None),
+    (13, (31, 13), "unary"),
+    (13, (14,), None),
+    (32, (TT.LPAREN, 8, TT.RPAREN), None),
+    (32, (), None),
+    (14, (TT.INTEGER,), "num"),
+    (14, (TT.STRING,), "string"),
+    (14, (TT.LPAREN, 10, TT.RPAREN), "paren"),
+    (14, (TT.ID, 32), "id"),
+)
+
+# for each rule, the production to expand on each token type
+TABLE = (
+    {TT.EOF: 3, TT.FUNCTION: 3, TT.RETURN: 3, TT.IF: 3, TT.ID: 3},  # program
+    {TT.FUNCTION: 4},  # function_decl
+    {TT.RPAREN: 5, TT.ID: 5},  # params
+    {TT.RPAREN: 9, TT.ID: 8},  # param_list
+    {TT.EOF: 12, TT.FUNCTION: 12, TT.RETURN: 12, TT.RBRACE: 12, TT.IF: 12, TT.ID: 12},  # statements
+    {TT.RETURN: 16, TT.IF: 17, TT.ID: 15},  # statement
+    {TT.IF: 18},  # if_block
+    {TT.EOF: 20, TT.FUNCTION: 20, TT.RETURN: 20, TT.RBRACE: 20, TT.IF: 20, TT.ELSE: 19, TT.ID: 20},  # else_block
+    {TT.INTEGER: 21, TT.RPAREN: 21, TT.ID: 21},  # call_args
+    {TT.INTEGER: 26, TT.RPAREN: 27, TT.ID: 26},  # arg_list
+    {TT.INTEGER: 36, TT.STRING: 36, TT.PLUS: 36, TT.MINUS: 36, TT.LPAREN: 36, TT.ID: 36},  # expr
+    {TT.INTEGER: 42, TT.STRING: 42, TT.PLUS: 42, TT.MINUS: 42, TT.LPAREN: 42, TT.ID: 42},  # arithmetic
+    {TT.INTEGER: 48, TT.STRING: 48, TT.PLUS: 48, TT.MINUS: 48, TT.LPAREN: 48, TT.ID: 48},  # term
+    {TT.INTEGER: 52, TT.STRING: 52, TT.PLUS: 51, TT.MINUS: 51, TT.LPAREN: 52, TT.ID: 52},  # unary
+    {TT.INTEGER: 55, TT.STRING: 56, TT.LPAREN: 57, TT.ID: 58},  # primary
+    {TT.FUNCTION: 0},  # program_1
+    {TT.EOF: 2, TT.FUNCTION: 1},  # program_2
+    {TT.COMMA: 6, TT.RPAREN: 7},  # param_list_1
+    {TT.EOF: 11, TT.FUNCTION: 11, TT.RETURN: 10, TT.RBRACE: 11, TT.IF: 10, TT.ID: 10},  # statements_1
+    {TT.LPAREN: 13, TT.ASSIGN: 14},  # statement_1
+    {TT.INTEGER: 23, TT.ID: 22},  # arg_list_1
+    {TT.COMMA: 24, TT.RPAREN: 25},  # arg_list_2
+    {TT.EQ: 28, TT.LT: 29, TT.LE: 30, TT.GT: 31, TT.GE: 32},  # expr_1
+    {TT.EQ: 33, TT.LT: 33, TT.LE: 33, TT.GT: 33, TT.GE: 33},  # expr_2
+    {TT.EQ: 34, TT.LT: 34, TT.LE: 34, TT.GT: 34, TT.GE: 34, TT.RPAREN: 35, TT.SEMI: 35},  # expr_3
+    {TT.PLUS: 37, TT.MINUS: 38},  # arithmetic_1
+    {TT.PLUS: 39, TT.MINUS: 39},  # arithmetic_2
+    {TT.PLUS: 40, TT.MINUS: 40, TT.EQ: 41, TT.LT: 41, TT.LE: 41, TT.GT: 41, TT.GE: 41, TT.RPAREN: 41, TT.SEMI: 41},  # arithmetic_3
+    {TT.MUL: 43, TT.DIV: 44},  # term_1
+    {TT.MUL: 45, TT.DIV: 45},  # term_2
+    {TT.PLUS: 47, TT.MINUS: 47, TT.MUL: 46, TT.DIV: 46, TT.EQ: 47, TT.LT: 47, TT.LE: 47, TT.GT: 47, TT.GE: 47, TT.RPAREN: 47, TT.SEMI: 47},  # term_3
+    {TT.PLUS: 49, TT.MINUS: 50},  # unary_1
+    {TT.PLUS: 54, TT.MINUS: 54, TT.MUL: 54, TT.DIV: 54, TT.EQ: 54, TT.LT: 54, TT.LE: 54, TT.GT: 54, TT.GE: 54, TT.LPAREN: 53, TT.RPAREN: 54, TT.SEMI: 54},  # primary_1
+)
+
+# for each rule, the production to expand on other token types
+DEFAULTS = (
+    3,  # program
+    None,  # function_decl
+    5,  # params
+    9,  # param_list
+    12,  # statements
+    None,  # statement
+    None,  # if_block
+    20,  # else_block
+    21,  # call_args
+    27,  # arg_list
+    None,  # expr
+    None,  # arithmetic
+    None,  # term
+    None,  # unary
+    None,  # primary
+    None,  # program_1
+    2,  # program_2
+    7,  # param_list_1
+    11,  # statements_1
+    None,  # statement_1
+    None,  # arg_list_1
+    25,  # arg_list_2
+    None,  # expr_1
+    None,  # expr_2
+    35,  # expr_3
+    None,  # arithmetic_1
+    None,  # arithmetic_2
+    41,  # arithmetic_3
+    None,  # term_1
+    None,  # term_2
+    47,  # term_3
+    None,  # unary_1
+    54,  # primary_1
+)
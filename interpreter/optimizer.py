@@ -0,0 +1,1289 @@
+import copy
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+from interpreter.tokenizer import Token, TokenTypes as TT
+from interpreter.ast import (
+    AST,
+    Num,
+    String,
+    BinOp,
+    UnaryOp,
+    NoOp,
+    Function,
+    Program,
+    ReturnVal,
+    IfCondition,
+    ElseCondition,
+    Assign,
+    Var,
+    FunctionCall,
+    child_nodes,
+    node_hash,
+)
+from interpreter.visitor import NodeTransformer, _replace_items
+from interpreter.resolver import global_names
+
+
+# what ASTVisitor computes for each operator
+_binary_ops = {
+    TT.PLUS: lambda a, b: a + b,
+    TT.MINUS: lambda a, b: a - b,
+    TT.MUL: lambda a, b: a * b,
+    TT.DIV: lambda a, b: a / b,
+    TT.EQ: lambda a, b: int(a == b),
+    TT.LT: lambda a, b: int(a < b),
+    TT.LE: lambda a, b: int(a <= b),
+    TT.GT: lambda a, b: int(a > b),
+    TT.GE: lambda a, b: int(a >= b),
+}
+_unary_ops = {
+    TT.PLUS: lambda a: +a,
+    TT.MINUS: lambda a: -a,
+}
+_comparisons = (TT.EQ, TT.LT, TT.LE, TT.GT, TT.GE)
+
+# strings longer than this are left to be built at run time
+MAX_FOLDED_STRING = 1 << 12
+
+MAX_LEVEL = 2
+
+# how deep _is_int and _is_number look into an expression before giving up
+_TYPE_DEPTH = 16
+
+
+def _literal(value) -> Optional[Union[Num, String]]:
+    if type(value) in (int, float):
+        return Num(Token.trusted(TT.INTEGER, value))
+    if type(value) is str and len(value) <= MAX_FOLDED_STRING:
+        return String(Token.trusted(TT.STRING, value))
+    return None
+
+
+def _is_literal(node: AST) -> bool:
+    return type(node) in (Num, String)
+
+
+def _is_int(node: AST, depth: int = _TYPE_DEPTH) -> bool:
+    """
+    Whether node is known to evaluate to an int, if it does not raise
+    """
+    node_type = type(node)
+    if node_type is Num:
+        return type(node.value) is int
+    if not depth:
+        return False
+    if node_type is UnaryOp:
+        return _is_int(node.expr, depth - 1)
+    if node_type is BinOp:
+        if node.op_type in _comparisons:
+            return True
+        if node.op_type in (TT.PLUS, TT.MINUS, TT.MUL):
+            return _is_int(node.left, depth - 1) and _is_int(node.right, depth - 1)
+    return False
+
+
+def _is_number(node: AST, depth: int = _TYPE_DEPTH) -> bool:
+    """
+    Whether node is known to evaluate to an int or a float, if it does not raise
+    """
+    node_type = type(node)
+    if node_type in (Num, UnaryOp):
+        return True
+    if node_type is not BinOp or not depth:
+        return False
+    if node.op_type in (TT.PLUS, TT.MUL):
+        return _is_number(node.left, depth - 1) and _is_number(node.right, depth - 1)
+    return True
+
+
+def _is_num(node: AST, value: int) -> bool:
+    return type(node) is Num and type(node.value) is int and node.value == value
+
+
+class ConstantFolder(NodeTransformer):
+    """
+    Replaces operators whose operands are all literals by the literal they
+    evaluate to. Operations that raise (a division by zero, "a" - 1) are left
+    to raise at run time.
+
+    With simplify, also applies identities that keep the value and the errors
+    of the expression: x * 1, 1 * x, +x and --x are x for a number x, x + 0,
+    0 + x and x - 0 are x for an int x. A variable may hold a string or the
+    None of a function that does not return. x is still evaluated, so x * 0
+    is not replaced: it would hide an undefined variable in x
+    """
+
+    def __init__(self, simplify: bool = False):
+        self.simplify = simplify
+        self.removed = 0
+
+    def leave_BinOp(self, node: BinOp) -> AST:
+        left, right = node.left, node.right
+        if _is_literal(left) and _is_literal(right):
+            folded = _fold_binary(node.op_type, left.value, right.value)
+            if folded is not None:
+                self.removed += 2
+                return folded
+        if not self.simplify:
+            return node
+        op = node.op_type
+        if op is TT.MUL and _is_num(right, 1) and _is_number(left):
+            kept = left
+        elif op is TT.MUL and _is_num(left, 1) and _is_number(right):
+            kept = right
+        elif op in (TT.PLUS, TT.MINUS) and _is_num(right, 0) and _is_int(left):
+            kept = left
+        elif op is TT.PLUS and _is_num(left, 0) and _is_int(right):
+            kept = right
+        else:
+            return node
+        self.removed += 2
+        return kept
+
+    def leave_UnaryOp(self, node: UnaryOp) -> AST:
+        expr = node.expr
+        if _is_literal(expr):
+            try:
+                folded = _literal(_unary_ops[node.op_type](expr.value))
+            except TypeError:
+                folded = None
+            if folded is not None:
+                self.removed += 1
+                return folded
+        if not self.simplify:
+            return node
+        expr_op = expr.op_type if type(expr) is UnaryOp else None
+        if node.op_type is expr_op is TT.MINUS and _is_number(expr.expr):
+            # an operand of another type raises with the name of the operator
+            self.removed += 2
+            return expr.expr
+        if node.op_type is TT.PLUS and _is_number(expr):
+            self.removed += 1
+            return expr
+        return node
+
+
+def _fold_binary(op: TT, left, right) -> Optional[Union[Num, String]]:
+    if op is TT.MUL and str in (type(left), type(right)):
+        # checked before building it
+        count, string = (left, right) if type(right) is str else (right, left)
+        if type(count) is int and len(string) * count > MAX_FOLDED_STRING:
+            return None
+    try:
+        return _literal(_binary_ops[op](left, right))
+    except (ArithmeticError, TypeError):
+        return None
+
+
+def _size(node: AST) -> int:
+    size, stack = 0, [node]
+    while stack:
+        size += 1
+        stack += child_nodes(stack.pop())
+    return size
+
+
+def _returns(stmt: AST) -> bool:
+    """
+    Whether running stmt always ends in a return
+    """
+    if type(stmt) is ReturnVal:
+        return True
+    if type(stmt) is IfCondition and stmt.follow_else is not None:
+        return _block_returns(stmt.statements) and _block_returns(
+            stmt.follow_else.statements
+        )
+    return False
+
+
+def _block_returns(statements: List[AST]) -> bool:
+    # blocks are pruned bottom up, only their last statement can return
+    return bool(statements) and _returns(statements[-1])
+
+
+class DeadCodeEliminator(NodeTransformer):
+    """
+    Prunes the blocks of functions and if/else statements: NoOps and what
+    follows a statement that always returns are removed, so are empty else
+    blocks. An if whose condition is a literal is replaced by the statements of
+    the branch it takes
+    """
+
+    def __init__(self):
+        self.removed = 0
+
+    def _prune(self, statements: List[AST]) -> List[AST]:
+        kept = []
+        for i, stmt in enumerate(statements):
+            if type(stmt) is NoOp:
+                self.removed += 1
+                continue
+            kept.append(stmt)
+            if _returns(stmt):
+                self.removed += sum(map(_size, statements[i + 1 :]))
+                break
+        return kept
+
+    def leave_Function(self, node: Function) -> Function:
+        node.statements = self._prune(node.statements)
+        return node
+
+    def leave_ElseCondition(self, node: ElseCondition) -> ElseCondition:
+        node.statements = self._prune(node.statements)
+        return node
+
+    def leave_IfCondition(self, node: IfCondition) -> Union[IfCondition, List[AST]]:
+        node.statements = self._prune(node.statements)
+        if node.follow_else is not None and not node.follow_else.statements:
+            self.removed += 1
+            node.follow_else = None
+        if not _is_literal(node.expr):
+            return node
+        # the if, its condition and the branch not taken
+        self.removed += 2
+        if node.expr.value:
+            if node.follow_else is not None:
+                self.removed += _size(node.follow_else)
+            return node.statements
+        self.removed += sum(map(_size, node.statements))
+        if node.follow_else is None:
+            return []
+        self.removed += 1
+        return node.follow_else.statements
+
+
+class _Occurrence:
+    __slots__ = ("index", "node", "parent", "field", "ancestors", "hoistable", "size")
+
+    def __init__(self, index, node, parent, field, ancestors, hoistable, size):
+        # node is getattr(parent, field), in the statement at index of its block
+        self.index, self.node, self.parent, self.field = index, node, parent, field
+        self.size = size
+        # ids of the operators node is in
+        self.ancestors = ancestors
+        # whether evaluating node first in its statement keeps the error it raises
+        self.hoistable = hoistable
+
+
+class _Key:
+    """
+    A node as a dict key: equal to the nodes of the same structure, with its
+    hash computed once
+    """
+
+    __slots__ = ("node", "hash")
+
+    def __init__(self, node: AST, hash: int):
+        self.node, self.hash = node, hash
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        return self.node == other.node
+
+
+def _statement_expr(stmt: AST) -> Optional[AST]:
+    if type(stmt) is Assign:
+        return stmt.right
+    if type(stmt) is ReturnVal:
+        return stmt.return_val
+    if type(stmt) is IfCondition:
+        return stmt.expr
+    return None
+
+
+def _field_of(stmt: AST) -> str:
+    return {Assign: "right", ReturnVal: "return_val", IfCondition: "expr"}[type(stmt)]
+
+
+class CommonSubexpressionEliminator(NodeTransformer):
+    """
+    Evaluates operators repeated in a block of a function once: the first one
+    is assigned to a temporary before its statement, the others read the
+    temporary. Occurrences must be in the same straight run of statements,
+    with no assignment to a variable they read in between. Statements with
+    a function call end a run (the callee may assign globals), and so do if
+    statements once their condition is evaluated, the blocks of an if are
+    handled on their own.
+    Temporaries are named _t0, _t1... which no identifier of the language can
+    be. An operator is only hoisted if it can't raise or nothing its statement
+    evaluates before it may, so that the same error is raised first
+    """
+
+    def __init__(self):
+        self.removed = 0
+        # evaluations saved per run of the code
+        self.eliminated = 0
+        self._temporaries = 0
+
+    def leave_Function(self, node: Function) -> Function:
+        # the blocks of the function, in post-order: the global code is left as
+        # it is, its temporaries would be globals
+        blocks = []
+        stack = [(node, False)]
+        while stack:
+            block, ready = stack.pop()
+            if ready:
+                if type(block) in (IfCondition, ElseCondition) or block is node:
+                    blocks.append(block)
+                continue
+            stack.append((block, True))
+            stack += ((child, False) for child in reversed(child_nodes(block)))
+        for block in blocks:
+            block.statements = self._eliminate(block.statements)
+        return node
+
+    def _eliminate(self, statements: List[AST]) -> List[AST]:
+        groups = []
+        # operator -> (group of its occurrences, names it reads), while they keep
+        # their values
+        available = {}
+        for index, stmt in enumerate(statements):
+            expr = _statement_expr(stmt)
+            if expr is None or _has_call(expr):
+                available.clear()
+                continue
+            for occurrence, reads, key in _operators(index, stmt, _field_of(stmt)):
+                entry = available.get(key)
+                if entry is None:
+                    group = [occurrence]
+                    groups.append(group)
+                    available[key] = (group, reads)
+                else:
+                    entry[0].append(occurrence)
+            if type(stmt) is Assign:
+                name = stmt.left.value
+                killed = [
+                    node for node, (_, reads) in available.items() if name in reads
+                ]
+                for node in killed:
+                    del available[node]
+            elif type(stmt) is not ReturnVal:
+                available.clear()
+        return self._rewrite(statements, groups)
+
+    def _rewrite(self, statements: List[AST], groups: List[list]) -> List[AST]:
+        # the biggest operators first, the ones in their later occurrences are gone
+        gone = set()
+        definitions = []
+        for group in sorted(groups, key=lambda group: -group[0].size):
+            live = [
+                occurrence
+                for occurrence in group
+                if id(occurrence.node) not in gone and not occurrence.ancestors & gone
+            ]
+            if len(live) < 2 or not live[0].hoistable:
+                continue
+            gone.update(id(occurrence.node) for occurrence in live[1:])
+            name = f"_t{self._temporaries}"
+            self._temporaries += 1
+            first = live[0]
+            size = first.size
+            definitions.append((first, Assign(_ASSIGN, _temporary(name), first.node)))
+            for occurrence in live:
+                setattr(occurrence.parent, occurrence.field, _temporary(name))
+            self.eliminated += len(live) - 1
+            self.removed += (len(live) - 1) * (size - 1) - 3
+        if not definitions:
+            return statements
+        # before the statement of their first occurrence, the ones nested in others
+        # first
+        definitions.sort(key=lambda item: (item[0].index, -len(item[0].ancestors)))
+        rewritten = []
+        definition = iter(definitions)
+        pending = next(definition, None)
+        for index, stmt in enumerate(statements):
+            while pending is not None and pending[0].index == index:
+                rewritten.append(pending[1])
+                pending = next(definition, None)
+            rewritten.append(stmt)
+        return rewritten
+
+
+_ASSIGN = Token(TT.ASSIGN)
+
+
+def _temporary(name: str) -> Var:
+    return Var(Token.trusted(TT.ID, name))
+
+
+def _has_call(node: AST) -> bool:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if type(node) is FunctionCall:
+            return True
+        stack += child_nodes(node)
+    return False
+
+
+def _operators(index: int, stmt: AST, field: str):
+    """
+    Yield the occurrences of the operators of at least three nodes under
+    getattr(stmt, field), with the names of the variables they read and their
+    _Key, in post-order, the order they are evaluated in
+    """
+    reads = {}
+    sizes = {}
+    hashes = {}
+    # whether a node is known to be an int, and known not to raise (reading
+    # a variable is taken not to)
+    ints = {}
+    safe = {}
+    # operators that may raise evaluated so far, and before each node
+    raising = 0
+    before = {}
+    stack = [(getattr(stmt, field), stmt, field, frozenset(), False)]
+    while stack:
+        node, parent, field, ancestors, ready = stack.pop()
+        node_type = type(node)
+        if not ready:
+            before[id(node)] = raising
+            stack.append((node, parent, field, ancestors, True))
+            if node_type is BinOp:
+                inner = ancestors | {id(node)}
+                stack.append((node.right, node, "right", inner, False))
+                stack.append((node.left, node, "left", inner, False))
+            elif node_type is UnaryOp:
+                stack.append((node.expr, node, "expr", ancestors | {id(node)}, False))
+            continue
+        if node_type is BinOp:
+            left, right = id(node.left), id(node.right)
+            names = reads[left] | reads[right]
+            size = 1 + sizes[left] + sizes[right]
+            is_int = node.op_type in _comparisons or (
+                node.op_type is not TT.DIV and ints[left] and ints[right]
+            )
+            is_safe = safe[left] and safe[right] and ints[left] and ints[right]
+            is_safe = is_safe and node.op_type is not TT.DIV
+        elif node_type is UnaryOp:
+            expr = id(node.expr)
+            names, size = reads[expr], 1 + sizes[expr]
+            is_int = ints[expr]
+            is_safe = ints[expr] and safe[expr]
+        else:
+            names = frozenset([node.value]) if node_type is Var else frozenset()
+            size = _size(node)
+            is_int = node_type is Num and type(node.value) is int
+            is_safe = True
+        reads[id(node)], sizes[id(node)] = names, size
+        ints[id(node)], safe[id(node)] = is_int, is_safe
+        hashes[id(node)] = node_hash(node, lambda child: hashes[id(child)])
+        if node_type in (BinOp, UnaryOp) and not is_safe:
+            raising += 1
+        if node_type in (BinOp, UnaryOp) and size >= 3:
+            hoistable = is_safe or not before[id(node)]
+            occurrence = _Occurrence(
+                index, node, parent, field, ancestors, hoistable, size
+            )
+            yield occurrence, names, _Key(node, hashes[id(node)])
+
+
+def _parsed(function: Function) -> bool:
+    # lazy functions are left out until they are parsed, see Optimizer
+    return getattr(function, "parsed", True)
+
+
+def _walk(node: AST) -> Iterator[AST]:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack += reversed(child_nodes(node))
+
+
+def call_graph(program: Program) -> Dict[str, List[str]]:
+    """
+    Names of the functions each function of program calls, in order of first call,
+    for the functions that are parsed
+    """
+    return {
+        function.name: list(
+            dict.fromkeys(
+                node.name for node in _walk(function) if type(node) is FunctionCall
+            )
+        )
+        for function in program.functions
+        if _parsed(function)
+    }
+
+
+def strongly_connected(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """
+    Strongly connected components of graph (Tarjan's algorithm, without
+    recursion), each one after the ones it leads to
+    """
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: Set[str] = set()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, edges = work[-1]
+            for succ in edges:
+                if succ not in graph:
+                    continue
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(graph[succ])))
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            else:
+                work.pop()
+                if work:
+                    caller = work[-1][0]
+                    low[caller] = min(low[caller], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while not component or component[-1] != node:
+                        component.append(stack.pop())
+                        on_stack.discard(component[-1])
+                    components.append(component)
+    return components
+
+
+class _Inlinable:
+    __slots__ = ("function", "body", "result", "locals", "free", "size")
+
+    def __init__(self, function, body, result, locals, free, size):
+        self.function = function
+        # the statements before the final return and the value it returns, if any
+        self.body: List[AST] = body
+        self.result: Optional[AST] = result
+        # parameters and assigned names, renamed when inlined, and the names read
+        # from the globals
+        self.locals: Set[str] = locals
+        self.free: Set[str] = free
+        self.size = size
+
+
+def _evaluation_order(stmt: AST, field: str) -> Iterator[Tuple[AST, AST, str]]:
+    """
+    Yield (node, parent, field) for the nodes under getattr(stmt, field) in the
+    order ASTVisitor evaluates them, the arguments of a call are its own
+    """
+    stack = [(getattr(stmt, field), stmt, field, False)]
+    while stack:
+        node, parent, field, ready = stack.pop()
+        node_type = type(node)
+        if not ready and node_type in (BinOp, UnaryOp):
+            stack.append((node, parent, field, True))
+            if node_type is BinOp:
+                stack.append((node.right, node, "right", False))
+                stack.append((node.left, node, "left", False))
+            else:
+                stack.append((node.expr, node, "expr", False))
+            continue
+        yield node, parent, field
+
+
+class Inliner(NodeTransformer):
+    """
+    Replaces the calls of a program to small functions by their statements: the
+    arguments are assigned to the renamed parameters, the statements run and
+    the call becomes the expression returned.
+    A function can be inlined if it is not (mutually) recursive, has at most
+    max_size nodes, returns only in its last statement and does not assign
+    globals. Its locals are renamed _<function>_<n>_<name>, which no identifier
+    of the language can be. Calls are inlined in the callees before the
+    callers, as long as a caller has at most max_caller_size nodes.
+    The statements of the callee now run before the statement of the call, so
+    what the statement evaluates before the call must not raise or be changed
+    by them: only literals and the locals of the caller, not the ones of an
+    inlined function which may not be set
+    """
+
+    def __init__(self, max_size: int = 48, max_caller_size: int = 1024):
+        self.max_size = max_size
+        self.max_caller_size = max_caller_size
+        self.removed = 0
+        self.inlined = 0
+        # renamed local -> its name in the source
+        self.renamed: Dict[str, str] = {}
+        self._count = 0
+
+    def leave_Program(self, program: Program) -> Program:
+        functions = {function.name: function for function in program.functions}
+        if len(functions) != len(program.functions):
+            # left to the interpreter to report
+            return program
+        self._functions = {
+            name: function for name, function in functions.items() if _parsed(function)
+        }
+        self._globals = global_names(program)
+        self._inlinable: Dict[str, Optional[_Inlinable]] = {}
+        self._recursive = set()
+        graph = call_graph(program)
+        for component in strongly_connected(graph):
+            if len(component) > 1 or component[0] in graph[component[0]]:
+                self._recursive.update(component)
+            for name in component:
+                self._inline_calls(self._functions[name])
+        return program
+
+    def _inline_calls(self, function: Function) -> None:
+        self._caller_locals = {arg.value for arg in function.args}
+        self._caller_locals.update(
+            node.left.value for node in _walk(function) if type(node) is Assign
+        )
+        self._caller_size = _size(function)
+        function.statements = self._inline_block(function.statements)
+
+    def _inline_block(self, statements: List[AST]) -> List[AST]:
+        inlined = []
+        for stmt in statements:
+            inlined += self._inline_statement(stmt)
+            if type(stmt) is IfCondition:
+                stmt.statements = self._inline_block(stmt.statements)
+                if stmt.follow_else is not None:
+                    else_ = stmt.follow_else
+                    else_.statements = self._inline_block(else_.statements)
+        return inlined
+
+    def _inline_statement(self, stmt: AST) -> List[AST]:
+        """
+        stmt with the calls it makes inlined, preceded by the inlined statements
+        """
+        if type(stmt) is FunctionCall:
+            callee = self._callee(stmt)
+            if callee is None:
+                return [stmt]
+            prefix = self._prefix(callee)
+            statements, result = self._expand(stmt, callee, prefix)
+            if result is not None:
+                # still evaluated, for its errors
+                statements.append(Assign(_ASSIGN, _temporary(prefix), result))
+            self._account(stmt, statements)
+            return statements
+        if type(stmt) not in (Assign, ReturnVal, IfCondition):
+            return [stmt]
+        before = []
+        while True:
+            site = self._next_site(stmt)
+            if site is None:
+                return before + [stmt]
+            call, parent, field, callee = site
+            statements, result = self._expand(call, callee, self._prefix(callee))
+            setattr(parent, field, result)
+            self._account(call, statements + [result])
+            before += statements
+
+    def _next_site(self, stmt: AST):
+        """
+        (call, parent, field, callee) of the first call stmt evaluates if it can be
+        inlined there
+        """
+        for node, parent, field in _evaluation_order(stmt, _field_of(stmt)):
+            node_type = type(node)
+            if node_type is Var and (
+                node.value in self._globals or node.value in self.renamed
+            ):
+                return None
+            if node_type in (BinOp, UnaryOp):
+                return None
+            if node_type is FunctionCall:
+                callee = self._callee(node)
+                if callee is None or callee.result is None:
+                    return None
+                return node, parent, field, callee
+        return None
+
+    def _callee(self, call: FunctionCall) -> Optional[_Inlinable]:
+        name = call.name
+        if name in ("print", "main") or name in self._recursive:
+            return None
+        function = self._functions.get(name)
+        if function is None or len(call.args) != len(function.args):
+            return None
+        if name not in self._inlinable:
+            self._inlinable[name] = self._analyze(function)
+        callee = self._inlinable[name]
+        if callee is None or callee.free & self._caller_locals:
+            return None
+        if self._caller_size + callee.size > self.max_caller_size:
+            return None
+        return callee
+
+    def _analyze(self, function: Function) -> Optional[_Inlinable]:
+        body = [stmt for stmt in function.statements if type(stmt) is not NoOp]
+        result = None
+        if body and type(body[-1]) is ReturnVal:
+            result = body.pop().return_val
+        nodes = [node for stmt in body for node in _walk(stmt)]
+        if result is not None:
+            nodes += _walk(result)
+        if len(nodes) > self.max_size or any(type(n) is ReturnVal for n in nodes):
+            return None
+        assigned = {node.left.value for node in nodes if type(node) is Assign}
+        if assigned & self._globals:
+            return None
+        locals = assigned | {arg.value for arg in function.args}
+        free = {node.value for node in nodes if type(node) is Var} - locals
+        return _Inlinable(function, body, result, locals, free, len(nodes))
+
+    def _prefix(self, callee: _Inlinable) -> str:
+        self._count += 1
+        return f"_{callee.function.name}_{self._count - 1}_"
+
+    def _expand(self, call: FunctionCall, callee: _Inlinable, prefix: str):
+        """
+        Statements assigning the arguments of call and running the body of
+        callee with its locals renamed with prefix, and the expression it returns
+        """
+        self.inlined += 1
+        body, result = copy.deepcopy((callee.body, callee.result))
+        names = {name: prefix + name for name in callee.locals}
+        for name, renamed in names.items():
+            self.renamed[renamed] = self.renamed.get(name, name)
+        for root in body + ([result] if result is not None else []):
+            for node in _walk(root):
+                if type(node) is Var and node.value in names:
+                    node.value = names[node.value]
+        arguments = [
+            Assign(_ASSIGN, _temporary(names[param.value]), copy.copy(arg))
+            for param, arg in zip(callee.function.args, call.args)
+        ]
+        return arguments + body, result
+
+    def _account(self, replaced: AST, nodes: List[AST]) -> None:
+        added = sum(map(_size, nodes)) - _size(replaced)
+        self._caller_size += added
+        self.removed -= added
+
+
+class _Propagator(ConstantFolder):
+    """
+    ConstantFolder that also replaces the variables bound in env by their
+    literal, the names it leaves are added to read
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.env: Dict[str, AST] = {}
+        self.read: Set[str] = set()
+
+    def leave_Var(self, node: Var) -> AST:
+        literal = self.env.get(node.value)
+        if literal is None:
+            self.read.add(node.value)
+            return node
+        return copy.copy(literal)
+
+
+class Specializer(NodeTransformer):
+    """
+    Clones functions for the literal arguments they are called with: f(1, a)
+    becomes f_0(a), f_0 being f with the reads of its first parameter replaced
+    by 1 and the constants propagated and folded through its statements. The
+    calls with the same literals share a clone, a function of at most max_size
+    nodes gets at most max_clones of them. Clones are specialized in turn.
+    A parameter the clone still reads, once assigned or after a branch that
+    may assign it, stays a parameter. No identifier of the language has an
+    underscore, f_0 is not a function of the program
+    """
+
+    def __init__(self, max_size: int = 256, max_clones: int = 8):
+        self.max_size = max_size
+        self.max_clones = max_clones
+        self.removed = 0
+        self.specialized = 0
+
+    def leave_Program(self, program: Program) -> Program:
+        functions = {function.name: function for function in program.functions}
+        if len(functions) != len(program.functions):
+            # left to the interpreter to report
+            return program
+        self._functions = {
+            name: function for name, function in functions.items() if _parsed(function)
+        }
+        self._globals = global_names(program)
+        # a function whose name is assigned may not be called
+        self._assigned = {
+            node.left.value
+            for root in [*self._functions.values(), *program.statements]
+            for node in _walk(root)
+            if type(node) is Assign
+        }
+        # (function name, (position, type, value) of the literal arguments)
+        # -> clone, positions of the arguments it still takes
+        self._clones: Dict[tuple, Tuple[Function, List[int]]] = {}
+        self._count: Dict[str, int] = {}
+        self._propagator = _Propagator()
+        index = 0
+        while index < len(program.functions):
+            function = program.functions[index]
+            calls = [
+                node
+                for node in (_walk(function) if _parsed(function) else ())
+                if type(node) is FunctionCall
+            ]
+            for call in calls:
+                clone = self._specialize(call)
+                if clone is not None:
+                    program.functions.append(clone)
+            index += 1
+        self.removed += self._propagator.removed
+        return program
+
+    def _specialize(self, call: FunctionCall) -> Optional[Function]:
+        """
+        Makes call call its clone for its literal arguments, the clone if it is new
+        """
+        name = call.name
+        function = self._functions.get(name)
+        if function is None or name in ("print", "main") or name in self._assigned:
+            return None
+        if len(call.args) != len(function.args):
+            return None
+        key = (
+            name,
+            tuple(
+                (position, type(arg.value), arg.value)
+                for position, arg in enumerate(call.args)
+                if _is_literal(arg)
+            ),
+        )
+        if not key[1]:
+            return None
+        new = None
+        if key not in self._clones:
+            new = self._clone(function, call)
+            if new is None:
+                return None
+            self._clones[key] = new
+        clone, kept = self._clones[key]
+        self.specialized += 1
+        self.removed += len(call.args) - len(kept)
+        call.name = clone.name
+        call.args = [call.args[position] for position in kept]
+        return new and clone
+
+    def _clone(self, function: Function, call: FunctionCall):
+        """
+        (clone of function for the literal arguments of call, positions of the
+        arguments it still takes)
+        """
+        count = self._count.get(function.name, 0)
+        if count >= self.max_clones or _size(function) > self.max_size:
+            return None
+        params = [arg.value for arg in function.args]
+        if len(set(params)) != len(params):
+            return None
+        self._count[function.name] = count + 1
+        env = {
+            param: arg for param, arg in zip(params, call.args) if _is_literal(arg)
+        }
+        self._propagator.read = set()
+        statements = copy.deepcopy(function.statements)
+        self._propagate(statements, dict(env))
+        kept = [
+            position
+            for position, param in enumerate(params)
+            if param not in env or param in self._propagator.read
+        ]
+        clone = Function(
+            Token.trusted(TT.ID, f"{function.name}_{count}"),
+            [copy.copy(function.args[position]) for position in kept],
+            statements,
+        )
+        self.removed -= _size(clone)
+        return clone, kept
+
+    def _propagate(self, statements: List[AST], env: Dict[str, AST]) -> Dict[str, AST]:
+        """
+        Propagates the literals env binds names to through statements, env
+        updated with the locals they assign, as it is after them
+        """
+        propagator = self._propagator
+        for stmt in statements:
+            stmt_type = type(stmt)
+            propagator.env = env
+            if stmt_type is FunctionCall:
+                stmt.args = [propagator.transform(arg) for arg in stmt.args]
+            elif stmt_type in (Assign, ReturnVal, IfCondition):
+                field = _field_of(stmt)
+                setattr(stmt, field, propagator.transform(getattr(stmt, field)))
+            if stmt_type is Assign:
+                name = stmt.left.value
+                env.pop(name, None)
+                # assigning a global leaves a parameter of the same name as it is
+                if name not in self._globals and _is_literal(stmt.right):
+                    env[name] = stmt.right
+            elif stmt_type is IfCondition:
+                blocks = [stmt.statements]
+                if stmt.follow_else is not None:
+                    blocks.append(stmt.follow_else.statements)
+                # the literals the blocks that do not return agree on
+                ends = [dict(env)] if len(blocks) == 1 else []
+                for block in blocks:
+                    block_env = self._propagate(block, dict(env))
+                    if not any(map(_returns, block)):
+                        ends.append(block_env)
+                env.clear()
+                if ends:
+                    env.update(
+                        (name, literal)
+                        for name, literal in ends[0].items()
+                        if all(end.get(name) == literal for end in ends[1:])
+                    )
+        return env
+
+
+class Definition:
+    """
+    A value of a local in SSA form: a parameter, an assignment or the phi of
+    the values the branches of an if leave it with. value is the literal it
+    always is, defined whether it is set on every path, copy_of the definition
+    it copies
+    """
+
+    __slots__ = ("name", "assign", "operands", "value", "defined", "copy_of")
+
+    def __init__(
+        self,
+        name: str,
+        assign: Optional[Assign] = None,
+        operands: List[Optional["Definition"]] = (),
+        value: Optional[AST] = None,
+        defined: bool = True,
+        copy_of: Optional["Definition"] = None,
+    ):
+        self.name = name
+        self.assign = assign
+        # None where the branch does not define the local
+        self.operands = operands
+        self.value = value
+        self.defined = defined
+        self.copy_of = copy_of
+
+    def __repr__(self):
+        return f"{Definition.__name__}({self.name}, {self.value})"
+
+
+class _Use:
+    __slots__ = ("parent", "field", "definition", "source", "root")
+
+    def __init__(self, parent, field, definition, source, root):
+        # the Var at parent[field] or getattr(parent, field) reads definition,
+        # which copies source there, in the expression of root
+        self.parent, self.field = parent, field
+        self.definition, self.source = definition, source
+        self.root = root
+
+
+class SSAFunction:
+    """
+    The statements of a function in SSA form: each assignment of a local is
+    a Definition, each read of a local is resolved to the definition it sees
+    and phis merge the definitions the branches of an if leave.
+    Sparse conditional constant propagation computes the values while the
+    form is built: without loops one pass in order is enough. A branch its
+    condition does not take and what follows a return do not reach the phis
+    and their reads are not resolved.
+    Globals, the names in global_names, stay out of the form: calls may assign
+    them and assigning one does not change the parameter of the same name
+    """
+
+    def __init__(self, function: Function, global_names: Set[str]):
+        self.globals = global_names
+        self.uses: List[_Use] = []
+        # (parent, field, value) of the expressions of the statements
+        self.roots: List[tuple] = []
+        # id of an Assign -> the definition it makes
+        self.definitions: Dict[int, Definition] = {}
+        self.phis: List[Definition] = []
+        env = {
+            arg.value: Definition(arg.value)
+            for arg in function.args
+            if arg.value not in global_names
+        }
+        self._block(function.statements, env)
+
+    def _block(self, statements: List[AST], env: Dict[str, Definition]) -> bool:
+        """
+        Whether running statements may go past them, env is then updated
+        """
+        for stmt in statements:
+            stmt_type = type(stmt)
+            if stmt_type is FunctionCall:
+                for index in range(len(stmt.args)):
+                    self._evaluate(stmt.args, index, env)
+            elif stmt_type is Assign:
+                value = self._evaluate(stmt, "right", env)
+                name = stmt.left.value
+                if name in self.globals:
+                    continue
+                copy_of = None
+                if self.uses and self.uses[-1].parent is stmt:
+                    source = self.uses[-1].source
+                    if source is not None and source.defined:
+                        copy_of = source
+                definition = Definition(name, stmt, value=value, copy_of=copy_of)
+                env[name] = self.definitions[id(stmt)] = definition
+            elif stmt_type is ReturnVal:
+                self._evaluate(stmt, "return_val", env)
+                return False
+            elif stmt_type is IfCondition and not self._if(stmt, env):
+                return False
+        return True
+
+    def _if(self, stmt: IfCondition, env: Dict[str, Definition]) -> bool:
+        condition = self._evaluate(stmt, "expr", env)
+        else_ = stmt.follow_else.statements if stmt.follow_else is not None else []
+        ends = []
+        for statements, taken in ((stmt.statements, True), (else_, False)):
+            if condition is not None and bool(condition.value) is not taken:
+                continue
+            branch = dict(env)
+            if self._block(statements, branch):
+                ends.append(branch)
+        if not ends:
+            return False
+        merged = {}
+        for name in set().union(*ends):
+            operands = [end.get(name) for end in ends]
+            first = operands[0]
+            if all(operand is first for operand in operands):
+                merged[name] = first
+                continue
+            defined = all(
+                operand is not None and operand.defined for operand in operands
+            )
+            value = None
+            if defined and all(
+                operand.value is not None and operand.value == first.value
+                for operand in operands
+            ):
+                value = first.value
+            phi = Definition(name, operands=operands, value=value, defined=defined)
+            self.phis.append(phi)
+            merged[name] = phi
+        env.clear()
+        env.update(merged)
+        return True
+
+    def _evaluate(self, parent, field, env: Dict[str, Definition]) -> Optional[AST]:
+        """
+        The literal the expression at parent[field] or getattr(parent, field)
+        evaluates to, if it is one, its reads resolved in env
+        """
+        root = len(self.roots)
+        values = {}
+        stack = [(_get(parent, field), parent, field, False)]
+        while stack:
+            node, parent_, field_, ready = stack.pop()
+            node_type = type(node)
+            if not ready and node_type in (BinOp, UnaryOp, FunctionCall):
+                stack.append((node, parent_, field_, True))
+                if node_type is BinOp:
+                    stack.append((node.right, node, "right", False))
+                    stack.append((node.left, node, "left", False))
+                elif node_type is UnaryOp:
+                    stack.append((node.expr, node, "expr", False))
+                else:
+                    stack += (
+                        (arg, node.args, index, False)
+                        for index, arg in reversed(list(enumerate(node.args)))
+                    )
+                continue
+            value = None
+            if node_type in (Num, String):
+                value = node
+            elif node_type is Var and node.value not in self.globals:
+                definition = source = env.get(node.value)
+                while (
+                    source is not None
+                    and source.copy_of is not None
+                    and env.get(source.copy_of.name) is source.copy_of
+                ):
+                    source = source.copy_of
+                self.uses.append(_Use(parent_, field_, definition, source, root))
+                if definition is not None and definition.defined:
+                    value = definition.value
+            elif node_type is BinOp:
+                left, right = values[id(node.left)], values[id(node.right)]
+                if left is not None and right is not None:
+                    value = _fold_binary(node.op_type, left.value, right.value)
+            elif node_type is UnaryOp and values[id(node.expr)] is not None:
+                operand = values[id(node.expr)].value
+                try:
+                    value = _literal(_unary_ops[node.op_type](operand))
+                except TypeError:
+                    value = None
+            values[id(node)] = value
+        value = values[id(_get(parent, field))]
+        self.roots.append((parent, field, value))
+        return value
+
+
+def _get(parent, field) -> AST:
+    return parent[field] if type(field) is int else getattr(parent, field)
+
+
+def _set(parent, field, node: AST) -> None:
+    if type(field) is int:
+        parent[field] = node
+    else:
+        setattr(parent, field, node)
+
+
+class ConstantPropagator(NodeTransformer):
+    """
+    Propagates constants and copies through the locals of the functions of a
+    program, in SSA form (see SSAFunction). The reads of a local that is
+    always a literal become the literal, as do the expressions that only
+    read literals, and the reads of a copy become reads of the local copied
+    while it is unchanged. Assignments of a literal or a copy that nothing
+    reads anymore are removed, such locals are no longer set at run time, and
+    so is the code that never runs
+    """
+
+    def __init__(self):
+        self.removed = 0
+        self.propagated = 0
+
+    def leave_Program(self, program: Program) -> Program:
+        names = global_names(program)
+        for function in filter(_parsed, program.functions):
+            self._propagate(function, SSAFunction(function, names))
+        return program
+
+    def _propagate(self, function: Function, ssa: SSAFunction) -> None:
+        folded = set()
+        for index, (parent, field, value) in enumerate(ssa.roots):
+            node = _get(parent, field)
+            if value is not None and not _is_literal(node):
+                self.removed += _size(node) - 1
+                _set(parent, field, copy.copy(value))
+                folded.add(index)
+        # the definition each remaining read reads, by the definition of the
+        # assignment it is in, for those that can be removed
+        reads: Dict[int, List[Definition]] = {}
+        # locals read where they are not set, which must stay locals for the
+        # read to raise (see resolver)
+        unset = set()
+        for use in ssa.uses:
+            if use.root in folded:
+                continue
+            definition, source = use.definition, use.source
+            if definition is None:
+                unset.add(_get(use.parent, use.field).value)
+            if definition is not None and definition.value is not None:
+                self.propagated += 1
+                _set(use.parent, use.field, copy.copy(definition.value))
+                continue
+            if source is not definition:
+                self.propagated += 1
+                _set(use.parent, use.field, _temporary(source.name))
+            owner = ssa.definitions.get(id(use.parent))
+            key = id(owner) if owner is not None and owner.copy_of is not None else None
+            reads.setdefault(key, []).append(source)
+        # definitions that may be read, from the reads that stay
+        live = set()
+        work = list(reads.get(None, []))
+        while work:
+            definition = work.pop()
+            if definition is None or id(definition) in live:
+                continue
+            live.add(id(definition))
+            work += definition.operands
+            work += reads.get(id(definition), [])
+        dead = {
+            id(definition.assign)
+            for definition in ssa.definitions.values()
+            if id(definition) not in live
+            and (definition.value is not None or definition.copy_of is not None)
+            and definition.name not in unset
+        }
+        for node in _walk(function):
+            if isinstance(node, (Function, IfCondition, ElseCondition)):
+                statements = node.statements
+                self.removed += sum(_size(s) for s in statements if id(s) in dead)
+                node.statements = [s for s in statements if id(s) not in dead]
+        # the code that never runs still reads the definitions removed
+        eliminator = DeadCodeEliminator()
+        eliminator.transform(function)
+        self.removed += eliminator.removed
+
+
+class Optimizer:
+    """
+    Runs the passes of an optimization level over programs, functions or
+    statements, counting the nodes they remove:
+      0: nothing
+      1: constant folding and dead code elimination
+      2: specialization, inlining and constant propagation, then the passes
+         of level 1 with algebraic simplification, then common subexpression
+         elimination
+    Nodes are rewritten in place. The lazy functions that are not parsed yet
+    are left out, and left for optimize() to be called on them once parsed
+    """
+
+    def __init__(self, level: int = 1):
+        if not 0 <= level <= MAX_LEVEL:
+            raise ValueError(f"optimization level {level} not in 0..{MAX_LEVEL}")
+        self.level = level
+        self.removed = 0
+        # evaluations saved by common subexpression elimination
+        self.eliminated = 0
+        # locals renamed by inlining -> their name in the source
+        self.names: Dict[str, str] = {}
+
+    def _passes(self) -> List[NodeTransformer]:
+        passes = []
+        if self.level >= 2:
+            passes.append(Specializer())
+            passes.append(Inliner())
+            passes.append(ConstantPropagator())
+        if self.level >= 1:
+            passes.append(ConstantFolder(simplify=self.level >= 2))
+            passes.append(DeadCodeEliminator())
+        if self.level >= 2:
+            passes.append(CommonSubexpressionEliminator())
+        return passes
+
+    def optimize(self, node: AST) -> Union[AST, List[AST]]:
+        """
+        Optimized node, a statement may become a list of statements
+        """
+        if isinstance(node, Function) and not _parsed(node):
+            return node
+        nodes = [node]
+        for optimization in self._passes():
+            if type(node) is Program:
+                self._transform_program(optimization, node)
+            else:
+                nodes = _replace_items(map(optimization.transform, nodes))
+            self.removed += optimization.removed
+            self.eliminated += getattr(optimization, "eliminated", 0)
+            self.names.update(getattr(optimization, "renamed", {}))
+        return nodes[0] if len(nodes) == 1 else nodes
+
+    @staticmethod
+    def _transform_program(optimization: NodeTransformer, program: Program) -> None:
+        # transform(program) without walking into the functions not parsed
+        transform = optimization.transform
+        program.functions = _replace_items(
+            transform(function) if _parsed(function) else function
+            for function in program.functions
+        )
+        program.statements = _replace_items(map(transform, program.statements))
+        leave = getattr(optimization, "leave_Program", None)
+        if leave is not None:
+            leave(program)
+
+    def __str__(self):
+        return f"{Optimizer.__name__}(level {self.level}, {self.removed} nodes removed)"
+
+    def __repr__(self):
+        return self.__str__()
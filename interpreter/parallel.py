@@ -0,0 +1,179 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from os import cpu_count
+from typing import List, Optional, Tuple, Union
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser, without_eols
+from interpreter.tokenizer import Token, TokenTypes, valueless_tokens
+from interpreter.token_buffer import TokenBuffer
+from interpreter.ast import AST, Function, Program
+
+
+# inputs smaller than this are not worth shipping to another process
+MIN_CHUNK_SIZE = 1 << 20
+MIN_CHUNK_TOKENS = 1 << 16
+
+
+def split_source(buffer: str, chunks: int) -> List[int]:
+    """
+    Offsets cutting buffer in about chunks pieces, right after newlines that are
+    not inside a string literal. The lexer has no state besides its position, so
+    each piece can be lexed on its own
+    """
+    bounds = [0]
+    quotes, counted = 0, 0
+    for target in range(1, chunks):
+        pos = max(len(buffer) * target // chunks, bounds[-1])
+        while True:
+            pos = buffer.find("\n", pos)
+            if pos < 0:
+                break
+            quotes += buffer.count('"', counted, pos)
+            counted = pos
+            pos += 1
+            if not quotes % 2:
+                break
+        if pos < 0 or pos >= len(buffer):
+            break
+        if pos > bounds[-1]:
+            bounds.append(pos)
+    bounds.append(len(buffer))
+    return bounds
+
+
+def _lex_chunk(chunk: str) -> Optional[bytes]:
+    try:
+        return Lexer(chunk).get_token_buffer().to_bytes()
+    except Exception:
+        # the parent lexes again to report the same error as get_tokens()
+        return None
+
+
+def lex_parallel(
+    buffer: str,
+    executor: Optional[Executor] = None,
+    workers: Optional[int] = None,
+    min_chunk_size: int = MIN_CHUNK_SIZE,
+) -> List[Token]:
+    """
+    Same tokens as Lexer(buffer).get_tokens(), lexing pieces of buffer in a pool
+    of processes
+    """
+    workers = workers or cpu_count() or 1
+    chunks = min(workers, len(buffer) // max(min_chunk_size, 1))
+    if chunks < 2:
+        return Lexer(buffer).get_tokens()
+
+    bounds = split_source(buffer, chunks)
+    pieces = [buffer[start:end] for start, end in zip(bounds, bounds[1:])]
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=len(pieces)) as executor:
+            results = list(executor.map(_lex_chunk, pieces))
+    else:
+        results = list(executor.map(_lex_chunk, pieces))
+
+    tokens = []
+    for start, data in zip(bounds, results):
+        if data is None:
+            lexer = Lexer(buffer)
+            lexer._pos = start
+            lexer.get_tokens()
+            raise RuntimeError("chunk failed to lex on its own")
+        tokens.extend(TokenBuffer.from_bytes(data)[:-1])
+    tokens.append(valueless_tokens[TokenTypes.EOF])
+    return tokens
+
+
+def split_functions(tokens: Union[List[Token], TokenBuffer], chunks: int) -> List[int]:
+    """
+    Indexes cutting EOL-free tokens in about chunks pieces, each but the first
+    starting with a function declared at brace depth zero
+    """
+    starts, depth = [], 0
+    for index, token in enumerate(tokens):
+        kind = token._type
+        if kind is TokenTypes.LBRACE:
+            depth += 1
+        elif kind is TokenTypes.RBRACE:
+            depth -= 1
+        elif kind is TokenTypes.FUNCTION and depth <= 0:
+            starts.append(index)
+
+    bounds = [0]
+    for start in starts:
+        if start * chunks >= len(tokens) * len(bounds) and start > bounds[-1]:
+            bounds.append(start)
+    bounds.append(len(tokens))
+    return bounds
+
+
+def _parse_functions(parser: ASTParser, functions: List[Function]) -> None:
+    # the loop of ASTParser.program() after the global statements
+    while parser.current_token.type == TokenTypes.FUNCTION:
+        functions.append(parser.function())
+        parser.statements_list()
+
+
+def _parse_chunk(
+    data: bytes, first: bool
+) -> Optional[Tuple[Optional[List[AST]], List[Function], bool]]:
+    """
+    Global statements when first, functions, and whether the whole chunk was
+    parsed. None if parsing failed
+    """
+    try:
+        parser = ASTParser(TokenBuffer.from_bytes(data))
+        statements = parser.statements_list() if first else None
+        functions = []
+        _parse_functions(parser, functions)
+        return statements, functions, parser.current_token.type == TokenTypes.EOF
+    except Exception:
+        # the parent parses again to report the same error as program()
+        return None
+
+
+def parse_parallel(
+    tokens: Union[List[Token], TokenBuffer],
+    executor: Optional[Executor] = None,
+    workers: Optional[int] = None,
+    min_chunk_tokens: int = MIN_CHUNK_TOKENS,
+) -> Program:
+    """
+    Same program as ASTParser(tokens).program(), parsing runs of top-level
+    functions in a pool of processes
+    """
+    workers = workers or cpu_count() or 1
+    filtered = without_eols(tokens)
+    chunks = min(workers, len(filtered) // max(min_chunk_tokens, 1))
+    if chunks < 2:
+        return ASTParser(tokens).program()
+
+    bounds = split_functions(filtered, chunks)
+    eof = [valueless_tokens[TokenTypes.EOF]]
+    pieces = [
+        TokenBuffer.from_tokens(list(filtered[start:end]) + eof).to_bytes()
+        for start, end in zip(bounds, bounds[1:])
+    ]
+    firsts = [index == 0 for index in range(len(pieces))]
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=len(pieces)) as executor:
+            results = list(executor.map(_parse_chunk, pieces, firsts))
+    else:
+        results = list(executor.map(_parse_chunk, pieces, firsts))
+
+    statements, functions = None, []
+    for start, result in zip(bounds, results):
+        if result is None:
+            parser = ASTParser(tokens)
+            parser._tok_idx = start
+            if start == 0:
+                parser.statements_list()
+            _parse_functions(parser, [])
+            raise RuntimeError("chunk failed to parse on its own")
+        chunk_statements, chunk_functions, complete = result
+        if chunk_statements is not None:
+            statements = chunk_statements
+        functions += chunk_functions
+        if not complete:
+            # program() stops on the first token that doesn't start a function
+            break
+    return Program(functions, statements)
@@ -1,6 +1,7 @@
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Iterable, Iterator
 from interpreter.lexer import Lexer
 from interpreter.tokenizer import Token as Token, TokenTypes as TT
+from interpreter.token_buffer import TokenBuffer
 from interpreter.exceptions import ParserError
 from interpreter.ast import (
     AST,
@@ -20,11 +21,140 @@ from interpreter.ast import (
 )
 
 
+# how tight binary operators bind, unary plus and minus bind tighter than all of them
+binary_op_precedence = {
+    TT.EQ: 1,
+    TT.LT: 1,
+    TT.LE: 1,
+    TT.GT: 1,
+    TT.GE: 1,
+    TT.PLUS: 2,
+    TT.MINUS: 2,
+    TT.MUL: 3,
+    TT.DIV: 3,
+}
+PREFIX_PRECEDENCE = 4
+
+
+class TokenStream:
+    """
+    Indexable view of a token iterator, without its EOL tokens. Tokens are pulled
+    from the iterator as they are indexed and forgotten once released
+    """
+
+    def __init__(self, tokens: Iterable[Token]):
+        self._iterator = iter(tokens)
+        self._window: List[Token] = []
+        self._lines: List[int] = []
+        self._line = 1
+        self._base = 0
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Token, List[Token]]:
+        if isinstance(index, slice):
+            if index.stop > index.start:
+                self[index.stop - 1]
+            if index.start < self._base:
+                raise IndexError(f"token {index.start} was released")
+            return self._window[index.start - self._base : index.stop - self._base]
+        index -= self._base
+        if index < 0:
+            raise IndexError(f"token {index + self._base} was released")
+        while index >= len(self._window):
+            token = next(self._iterator, None)
+            if token is None:
+                raise IndexError("token index out of range")
+            if token._type is TT.EOL:
+                self._line += 1
+                continue
+            self._window.append(token)
+            self._lines.append(self._line)
+        return self._window[index]
+
+    def line(self, index: int) -> int:
+        self[index]
+        return self._lines[index - self._base]
+
+    def release(self, index: int) -> None:
+        """
+        Forget the tokens before index
+        """
+        count = index - self._base
+        if count > 0:
+            del self._window[:count]
+            del self._lines[:count]
+            self._base = index
+
+
+def without_eols(
+    tokens: Union[List[Token], TokenBuffer, TokenStream]
+) -> Union[List[Token], TokenBuffer, TokenStream]:
+    if isinstance(tokens, TokenBuffer):
+        return tokens.without(TT.EOL)
+    if isinstance(tokens, TokenStream):
+        return tokens
+    return [token for token in tokens if token._type is not TT.EOL]
+
+
+class LazyFunction(Function):
+    """
+    Function whose body is parsed from its tokens the first time its statements
+    are read. Errors in the body are only reported then
+    """
+
+    __slots__ = ("_statements", "_body")
+
+    def __init__(self, id: Token, args: List[Var], body: Union[List[Token], TokenBuffer]):
+        super().__init__(id, args, None)
+        # the tokens of the body, closing brace included
+        self._body = body
+
+    @property
+    def parsed(self) -> bool:
+        return self._body is None
+
+    @property
+    def statements(self) -> List[AST]:
+        if self._body is not None:
+            parser = _FunctionBodyParser(self._body, self.name)
+            statements = parser.statements_list()
+            parser._eat(TT.RBRACE)
+            self.statements = statements
+        return self._statements
+
+    @statements.setter
+    def statements(self, statements: List[AST]) -> None:
+        self._statements = statements
+        self._body = None
+
+
 class ASTParser:
-    def __init__(self, tokens: List[Token]):
-        self._tokens = tokens
+    def __init__(
+        self, tokens: Union[List[Token], TokenBuffer, TokenStream], lazy: bool = False
+    ):
+        # newlines mean nothing to the grammar: they are dropped once here and only
+        # counted again to tell the line of an error
+        self._source_tokens = tokens
+        self._tokens = without_eols(tokens)
         self._tok_idx = 0
         self._unary_multiplier = 1
+        # with lazy, function bodies are only matched for braces until they are used
+        self._lazy = lazy
+
+    def _line(self) -> int:
+        if isinstance(self._tokens, TokenStream):
+            return self._tokens.line(self._tok_idx)
+        line, seen = 1, 0
+        for token in self._source_tokens:
+            if token.type == TT.EOL:
+                line += 1
+            elif seen == self._tok_idx:
+                break
+            else:
+                seen += 1
+        return line
+
+    def _error(self, msg: str) -> ParserError:
+        return ParserError(f"{msg} (line {self._line()})")
 
     @property
     def current_token(self):
@@ -35,105 +165,121 @@ class ASTParser:
             raise IndexError(
                 f"{ASTParser.__name__}.{ASTParser._peek.__name__}() can only peek forward"
             )
-        if self._tok_idx + offset >= len(self._tokens):
+        try:
+            return self._tokens[self._tok_idx + offset]
+        except IndexError:
             return None
-        return self._tokens[self._tok_idx + offset]
+
+    def _release_tokens(self) -> None:
+        if isinstance(self._tokens, TokenStream):
+            self._tokens.release(self._tok_idx)
 
     def _eat(self, type: TT) -> None:
         if self.current_token.type != type:
-            raise ParserError(
+            raise self._error(
                 f"trying to eat token type of {type}. Current token type is {self.current_token}"
             )
         else:
             self._tok_idx += 1
 
-    def _skip_eols(self):
-        while self.current_token.type == TT.EOL:
-            self._eat(TT.EOL)
-
     def return_value(self) -> AST:
-        self._skip_eols()
         self._eat(TT.RETURN)
-        self._skip_eols()
         return ReturnVal(self.expr())
 
-    def factor(self) -> AST:
-        self._skip_eols()
+    def _primary(self) -> AST:
         curr_token = self.current_token
-        if curr_token.type == TT.LPAREN:
-            self._eat(TT.LPAREN)
-            node = self.expr()
-            self._eat(TT.RPAREN)
-            return node
-        elif curr_token.type == TT.PLUS:
-            self._eat(TT.PLUS)
-            node = UnaryOp(curr_token, self.factor())
-            return node
-        elif curr_token.type == TT.MINUS:
-            self._eat(TT.MINUS)
-            node = UnaryOp(curr_token, self.factor())
-            return node
-        elif curr_token.type == TT.INTEGER:
+        if curr_token.type == TT.INTEGER:
             self._eat(TT.INTEGER)
             return Num(Token(TT.INTEGER, curr_token.value * self._unary_multiplier))
         elif curr_token.type == TT.STRING:
             self._eat(TT.STRING)
             return String(curr_token)
         elif curr_token.type == TT.ID:
-            self._skip_eols()
             if self._peek().type == TT.LPAREN:
                 return self.function_call()
             else:
                 return self.variable()
 
-        self._skip_eols()
-        raise ParserError("parsing was stopped due to invalid token")
+        raise self._error("parsing was stopped due to invalid token")
+
+    @staticmethod
+    def _reduce(operands: List[AST], operators: List[tuple], precedence: int) -> None:
+        """
+        Pop operators binding at least as tight as precedence, building their nodes
+        """
+        while operators and operators[-1][0] >= precedence:
+            op_precedence, op = operators.pop()
+            if op_precedence == PREFIX_PRECEDENCE:
+                operands[-1] = UnaryOp(op, operands[-1])
+            else:
+                right = operands.pop()
+                operands[-1] = BinOp(op, operands[-1], right)
+
+    def _expression(self, min_precedence: int) -> AST:
+        """
+        Precedence climbing with explicit operand and operator stacks, so neither
+        nesting nor length of an expression is bounded by the recursion limit.
+        Outside of parentheses, binary operators binding looser than min_precedence
+        end the expression
+        """
+        operands: List[AST] = []
+        operators: List[tuple] = []  # (precedence, token), precedence 0 for LPAREN
+        depth = 0
+        while True:
+            curr_token = self.current_token
+            if curr_token.type in (TT.PLUS, TT.MINUS):
+                self._eat(curr_token.type)
+                operators.append((PREFIX_PRECEDENCE, curr_token))
+                continue
+            elif curr_token.type == TT.LPAREN:
+                self._eat(TT.LPAREN)
+                operators.append((0, curr_token))
+                depth += 1
+                continue
+            operands.append(self._primary())
+
+            while True:
+                curr_token = self.current_token
+                precedence = binary_op_precedence.get(curr_token.type)
+                if precedence is not None and (depth or precedence >= min_precedence):
+                    self._reduce(operands, operators, precedence)
+                    self._eat(curr_token.type)
+                    operators.append((precedence, curr_token))
+                    break
+                elif curr_token.type == TT.RPAREN and depth:
+                    self._reduce(operands, operators, 1)
+                    self._eat(TT.RPAREN)
+                    operators.pop()
+                    depth -= 1
+                    continue
+
+                if depth:
+                    self._eat(TT.RPAREN)
+                self._reduce(operands, operators, 1)
+                return operands.pop()
+
+    def factor(self) -> AST:
+        return self._expression(PREFIX_PRECEDENCE)
 
     def term(self) -> AST:
-        self._skip_eols()
-        node = self.factor()
-
-        while self.current_token.type in (TT.MUL, TT.DIV):
-            saved_token = self.current_token
-            if self.current_token.type == TT.MUL:
-                self._eat(TT.MUL)
-                node = BinOp(saved_token, node, self.factor())
-            elif self.current_token.type == TT.DIV:
-                self._eat(TT.DIV)
-                node = BinOp(saved_token, node, self.factor())
-        self._skip_eols()
-        return node
+        return self._expression(binary_op_precedence[TT.MUL])
+
+    def arithmetic(self) -> AST:
+        return self._expression(binary_op_precedence[TT.PLUS])
 
     def expr(self) -> AST:
-        self._skip_eols()
-        node = self.term()
-        print("expr", self.current_token.type)
-        # NOTE: this is where it should be
-        while self.current_token.type in (TT.PLUS, TT.MINUS):
-            saved_token = self.current_token
-            if self.current_token.type == TT.PLUS:
-                self._eat(TT.PLUS)
-            elif self.current_token.type == TT.MINUS:
-                self._eat(TT.MINUS)
-            node = BinOp(saved_token, node, self.term())
-
-        self._skip_eols()
-        return node
+        return self._expression(binary_op_precedence[TT.EQ])
 
     def variable(self):
-        self._skip_eols()
         node = Var(self.current_token)
         self._eat(TT.ID)
-        self._skip_eols()
         return node
 
     def assignment_statement(self):
-        self._skip_eols()
         left = self.variable()
         token = self.current_token
         self._eat(TT.ASSIGN)
         right = self.expr()
-        self._skip_eols()
         return Assign(token, left, right)
 
     def call_args(self):
@@ -144,28 +290,22 @@ class ASTParser:
             elif self.current_token.type == TT.INTEGER:
                 args.append(Num(self.current_token))
             self._eat(self.current_token.type)
-            self._skip_eols()
             if self.current_token.type == TT.RPAREN:
                 break
             self._eat(TT.COMMA)
         return args
 
     def function_call(self):
-        self._skip_eols()
         token = self.current_token
         self._eat(TT.ID)
-        self._skip_eols()
         args = []
         self._eat(TT.LPAREN)
-        self._skip_eols()
         args = self.call_args()
         self._eat(TT.RPAREN)
         return FunctionCall(token, args)
 
     def statement(self):
-        self._skip_eols()
         if self.current_token.type == TT.ID:
-            self._skip_eols()
             if self._peek().type == TT.LPAREN:
                 node = self.function_call()
             elif self._peek().type == TT.ASSIGN:
@@ -178,18 +318,15 @@ class ASTParser:
             node = self.if_condition()
         else:
             node = NoOp()
-        self._skip_eols()
         return node
 
     def statements_list(self):
-        self._skip_eols()
         stmt_node = self.statement()
         statements_nodes = [stmt_node]
         while type(stmt_node) not in (NoOp,):
             stmt_node = self.statement()
             if stmt_node:
                 statements_nodes.append(stmt_node)
-        self._skip_eols()
         return statements_nodes
 
     def decl_args(self):
@@ -203,58 +340,95 @@ class ASTParser:
         return args_nodes
 
     def function(self):
-        self._skip_eols()
         self._eat(TT.FUNCTION)
-        self._skip_eols()
         func_name = self.current_token
         self._eat(TT.ID)
-        self._skip_eols()
         self._eat(TT.LPAREN)
         args_nodes = self.decl_args()
         self._eat(TT.RPAREN)
-        self._skip_eols()
         self._eat(TT.LBRACE)
+        if self._lazy:
+            return LazyFunction(func_name, args_nodes, self._skip_block())
         statements = self.statements_list()
         self._eat(TT.RBRACE)
         return Function(func_name, args_nodes, statements)
 
+    def _skip_block(self) -> Union[List[Token], TokenBuffer]:
+        """
+        Move past the brace closing the current block and return the tokens up to
+        it, that brace included
+        """
+        start = index = self._tok_idx
+        depth = 1
+        try:
+            while depth:
+                kind = self._tokens[index]._type
+                if kind is TT.LBRACE:
+                    depth += 1
+                elif kind is TT.RBRACE:
+                    depth -= 1
+                elif kind is TT.EOF:
+                    raise IndexError
+                index += 1
+        except IndexError:
+            raise self._error("unterminated block") from None
+        self._tok_idx = index
+        return self._tokens[start:index]
+
     def else_condition(self):
-        self._skip_eols()
         self._eat(TT.ELSE)
-        self._skip_eols()
         self._eat(TT.LBRACE)
         statements = self.statements_list()
         self._eat(TT.RBRACE)
-        self._skip_eols()
         return ElseCondition(statements)
 
     def if_condition(self):
-        self._skip_eols()
         self._eat(TT.IF)
-        self._skip_eols()
         self._eat(TT.LPAREN)
         expr = self.expr()
         self._eat(TT.RPAREN)
-        self._skip_eols()
         self._eat(TT.LBRACE)
-        self._skip_eols()
         statements = self.statements_list()
         self._eat(TT.RBRACE)
-        self._skip_eols()
         follow_else = None
-        print("if condition", self.current_token)
         if self.current_token.type == TT.ELSE:
-            print(self.current_token, "yo")
             follow_else = self.else_condition()
         return IfCondition(expr, statements, follow_else)
 
-    def program(self):
-        self._skip_eols()
-        statements = self.statements_list()
-        functions = []
+    def iter_program(self) -> Iterator[AST]:
+        """
+        Yield the global statements, then each function, as soon as they are parsed.
+        Reading from a TokenStream, the tokens of a yielded node are released
+        """
+        stmt_node = None
+        while type(stmt_node) is not NoOp:
+            stmt_node = self.statement()
+            self._release_tokens()
+            yield stmt_node
         while self.current_token.type == TT.FUNCTION:
-            functions.append(self.function())
-            self._skip_eols()
+            function = self.function()
+            self._release_tokens()
+            yield function
             self.statements_list()
-            self._skip_eols()
+
+    def program(self):
+        statements, functions = [], []
+        for node in self.iter_program():
+            if isinstance(node, Function):
+                functions.append(node)
+            else:
+                statements.append(node)
         return Program(functions, statements)
+
+
+class _FunctionBodyParser(ASTParser):
+    """
+    Parser for the body of a LazyFunction, its tokens no longer tell lines apart
+    """
+
+    def __init__(self, tokens: Union[List[Token], TokenBuffer], name: str):
+        super().__init__(tokens)
+        self._name = name
+
+    def _error(self, msg: str) -> ParserError:
+        return ParserError(f"{msg} (in function {self._name})")
@@ -0,0 +1,89 @@
+from typing import Collection, Dict, List, Set
+from interpreter.ast import Assign, Function, Program, Var, child_nodes
+from interpreter.visitor import NodeVisitor
+
+# slot of the variables that are globals
+GLOBAL = -1
+
+
+def global_names(program: Program) -> Set[str]:
+    """
+    Names that may be globals: the functions and what the global code assigns
+    """
+    names = {function.name for function in program.functions}
+    stack = list(program.statements)
+    while stack:
+        node = stack.pop()
+        if type(node) is Assign:
+            names.add(node.left.value)
+        stack += child_nodes(node)
+    return names
+
+
+class ScopeResolver(NodeVisitor):
+    """
+    Decides before a function runs where each of its variables lives: a global
+    or a local of its frame, parameters included. The locals get slots, indexes
+    in the list of values of a frame, kept in the slot of their Var nodes, and
+    function.locals maps their names to their slots.
+    global_names are the names of the globals while functions run: global code
+    has run then and assigning a global never makes a new one. As ASTVisitor
+    does, an assignment sets the global if there is one and a read looks at
+    the locals first, a name that is neither is a local never set.
+    Var nodes are modified in place, copy shared nodes (see hashcons) first
+    """
+
+    def __init__(self, global_names: Collection[str] = ()):
+        self.global_names = global_names
+
+    def resolve(self, function: Function, bound: bool = True) -> None:
+        """
+        Resolves the variables of function, whose parameters are set by the
+        calls if bound (main() is run without arguments)
+        """
+        self._collect(function)
+        slots: Dict[str, int] = {}
+        if bound:
+            for arg in function.args:
+                arg.slot = slots.setdefault(arg.value, len(slots))
+        for var in self._targets:
+            if var.value in self.global_names:
+                var.slot = GLOBAL
+            else:
+                var.slot = slots.setdefault(var.value, len(slots))
+        for var in self._reads:
+            if var.value in slots or var.value not in self.global_names:
+                var.slot = slots.setdefault(var.value, len(slots))
+            else:
+                var.slot = GLOBAL
+        function.locals = slots
+
+    def unknown(self, function: Function, bound: bool = True) -> List[str]:
+        """
+        The names function reads that are not its parameters (if bound), are
+        not assigned by it and are not in global_names
+        """
+        self._collect(function)
+        known = {var.value for var in self._targets}
+        if bound:
+            known.update(arg.value for arg in function.args)
+        names = (var.value for var in self._reads)
+        return [
+            name
+            for name in dict.fromkeys(names)
+            if name not in known and name not in self.global_names
+        ]
+
+    def _collect(self, function: Function) -> None:
+        # the Var nodes assigned and read, in order
+        self._targets: List[Var] = []
+        self._reads: List[Var] = []
+        for stmt in function.statements:
+            self.walk(stmt)
+
+    def visit_Assign(self, node: Assign) -> None:
+        self._targets.append(node.left)
+
+    def visit_Var(self, node: Var) -> None:
+        if not self._targets or node is not self._targets[-1]:
+            self._reads.append(node)
@@ -0,0 +1,185 @@
+import marshal
+from array import array
+from itertools import compress
+from sys import byteorder
+from typing import List, Optional, Iterable, Iterator, Union
+from interpreter.tokenizer import Token, TokenTypes, valueless_tokens
+
+
+token_kinds = list(TokenTypes)
+token_kind_index = {kind: index for index, kind in enumerate(token_kinds)}
+_valueless_by_kind = [valueless_tokens.get(kind) for kind in token_kinds]
+
+# unsigned 32 bits typecode, "I" is 16 bits wide on some platforms
+_U32 = "I" if array("I").itemsize == 4 else "L"
+
+_MAGIC = b"TKB1"
+_HEADER_SIZE = 16
+_BYTEORDER = {"little": 0, "big": 1}
+
+
+class TokenBuffer:
+    """
+    Struct of arrays token storage: for each token one byte of kind, its source
+    offset and an index in a table of literals holding each ID, INTEGER and
+    STRING value once (index 0 is reserved for value-less tokens)
+    """
+
+    def __init__(self):
+        self.kinds = array("B")
+        self.offsets = array(_U32)
+        self.values = array(_U32)
+        self.literals: List[Union[int, str, None]] = [None]
+        self._literal_index = {}
+        self._token_cache = {}
+
+    @classmethod
+    def from_tokens(
+        cls, tokens: Iterable[Token], offsets: Optional[Iterable[int]] = None
+    ) -> "TokenBuffer":
+        buffer = cls()
+        tokens = list(tokens)
+        buffer.extend(tokens, offsets if offsets is not None else [0] * len(tokens))
+        return buffer
+
+    def append(self, token: Token, offset: int = 0) -> None:
+        self.kinds.append(token_kind_index[token.type])
+        self.offsets.append(offset)
+        self.values.append(self._literal(token.value))
+
+    def extend(self, tokens: Iterable[Token], offsets: Iterable[int]) -> None:
+        kinds, values, literal = self.kinds, self.values, self._literal
+        for token in tokens:
+            kinds.append(token_kind_index[token._type])
+            values.append(literal(token._value))
+        self.offsets.extend(offsets)
+        if len(self.offsets) != len(self.kinds):
+            raise ValueError("expected one offset per token")
+
+    def _literal(self, value: Union[int, str, None]) -> int:
+        if value is None:
+            return 0
+        index = self._literal_index.get(value)
+        if index is None:
+            index = self._literal_index[value] = len(self.literals)
+            self.literals.append(value)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Token, "TokenBuffer"]:
+        if isinstance(index, slice):
+            return self._view(index)
+        kind, value = self.kinds[index], self.values[index]
+        if not value:
+            return _valueless_by_kind[kind]
+        key = value << 8 | kind
+        token = self._token_cache.get(key)
+        if token is None:
+            token = self._token_cache[key] = Token.trusted(
+                token_kinds[kind], self.literals[value]
+            )
+        return token
+
+    def __iter__(self) -> Iterator[Token]:
+        cache, literals = self._token_cache, self.literals
+        for kind, value in zip(self.kinds, self.values):
+            if not value:
+                yield _valueless_by_kind[kind]
+                continue
+            key = value << 8 | kind
+            token = cache.get(key)
+            if token is None:
+                token = cache[key] = Token.trusted(token_kinds[kind], literals[value])
+            yield token
+
+    def kind(self, index: int) -> TokenTypes:
+        return token_kinds[self.kinds[index]]
+
+    def _view(self, index: slice) -> "TokenBuffer":
+        """
+        Slice sharing the columns and the literals table of this buffer. The
+        columns can't grow while a view on them is alive
+        """
+        view = TokenBuffer.__new__(TokenBuffer)
+        view.kinds = memoryview(self.kinds)[index]
+        view.offsets = memoryview(self.offsets)[index]
+        view.values = memoryview(self.values)[index]
+        view.literals = self.literals
+        view._literal_index = self._literal_index
+        view._token_cache = self._token_cache
+        return view
+
+    def without(self, kind: TokenTypes) -> "TokenBuffer":
+        """
+        Copy of the buffer leaving out the tokens of the given kind
+        """
+        skipped = token_kind_index[kind]
+        keep = [token_kind != skipped for token_kind in self.kinds]
+        buffer = TokenBuffer.__new__(TokenBuffer)
+        buffer.kinds = array("B", compress(self.kinds, keep))
+        buffer.offsets = array(_U32, compress(self.offsets, keep))
+        buffer.values = array(_U32, compress(self.values, keep))
+        buffer.literals = self.literals
+        buffer._literal_index = self._literal_index
+        buffer._token_cache = self._token_cache
+        return buffer
+
+    def tokens(self) -> List[Token]:
+        return list(self)
+
+    def to_bytes(self) -> bytes:
+        """
+        Header, then the offsets, values and kinds columns as raw machine words,
+        then the marshalled literals
+        """
+        count = len(self.kinds)
+        return b"".join(
+            (
+                _MAGIC,
+                bytes([_BYTEORDER[byteorder], 0, 0, 0]),
+                count.to_bytes(8, "little"),
+                bytes(self.offsets),
+                bytes(self.values),
+                bytes(self.kinds),
+                marshal.dumps(self.literals),
+            )
+        )
+
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, memoryview]) -> "TokenBuffer":
+        """
+        Rebuild a buffer from to_bytes() output, the columns are views on data
+        unless it was written with another byte order
+        """
+        data = memoryview(data)
+        if len(data) < _HEADER_SIZE or bytes(data[:4]) != _MAGIC:
+            raise ValueError("not a serialized token buffer")
+        count = int.from_bytes(data[8:16], "little")
+        start = _HEADER_SIZE
+        offsets = data[start : start + 4 * count]
+        values = data[start + 4 * count : start + 8 * count]
+        kinds = data[start + 8 * count : start + 9 * count]
+        literals = marshal.loads(data[start + 9 * count :])
+
+        buffer = cls.__new__(cls)
+        if data[4] == _BYTEORDER[byteorder]:
+            buffer.offsets, buffer.values = offsets.cast(_U32), values.cast(_U32)
+        else:
+            buffer.offsets, buffer.values = array(_U32), array(_U32)
+            for column, raw in ((buffer.offsets, offsets), (buffer.values, values)):
+                column.frombytes(raw)
+                column.byteswap()
+        buffer.kinds = kinds
+        buffer.literals = literals
+        buffer._literal_index = {value: index for index, value in enumerate(literals)}
+        del buffer._literal_index[None]
+        buffer._token_cache = {}
+        return buffer
+
+    def __str__(self) -> str:
+        return f"{TokenBuffer.__name__}({len(self)} tokens, {len(self.literals) - 1} literals)"
+
+    def __repr__(self) -> str:
+        return self.__str__()
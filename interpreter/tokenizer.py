@@ -1,5 +1,6 @@
 from typing import Union, Optional, Any
 from enum import Enum, auto
+from sys import intern
 
 
 class AutoName(Enum):
@@ -57,6 +58,8 @@ class TokenTypes(AutoName):
 
 
 class Token:
+    __slots__ = ("_type", "_value")
+
     def __init__(self, type: TokenTypes, value: Optional[Union[int, str, None]] = None):
         try:
             TokenTypes(type)
@@ -75,6 +78,17 @@ class Token:
         self._type = type
         self._value = value
 
+    @classmethod
+    def trusted(cls, type: TokenTypes, value: Optional[Union[int, str, None]] = None):
+        """
+        Build a token without any check, for callers (the lexers) that already know
+        the type and value are valid
+        """
+        token = _new_token(cls)
+        token._type = type
+        token._value = value
+        return token
+
     def _validate_value(self, token_type: TokenTypes, value: Union[int, str, None]):
         if token_type == TokenTypes.ID and (
             not isinstance(value, str) or not value.isalnum() or value[0].isnumeric()
@@ -105,3 +119,38 @@ class Token:
         if (self._type, self._value) != (other._type, other._value):
             return False
         return True
+
+
+_new_token = object.__new__
+
+# Tokens without a value are immutable and can be shared
+valueless_tokens = {type: Token(type) for type in TokenTypes if not type.value[1]}
+
+
+class LazyToken(Token):
+    """
+    Token pointing at a slice of a bytes-like source, its value is only decoded
+    the first time it is read
+    """
+
+    __slots__ = ("_source", "_start", "_end", "_decode", "_decoded")
+
+    def __init__(self, type: TokenTypes, source, start: int, end: int, decode):
+        self._type = type
+        self._source = source
+        self._start, self._end = start, end
+        self._decode = decode
+
+    @property
+    def _value(self):
+        if self._source is not None:
+            self._decoded = self._decode(self._source[self._start : self._end])
+            self._source = self._decode = None
+        return self._decoded
+
+    def __eq__(self, other):
+        if not isinstance(other, Token):
+            return False
+        if (self._type, self._value) != (other._type, other._value):
+            return False
+        return True
@@ -0,0 +1,137 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from interpreter.ast import AST, is_node
+
+
+class NodeVisitor:
+    """
+    Base class for passes over an AST, calls visit_<class name>(node) for a node,
+    generic_visit(node) if there is no such method. Methods are looked up once
+    per node class along its MRO (a LazyFunction is visited by visit_Function)
+    and cached on the visitor class.
+
+    visit() recurses through generic_visit(), walk() does not: it goes over the
+    tree with an explicit stack and calls visit_<class name>(node) before the
+    children of node and leave_<class name>(node) after them, if they exist
+    """
+
+    _methods: Dict[Tuple[str, type], Optional[Callable]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._methods = {}
+
+    @classmethod
+    def _method(cls, prefix: str, node_type: type) -> Optional[Callable]:
+        key = (prefix, node_type)
+        try:
+            return cls._methods[key]
+        except KeyError:
+            pass
+        method = None
+        for base in node_type.__mro__:
+            method = getattr(cls, prefix + base.__name__, None)
+            if method is not None:
+                break
+        cls._methods[key] = method
+        return method
+
+    def visit(self, node: AST) -> Any:
+        method = self._method("visit_", type(node))
+        if method is None:
+            return self.generic_visit(node)
+        return method(self, node)
+
+    def generic_visit(self, node: AST) -> Any:
+        for field in node._fields:
+            value = getattr(node, field)
+            if type(value) is list:
+                for item in value:
+                    self.visit(item)
+            elif is_node(value):
+                self.visit(value)
+
+    def walk(self, root: AST) -> None:
+        method = self._method
+        # (node, False) on the way down, (node, True) once its children are done
+        stack = [(root, False)]
+        while stack:
+            node, leaving = stack.pop()
+            node_type = type(node)
+            if leaving:
+                method("leave_", node_type)(self, node)
+                continue
+            visit = method("visit_", node_type)
+            if visit is not None:
+                visit(self, node)
+            if method("leave_", node_type) is not None:
+                stack.append((node, True))
+            for field in reversed(node._fields):
+                value = getattr(node, field)
+                if type(value) is list:
+                    stack += ((item, False) for item in reversed(value))
+                elif is_node(value):
+                    stack.append((value, False))
+
+
+class NodeTransformer(NodeVisitor):
+    """
+    NodeVisitor whose methods return the node that replaces the one visited:
+    the same node to keep it, None to remove it from a list (or set the field
+    to None) and, in a list, a list of nodes to put in its place.
+
+    transform() is the non recursive counterpart of visit(): it rebuilds the
+    tree bottom up, calling leave_<class name>(node) once the children of
+    node have been replaced. Nodes are modified in place, copy shared nodes
+    (see hashcons) before transforming them
+    """
+
+    def generic_visit(self, node: AST) -> AST:
+        for field in node._fields:
+            value = getattr(node, field)
+            if type(value) is list:
+                setattr(node, field, _replace_items(map(self.visit, value)))
+            elif is_node(value):
+                setattr(node, field, self.visit(value))
+        return node
+
+    def transform(self, root: AST) -> Optional[AST]:
+        method = self._method
+        # id of a node -> (node, its replacement), the node is kept alive so that
+        # its id is not reused, shared nodes are transformed once
+        results = {}
+        stack = [(root, False)]
+        while stack:
+            node, ready = stack.pop()
+            if id(node) in results:
+                continue
+            if not ready:
+                stack.append((node, True))
+                for field in node._fields:
+                    value = getattr(node, field)
+                    if type(value) is list:
+                        stack += ((item, False) for item in value)
+                    elif is_node(value):
+                        stack.append((value, False))
+                continue
+            for field in node._fields:
+                value = getattr(node, field)
+                if type(value) is list:
+                    items = [results[id(item)][1] for item in value]
+                    setattr(node, field, _replace_items(items))
+                elif is_node(value):
+                    setattr(node, field, results[id(value)][1])
+            leave = method("leave_", type(node))
+            results[id(node)] = (node, node if leave is None else leave(self, node))
+        return results[id(root)][1]
+
+
+def _replace_items(replacements) -> list:
+    new_items = []
+    for replacement in replacements:
+        if replacement is None:
+            continue
+        if type(replacement) is list:
+            new_items += replacement
+        else:
+            new_items.append(replacement)
+    return new_items
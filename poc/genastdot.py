@@ -8,7 +8,7 @@ import argparse
 import textwrap
 import sys
 from pathlib import Path  # if you haven't already done so
-from typing import List, Dict
+from typing import List, Dict, Union
 
 file = Path(__file__).resolve()
 parent, root = file.parent, file.parents[1]
@@ -20,13 +20,14 @@ try:
 except ValueError:  # Already removed
     pass
 
-from interpreter.lexer import Lexer, single_chr_toks
+from interpreter.lexer import Lexer, op_toks
 from interpreter.tokenizer import Token as Token
 from interpreter.parser import ASTParser
 from interpreter.ast import *
+from interpreter.visitor import NodeVisitor
 
 
-class ASTVisualizer:
+class ASTVisualizer(NodeVisitor):
     def __init__(self, root_node: AST):
         self.root_node = root_node
         self.ncount = 1
@@ -46,132 +47,60 @@ class ASTVisualizer:
         self.dot_body: List[str] = []
         self.dot_footer = ["}"]
 
-    def visitAST(self, node: AST):
-        if isinstance(node, BinOp):
-            label = list(single_chr_toks.keys())[
-                list(single_chr_toks.values()).index(Token(node._token.type))
-            ]
-            s = '  node{} [label="{}"]\n'.format(self.ncount, label)
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
-
-            self.visitAST(node.left)
-            self.visitAST(node.right)
-
-            for child_node in (node.left, node.right):
-                s = "  node{} -> node{}\n".format(
-                    self.d[id(node)], self.d[id(child_node)]
-                )
-                self.dot_body.append(s)
-
-        elif isinstance(node, Num):
-            s = '  node{} [label="{}"]\n'.format(self.ncount, node.token.value)
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
-
-        elif isinstance(node, String):
-            s = "  node{} [label=\"'{}'\"]\n".format(self.ncount, node.token.value)
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
-
-        elif isinstance(node, UnaryOp):
-            s = '  node{} [label="unary {}"]\n'.format(self.ncount, node.token.value)
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
+    def visit_BinOp(self, node: BinOp):
+        return self._op_label(node)
 
-            self.visitAST(node.expr)
-            s = "  node{} -> node{}\n".format(self.d[id(node)], self.d[id(node.expr)])
-            self.dot_body.append(s)
+    def _op_label(self, node: Union[BinOp, UnaryOp]):
+        return list(op_toks.keys())[list(op_toks.values()).index(Token(node.op_type))]
 
-        elif isinstance(node, Function):
-            s = '  node{} [label="Function {}\nargs= {}"]\n'.format(
-                self.ncount, node.id.value, [arg.value for arg in node.args]
-            )
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
+    def visit_Num(self, node: Num):
+        return node.token.value
 
-            for stmt in node.statements:
-                self.visitAST(stmt)
-                print(stmt, type(stmt))
-                s = "  node{} -> node{}\n".format(self.d[id(node)], self.d[id(stmt)])
-                self.dot_body.append(s)
+    def visit_String(self, node: String):
+        return "'{}'".format(node.token.value)
 
-        elif isinstance(node, FunctionCall):
-            s = '  node{} [label="{}"]\n'.format(
-                self.ncount, f"Call: {node.func.value}"
-            )
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
+    def visit_UnaryOp(self, node: UnaryOp):
+        return "unary {}".format(self._op_label(node))
 
-            for arg in node.args:
-                self.visitAST(arg)
-                s = "  node{} -> node{}\n".format(self.d[id(node)], self.d[id(arg)])
-                self.dot_body.append(s)
+    def visit_Function(self, node: Function):
+        return "Function {}\nargs= {}".format(
+            node.id.value, [arg.value for arg in node.args]
+        )
 
-        elif isinstance(node, ReturnVal):
-            s = '  node{} [label="{}"]\n'.format(self.ncount, "Return")
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
+    def visit_FunctionCall(self, node: FunctionCall):
+        return f"Call: {node.func.value}"
 
-            self.visitAST(node.return_val)
-            s = "  node{} -> node{}\n".format(
-                self.d[id(node)], self.d[id(node.return_val)]
-            )
-            self.dot_body.append(s)
+    def visit_ReturnVal(self, node: ReturnVal):
+        return "Return"
 
-        elif isinstance(node, Program):
-            s = '  node{} [label="{}"]\n'.format(self.ncount, "Program")
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
+    def visit_Assign(self, node: Assign):
+        return "="
 
-            for function in node.functions:
-                self.visitAST(function)
-                s = "  node{} -> node{}\n".format(
-                    self.d[id(node)], self.d[id(function)]
-                )
-                self.dot_body.append(s)
+    def visit_Var(self, node: Var):
+        return node.value
 
-            for statement in node.statements:
-                self.visitAST(statement)
-                s = "  node{} -> node{}\n".format(
-                    self.d[id(node)], self.d[id(statement)]
-                )
-                self.dot_body.append(s)
+    def generic_visit(self, node: AST):
+        return type(node).__name__
 
-        elif isinstance(node, Assign):
-            s = '  node{} [label="="]\n'.format(self.ncount)
+    def visitAST(self, root: AST):
+        # without recursion, a node is labeled by its visit_ method and linked to
+        # its children (the statements of a function, its arguments are in its label)
+        stack = [(root, None)]
+        while stack:
+            node, parent = stack.pop()
+            s = '  node{} [label="{}"]\n'.format(self.ncount, self.visit(node))
             self.dot_body.append(s)
             self.d[id(node)] = self.ncount
             self.ncount += 1
-
-            self.visitAST(node.left)
-            self.visitAST(node.right)
-
-            for child_node in (node.left, node.right):
-                s = "  node{} -> node{}\n".format(
-                    self.d[id(node)], self.d[id(child_node)]
-                )
+            if parent is not None:
+                s = "  node{} -> node{}\n".format(self.d[id(parent)], self.d[id(node)])
                 self.dot_body.append(s)
 
-        elif isinstance(node, Var):
-            s = '  node{} [label="{}"]\n'.format(self.ncount, node.value)
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
-
-        elif isinstance(node, NoOp):
-            s = '  node{} [label="NoOp"]\n'.format(self.ncount)
-            self.dot_body.append(s)
-            self.d[id(node)] = self.ncount
-            self.ncount += 1
+            if isinstance(node, Function):
+                children = node.statements
+            else:
+                children = child_nodes(node)
+            stack += ((child, node) for child in reversed(children))
 
     def gendot(self):
         self.visitAST(self.root_node)
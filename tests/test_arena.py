@@ -0,0 +1,56 @@
+from pytest import raises
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter.arena import Arena, ArenaEvaluator, NodeKind
+from interpreter.exceptions import InterpreterError
+
+
+input = """
+    a = 3; z = "s"; n = -2;
+    function f(a, b) { return a * (b + 2) - 1; }
+    function g(a) { if (a < 2) { b = 1; } else { b = 2; } return b; }
+    function main() { a = f(a, 4); c = g(a) + 10 / 2; z = z + "t"; }
+"""
+
+
+def test_from_ast():
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    arena = Arena.from_ast(program)
+    assert arena.kinds[arena.root] == NodeKind.PROGRAM
+    functions = arena.block(arena.operand1[arena.root])
+    assert [arena.kinds[function] for function in functions] == [NodeKind.FUNCTION] * 3
+    assert arena.literals.count("a") == 1
+    assert str(arena.to_ast()) == str(program)
+
+    copy = Arena.from_bytes(arena.to_bytes())
+    assert str(copy.to_ast()) == str(program)
+    assert copy.literals == arena.literals
+
+
+def test_deep_tree():
+    depth = 5000
+    tokens = Lexer("(" * depth + "1" + "+ 2)" * depth).get_tokens()
+    expr = ASTParser(tokens).expr()
+    arena = Arena.from_ast(expr)
+    assert len(arena) == 2 * depth + 1
+    node = arena.to_ast()
+    for _ in range(depth):
+        node = node.left
+    assert node.value == 1
+
+
+def test_evaluator():
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    evaluator = ArenaEvaluator(Arena.from_ast(program))
+    evaluator.run()
+    assert evaluator.globals == {"a": 17, "z": "st", "n": -2}
+
+    for input_ in (
+        "function f() { } function main() { } function f() { }",
+        "function maiz() { }",
+        "f(); function f() { } function main() { }",
+        "function main() { a = b; }",
+    ):
+        program = ASTParser(Lexer(input_).get_tokens()).program()
+        with raises(InterpreterError):
+            ArenaEvaluator(Arena.from_ast(program)).run()
@@ -0,0 +1,56 @@
+import pickle
+from pytest import raises
+from interpreter.tokenizer import Token as Token, TokenTypes as TT
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter.ast import AST, BinOp, Num, Var, UnaryOp, Assign, Function, String, NoOp
+
+
+def test_slots():
+    input = """
+        a = "s";
+        function main(b) { a = -b * 2 + f(b, 1); if (a < 2) { return a; } }
+    """
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    stack = [program]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, (AST, NoOp)):
+            continue
+        assert not hasattr(node, "__dict__"), type(node)
+        for name in getattr(type(node), "__slots__", ()):
+            value = getattr(node, name)
+            stack += value if isinstance(value, list) else [value]
+
+
+def test_tokens():
+    node = BinOp(Token(TT.MUL), Num(Token(TT.INTEGER, 2)), Var(Token(TT.ID, "a")))
+    assert node.op_type is TT.MUL and node.op == Token(TT.MUL) and node._op == node.op
+    assert node.left.value == 2 and node.left.token == Token(TT.INTEGER, 2)
+    assert node.right.value == "a" and node.right.id == Token(TT.ID, "a")
+    assert str(node) == (
+        "BinOp(Token(TokenTypes.MUL, None), Num(Token(TokenTypes.INTEGER, 2)), "
+        "Var(Token(TokenTypes.ID, a)))"
+    )
+
+    node.op = Token(TT.PLUS)
+    node.right.id = Token(TT.ID, "b")
+    assert node == BinOp(Token(TT.PLUS), Num(Token(TT.INTEGER, 2)), Var(Token(TT.ID, "b")))
+    assert node != BinOp(Token(TT.MINUS), node.left, node.right)
+    assert UnaryOp(Token(TT.MINUS), node.left) != UnaryOp(Token(TT.PLUS), node.left)
+    assert String(Token(TT.STRING, "2")) != Num(Token(TT.INTEGER, 2))
+
+    with raises(TypeError):
+        BinOp(Token(TT.ASSIGN), node.left, node.right)
+    with raises(TypeError):
+        Var(Token(TT.INTEGER, 1))
+
+
+def test_pickle():
+    main = Function(
+        Token(TT.ID, "main"),
+        [Var(Token(TT.ID, "a"))],
+        [Assign(Token(TT.ASSIGN), Var(Token(TT.ID, "a")), Num(Token(TT.INTEGER, 1))), NoOp()],
+    )
+    copy = pickle.loads(pickle.dumps(main))
+    assert copy.name == "main" and copy.statements[0] == main.statements[0]
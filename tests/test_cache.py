@@ -0,0 +1,83 @@
+import os
+from pytest import fixture
+from interpreter import cache as cache_module
+from interpreter.cache import ProgramCache
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter.interpreter import ASTVisitor
+
+
+input = """
+    function f(a, b) { return a * 2 + b; }
+    function main() { a = 3; c = f(1, a); }
+"""
+
+
+@fixture
+def cache(tmp_path):
+    return ProgramCache(tmp_path / "cache")
+
+
+def test_cache_roundtrip(cache):
+    assert cache.get(input) is None
+    program = cache.load(input)
+    assert len(list(cache.directory.iterdir())) == 1
+
+    cached = cache.get(input)
+    assert cached is not program
+    assert str(cached) == str(program)
+    ASTVisitor(cached).visit_Program()
+
+
+def test_cache_warm_run_skips_lexing(cache, monkeypatch):
+    cache.load(input)
+
+    def fail(*args):
+        raise AssertionError("lexed on a cache hit")
+
+    monkeypatch.setattr(Lexer, "get_tokens", fail)
+    monkeypatch.setattr(ASTParser, "program", fail)
+    assert cache.load(input) is not None
+
+
+def test_cache_validation(cache):
+    cache.load(input)
+    (path,) = cache.directory.iterdir()
+    data = path.read_bytes()
+    path.write_bytes(data[:-1] + bytes([data[-1] ^ 1]))
+    assert cache.get(input) is None
+    assert not path.exists()
+
+    cache.load(input)
+    path.write_bytes(b"garbage")
+    assert cache.get(input) is None
+
+
+def test_cache_unpicklable(cache):
+    lazy = ASTParser(Lexer(input).get_token_buffer(), lazy=True).program()
+    assert not cache.put(input, lazy)
+    assert cache.get(input) is None
+
+
+def test_cache_tag(cache, monkeypatch):
+    cache.load(input)
+    monkeypatch.setattr(cache_module, "CACHE_TAG", cache_module.CACHE_TAG + "x")
+    assert cache.get(input) is None
+
+
+def test_cache_eviction(tmp_path):
+    cache = ProgramCache(tmp_path, max_size=1)
+    cache.load(input)
+    assert not list(tmp_path.iterdir())
+
+    sources = [input.replace("2", str(n)) for n in range(3, 8)]
+    cache = ProgramCache(tmp_path)
+    for age, source in enumerate(sources):
+        cache.load(source)
+        os.utime(cache._path(source), ns=(age, age))
+    size = sum(path.stat().st_size for path in tmp_path.iterdir())
+    cache = ProgramCache(tmp_path, max_size=size - 1)
+    cache.get(sources[0])
+    cache.load(input)
+    assert cache.get(sources[0]) is not None
+    assert cache.get(sources[1]) is None
@@ -0,0 +1,54 @@
+from interpreter.tokenizer import Token as Token, TokenTypes as TT
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter.ast import BinOp, Num, Var, NoOp, structural_hash
+from interpreter.hashcons import NodeFactory
+
+
+input = """
+    a = 1 + 2;
+    function f(a, b) { c = a * (b + 1); d = a * (b + 1); return c; }
+    function main() { c = a * (b + 1); if (a < 2) { return 1 + 2; } }
+"""
+
+
+def test_factory():
+    make = NodeFactory()
+    one = make(Num, Token(TT.INTEGER, 1))
+    assert make(Num, Token(TT.INTEGER, 1)) is one
+    node = make(BinOp, Token(TT.PLUS), one, make(Var, Token(TT.ID, "a")))
+    same = make(BinOp, Token(TT.PLUS), one, make(Var, Token(TT.ID, "a")))
+    assert same is node and len(make) == 3
+    assert make(NoOp) is make(NoOp)
+
+    plain = BinOp(Token(TT.PLUS), Num(Token(TT.INTEGER, 1)), Var(Token(TT.ID, "a")))
+    assert plain == node and hash(plain) == hash(node)
+    assert {node: "x"}[plain] == "x"
+    assert node != make(BinOp, Token(TT.MINUS), one, node.right)
+
+
+def test_intern():
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    make = NodeFactory()
+    shared = make.intern(program)
+    assert shared == program and shared is not program
+    f, main = shared.functions
+    assert f.statements[0].right is f.statements[1].right is main.statements[0].right
+    assert shared.statements[0].right is main.statements[1].statements[0].return_val
+    assert f.locals is not program.functions[0].locals
+    # the original tree is left unshared
+    statements = program.functions[0].statements
+    assert statements[0].right is not statements[1].right
+    size = len(make)
+    make.intern(ASTParser(Lexer(input).get_tokens()).program())
+    assert len(make) == size
+
+
+def test_deep_tree():
+    depth = 5000
+    input_ = "(" * depth + "1" + "+ 2)" * depth
+    expr = ASTParser(Lexer(input_).get_tokens()).expr()
+    make = NodeFactory()
+    shared = make.intern(expr)
+    assert hash(shared) == structural_hash(expr) == hash(expr)
+    assert make.intern(ASTParser(Lexer(input_).get_tokens()).expr()) is shared
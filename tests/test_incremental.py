@@ -0,0 +1,71 @@
+from pytest import raises
+from interpreter.lexer import Lexer
+from interpreter.incremental import IncrementalLexer, _GapText
+from interpreter.exceptions import UnknownSymbolError
+
+
+input = """function main() {
+    a = 42; b = a < 3;
+    c = "some string";
+}
+"""
+
+
+def check(lexer: IncrementalLexer):
+    assert lexer.tokens == Lexer(lexer.text).get_tokens()
+    reference = Lexer(lexer.text).get_token_buffer()
+    assert lexer.offsets() == list(reference.offsets)
+
+
+def test_incremental_lexer():
+    lexer = IncrementalLexer(input)
+    check(lexer)
+
+    # identifier grows
+    lexer.edit(input.index("a ="), 0, "bc")
+    check(lexer)
+    # "<" becomes "<="
+    lexer.edit(lexer.text.index("<") + 1, 0, "=")
+    check(lexer)
+    # a string swallowing several tokens
+    with raises(IndexError):
+        lexer.edit(lexer.text.index("42"), 0, '"')
+    lexer.edit(lexer.text.index("42"), 5, '"42; b"')
+    check(lexer)
+    # delete across several tokens
+    lexer.edit(lexer.text.index("{"), 10, "")
+    check(lexer)
+    lexer.edit(0, 0, "\n\n")
+    check(lexer)
+    lexer.edit(len(lexer.text), 0, "function f() {}")
+    check(lexer)
+
+
+def test_incremental_lexer_edit_size(monkeypatch):
+    lexer = IncrementalLexer(input * 50)
+    # only the scanned window of the text is read
+    read = []
+    getitem = _GapText.__getitem__
+
+    def record(self, index):
+        text = getitem(self, index)
+        read.append(len(text))
+        return text
+
+    monkeypatch.setattr(_GapText, "__getitem__", record)
+    first, removed, inserted = lexer.edit(len(input) * 25 + 20, 0, " + 1")
+    assert (removed, inserted) == (2, 4)
+    assert 0 < sum(read) < 2 * 256
+    monkeypatch.undo()
+    check(lexer)
+
+
+def test_incremental_lexer_errors():
+    lexer = IncrementalLexer(input)
+    with raises(UnknownSymbolError):
+        lexer.edit(10, 0, "@")
+    assert lexer.text == input
+    check(lexer)
+
+    with raises(IndexError):
+        lexer.edit(len(input), 1, "")
@@ -1,7 +1,7 @@
 from pytest import raises
 from interpreter.lexer import Lexer
-from interpreter.parser import ASTParser
-from interpreter.interpreter import ASTVisitor
+from interpreter.parser import ASTParser, TokenStream
+from interpreter.interpreter import ASTVisitor, FunctionFrame
 from interpreter.exceptions import InterpreterError
 
 
@@ -131,3 +131,135 @@ def test_string():
     visitor = ASTVisitor(program_node)
     node = visitor.visit_Program()
 
+
+
+def test_comparisons():
+    input = """
+        function main() { a = 1 < 2; b = 2 * 3 == 6; c = 3 >= 4; d = 1 + (2 <= 2); }
+    """
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens)
+    program_node = parser.program()
+    visitor = ASTVisitor(program_node)
+    main = program_node.functions[0]
+    visitor._call_stack.append(FunctionFrame(main))
+    for stmt in main.statements:
+        visitor.visit(stmt)
+    assert visitor.scope == {"a": 1, "b": 1, "c": 0, "d": 2}
+
+
+def test_visit_stream():
+    input = """
+        a = 3; z = 42;
+        function f(a, b) { return a + b; }
+        function main() { a = f(a, z); }
+    """
+    lexer = Lexer(input)
+    parser = ASTParser(TokenStream(lexer.iter_tokens()))
+    visitor = ASTVisitor()
+    visitor.visit_stream(parser.iter_program())
+    assert visitor.globals["a"] == 45 and visitor.globals["z"] == 42
+
+    input = """
+        function f() { }
+        function f() { }
+        function main() { }
+    """
+    parser = ASTParser(TokenStream(Lexer(input).iter_tokens()))
+    with raises(InterpreterError):
+        ASTVisitor().visit_stream(parser.iter_program())
+
+    input = """
+        f();
+        function f() { }
+        function main() { }
+    """
+    parser = ASTParser(TokenStream(Lexer(input).iter_tokens()))
+    with raises(InterpreterError):
+        ASTVisitor().visit_stream(parser.iter_program())
+
+
+def test_lazy_functions():
+    input = """
+        function unused() { this is not parsed; }
+        function f(a, b) { return a * b; }
+        function main() { a = f(6, 7); }
+    """
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens, lazy=True)
+    program_node = parser.program()
+    visitor = ASTVisitor(program_node)
+    visitor.visit_Program()
+    unused, f, main = program_node.functions
+    assert f.parsed and main.parsed and not unused.parsed
+
+    # optimized once parsed, on their first call
+    input = """
+        r = 0;
+        function unused() { this is not parsed; }
+        function f(a, b) { if (0) { return b; } return a * b + 2 * 3; }
+        function main() { r = f(6, 7); }
+    """
+    optimized = ASTParser(Lexer("function f(a, b) { return a * b + 6; }").get_tokens())
+    # without the NoOp ending the block
+    optimized = optimized.function().statements[:1]
+    for opt_level in (1, 2):
+        program_node = ASTParser(Lexer(input).get_tokens(), lazy=True).program()
+        visitor = ASTVisitor(program_node, opt_level)
+        visitor.visit_Program()
+        unused, f, main = program_node.functions
+        assert visitor.globals["r"] == 48 and not unused.parsed
+        assert str(f.statements) == str(optimized)
+
+
+def test_control_flow():
+    input = """
+        r = 0; s = 0;
+        function f(a) {
+            if (a < 2) { return 10; b = 1; } else { b = a * 2; }
+            return b;
+        }
+        function g() { }
+        function main() { r = f(1); s = f(3) + f(0); if (1 - 1) { r = 5; } t = g(); }
+    """
+    for opt_level in (0, 1, 2):
+        program_node = ASTParser(Lexer(input).get_tokens()).program()
+        visitor = ASTVisitor(program_node, opt_level=opt_level)
+        visitor.visit_Program()
+        functions = {func.name: func for func in program_node.functions[:2]}
+        # without the clones of the specializer
+        globals = {k: v for k, v in visitor.globals.items() if "_" not in k}
+        assert globals == {"r": 10, "s": 16, **functions}
+        assert not visitor._call_stack
+
+
+def test_statement_semantics():
+    # without optimizations, so that nothing is pruned or folded away
+    input = """
+        a = 1; b = 0; c = 0;
+        if (a) { b = 2; } else { b = 3; }
+        if (a - 1) { c = 2; } else { c = 3; }
+        r = 0; s = 0; t = 0; u = 0;
+        function f(x) { if (x) { return 1; } s = 5; return 2; }
+        function g(x) { if (x) { u = 1; } else { u = 2; } }
+        function main() { r = f(1); s = f(0); t = g(0); }
+    """
+    visitor = ASTVisitor(ASTParser(Lexer(input).get_tokens()).program())
+    visitor.visit_Program()
+    globals = {k: v for k, v in visitor.globals.items() if k not in ("f", "g")}
+    # global statements run, else blocks run, a return inside an if returns from
+    # the function and a function without a return gives None
+    assert globals == {"a": 1, "b": 2, "c": 3, "r": 1, "s": 2, "t": None, "u": 2}
+    assert not visitor._call_stack
+
+    # frames are popped when a statement raises
+    input = """
+        function f(x) { if (x) { return x + "s"; } return 0; }
+        function main() { a = f(1); }
+    """
+    visitor = ASTVisitor(ASTParser(Lexer(input).get_tokens()).program())
+    with raises(TypeError):
+        visitor.visit_Program()
+    assert not visitor._call_stack
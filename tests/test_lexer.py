@@ -1,6 +1,7 @@
+from io import StringIO
 from pytest import raises
 from interpreter.tokenizer import Token, TokenTypes as TT
-from interpreter.lexer import Lexer
+from interpreter.lexer import Lexer, MappedLexer
 from interpreter.exceptions import UnknownSymbolError
 
 
@@ -139,3 +140,78 @@ def test_get_tokens():
         Token(TT.ID, "functiona"),
         Token(TT.EOF),
     ]
+
+
+def test_get_tokens_fallback():
+    input = "é2 = 42;\tifé = \"abc\" == b2"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    assert tokens == [
+        Token(TT.ID, "é2"),
+        Token(TT.ASSIGN),
+        Token(TT.INTEGER, 42),
+        Token(TT.SEMI),
+        Token(TT.ID, "ifé"),
+        Token(TT.ASSIGN),
+        Token(TT.STRING, "abc"),
+        Token(TT.EQ),
+        Token(TT.ID, "b2"),
+        Token(TT.EOF),
+    ]
+
+    input = "a = 42 @ b"
+    lexer = Lexer(input)
+    with raises(UnknownSymbolError) as e:
+        lexer.get_tokens()
+    assert e.value.symbol == {"@"}
+
+    input = 'a = "abc'
+    lexer = Lexer(input)
+    with raises(IndexError):
+        lexer.get_tokens()
+
+
+def test_get_tokens_matches_get_next_token():
+    input = "function f(a) {\n\treturn a <= 3 * (2-a) ; } \"s t r\" [x] >= y"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+
+    lexer = Lexer(input)
+    expected = []
+    lexer._skip_spaces()
+    curr_token = lexer._get_next_token()
+    while curr_token.type != TT.EOF:
+        expected.append(curr_token)
+        lexer._skip_spaces()
+        curr_token = lexer._get_next_token()
+    assert tokens == expected + [Token(TT.EOF)]
+
+
+def test_iter_tokens():
+    input = 'function main() {\n\tabcdefgh = "a long string" ; b <= 42 == c; }\n'
+    tokens = Lexer(input).get_tokens()
+    assert list(Lexer(input).iter_tokens()) == tokens
+    for chunk_size in range(1, 12):
+        lexer = Lexer()
+        assert list(lexer.iter_tokens(StringIO(input), chunk_size)) == tokens
+
+    lexer = Lexer()
+    with raises(UnknownSymbolError) as e:
+        list(lexer.iter_tokens(StringIO("a = b @c d"), 3))
+    assert e.value.symbol == {"@c"}
+
+
+def test_mapped_lexer(tmp_path):
+    input = 'function main() {\n\tabc = "a string é" ; b2 <= 42 == ifé; }\n'
+    path = tmp_path / "input.txt"
+    path.write_bytes(input.encode())
+    with MappedLexer(path) as lexer:
+        tokens = lexer.get_tokens()
+        assert tokens[1]._source is not None
+        assert tokens == Lexer(input).get_tokens()
+        assert tokens[1]._source is None
+        assert tokens[8].value == "a string é"
+
+    path.write_bytes(b"")
+    with MappedLexer(path) as lexer:
+        assert lexer.get_tokens() == [Token(TT.EOF)]
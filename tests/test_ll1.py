@@ -0,0 +1,80 @@
+from pytest import raises
+from interpreter.lexer import Lexer
+from interpreter.tokenizer import Token as Token, TokenTypes as TT
+from interpreter.parser import ASTParser
+from interpreter.ll1 import GRAMMAR_PATH, TABLE_PATH, Grammar, LL1Parser, generate_table
+from interpreter.ast import IfCondition, UnaryOp, Num
+from interpreter.exceptions import GrammarError, ParserError
+
+
+def test_table_up_to_date():
+    grammar = Grammar(GRAMMAR_PATH.read_text())
+    assert generate_table(grammar) == TABLE_PATH.read_text()
+
+
+def test_grammar_errors():
+    with raises(GrammarError):
+        Grammar("a: b")
+    with raises(GrammarError):
+        Grammar('a: "while" ID')
+    with raises(GrammarError):
+        Grammar("a: (ID | INTEGER")
+    with raises(GrammarError):
+        Grammar("a: ID SEMI | ID COMMA").table()
+    with raises(GrammarError):
+        Grammar("a: b | empty\nb: empty").table()
+
+    grammar = Grammar("a: (ID COMMA)* SEMI {list}")
+    assert grammar.rules == ["a", "a_1", "a_2"]
+    assert grammar.productions[-1] == ("a", ("a_2", "SEMI"), "list")
+
+
+def test_same_ast():
+    input = """
+        a = 3; z = "s";
+        function f(a, b,) { return -a * (b + 2) - f(a, 1,) / 3 < +a; }
+        b = 1;
+        function main() {
+            if (a >= 2 == 1) { f(a, 2); } else { a = g(); }
+            if (a) { return 1 - - 1; }
+        }
+    """
+    tokens = Lexer(input).get_tokens()
+    expected = ASTParser(tokens).program()
+    parser = LL1Parser(tokens)
+    assert str(parser.program()) == str(expected)
+    assert parser.current_token == Token(TT.EOF)
+
+    tokens = Lexer("1 + 2 * 3 < 4;").get_tokens()
+    parser = LL1Parser(tokens)
+    assert parser.expr() == ASTParser(tokens).expr()
+    assert parser.current_token == Token(TT.SEMI)
+
+
+def test_deep_nesting():
+    depth = 5000
+    input = "function main() {" + "if (a) {" * depth + "a = 1;" + "}" * depth + "}"
+    tokens = Lexer(input).get_tokens()
+    node = LL1Parser(tokens).program().functions[0]
+    for _ in range(depth):
+        node = node.statements[0]
+        assert type(node) is IfCondition
+
+    input = "-" * depth + "1"
+    node = LL1Parser(Lexer(input).get_tokens()).expr()
+    for _ in range(depth):
+        assert type(node) is UnaryOp
+        node = node.expr
+    assert node == Num(Token(TT.INTEGER, 1))
+
+
+def test_errors():
+    input = "function main() {\n\n  a = 2 +;\n}"
+    tokens = Lexer(input).get_tokens()
+    with raises(ParserError) as e:
+        LL1Parser(tokens).program()
+    assert e.value.message.endswith("(line 3)")
+
+    tokens = Lexer("function main( { }").get_tokens()
+    with raises(ParserError):
+        LL1Parser(tokens).program()
@@ -0,0 +1,490 @@
+import contextlib
+import io
+import random
+from pytest import raises
+from interpreter.tokenizer import Token as Token, TokenTypes as TT
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter import ast
+from interpreter.ast import Num, String, Var, BinOp, UnaryOp
+from interpreter.exceptions import InterpreterError
+from interpreter.interpreter import ASTVisitor, FunctionFrame
+from interpreter.optimizer import (
+    ConstantFolder,
+    DeadCodeEliminator,
+    CommonSubexpressionEliminator,
+    Inliner,
+    Specializer,
+    ConstantPropagator,
+    SSAFunction,
+    Optimizer,
+    call_graph,
+    strongly_connected,
+)
+
+
+def parse_expr(input):
+    return ASTParser(Lexer(input).get_tokens()).expr()
+
+
+def fold(input, simplify=False):
+    folder = ConstantFolder(simplify)
+    return folder.transform(parse_expr(input)), folder.removed
+
+
+def test_folding():
+    assert fold("2 * 3 + 4") == (Num(Token(TT.INTEGER, 10)), 4)
+    assert fold('"a" + "b" * 2') == (String(Token(TT.STRING, "abb")), 4)
+    assert fold("7 / 2")[0].value == 3.5
+    assert fold("-(1 < 2)")[0].value == -1
+    node, removed = fold("x + (2 - 3)")
+    assert node.right == Num(Token(TT.INTEGER, -1)) and removed == 2
+
+    # left to raise at run time
+    for input in ("1 / 0", '"a" - 1', '-"a"', '"a" < 1', '"a" * 100000'):
+        assert fold(input) == (parse_expr(input), 0)
+
+
+def test_simplify():
+    for input, output in (
+        ("(x - 1) * 1", "x - 1"),
+        ("1 * (2 - 1) * -x", "-x"),
+        ('"a" * 1', '"a"'),
+        ("(x < y) + 0", "x < y"),
+        ("0 + (x < 1) * 2", "(x < 1) * 2"),
+        ("--x", "--x"),
+        ("---x", "-x"),
+        ("-(-(x - 1))", "x - 1"),
+        ("+(x / 2)", "x / 2"),
+        # x may be a string, None or undefined
+        ("x * 1", "x * 1"),
+        ("x + 0", "x + 0"),
+        ("x * 0", "x * 0"),
+        ("(x / 2) + 0", "(x / 2) + 0"),
+        ("(x - 1) + 0", "(x - 1) + 0"),
+    ):
+        assert fold(input, simplify=True)[0] == parse_expr(output), input
+    assert fold("x + 0", simplify=False)[0] == parse_expr("x + 0")
+    assert fold("--x * 1", simplify=True)[1] == 2
+    assert fold("--x * 1", simplify=True)[0] == parse_expr("--x")
+    # the error names the operator of the source
+    for input in ("--x", "---x"):
+        error = evaluate(fold(input, simplify=True)[0], {"x": "s"})
+        assert error == evaluate(parse_expr(input), {"x": "s"})
+        assert error[0] is TypeError and "unary -" in error[1]
+
+
+def evaluate(node, scope):
+    visitor = ASTVisitor()
+    visitor._call_stack.append(FunctionFrame(None))
+    visitor.scope.update(scope)
+    try:
+        return visitor.visit(node)
+    except Exception as e:
+        # the message too, it names the operator that raised
+        return type(e), str(e)
+
+
+def random_expr(depth):
+    if depth == 0 or random.random() < 0.2:
+        return random.choice(["0", "1", "2", "x", "s", '"a"', '""'])
+    if random.random() < 0.2:
+        return random.choice("+-") + random_expr(depth - 1)
+    op = random.choice(["+", "-", "*", "/", "==", "<", ">="])
+    return f"({random_expr(depth - 1)} {op} {random_expr(depth - 1)})"
+
+
+def test_same_values():
+    random.seed(19)
+    for _ in range(500):
+        input = random_expr(4)
+        for scope in ({"x": 3, "s": "z"}, {"x": -2.5, "s": 0}, {"x": "s", "s": 0}, {}):
+            expected = evaluate(parse_expr(input), scope)
+            for simplify in (False, True):
+                value = evaluate(fold(input, simplify)[0], scope)
+                assert value == expected and type(value) is type(expected), input
+
+
+def parse_function(input):
+    return ASTParser(Lexer(input).get_tokens()).function()
+
+
+def eliminate(input):
+    eliminator = DeadCodeEliminator()
+    return eliminator.transform(parse_function(input)), eliminator.removed
+
+
+def test_dead_code():
+    for input, output, removed in (
+        (
+            "function f() { a = 1; return a; a = 2; f(); }",
+            "function f() { a = 1; return a; }",
+            5,
+        ),
+        (
+            "function f() { if (a) { return 1; b = 2; } else { } c = 3; }",
+            "function f() { if (a) { return 1; } c = 3; }",
+            7,
+        ),
+        (
+            "function f() { if (a) { return 1; } else { return 2; } c = 3; }",
+            "function f() { if (a) { return 1; } else { return 2; } }",
+            6,
+        ),
+        (
+            "function f() { if (1) { a = 1; return a; } b = 2; }",
+            "function f() { a = 1; return a; }",
+            7,
+        ),
+        (
+            'function f() { if ("") { a = 1; } else { b = 2; } if (0) { c = 3; } }',
+            "function f() { b = 2; }",
+            15,
+        ),
+        (
+            "function f() { if (a) { if (0) { b = 1; } } }",
+            "function f() { if (a) { } }",
+            8,
+        ),
+    ):
+        node, count = eliminate(input)
+        expected = parse_function(output)
+        assert node.statements == DeadCodeEliminator().transform(expected).statements
+        assert count == removed, input
+
+
+def test_common_subexpressions():
+    input = """
+        function f(a, c) {
+            b = a * a + 1; c = a * a + 2; d = a * a + 1;
+            a = 3; e = a * a;
+            if (a * a) { g = a * a - c; h = a * a - c; }
+            return a * a + 1;
+        }
+    """
+    eliminator = CommonSubexpressionEliminator()
+    node = eliminator.transform(parse_function(input))
+    output = """
+        function f(a, c) {
+            _t2 = a * a; _t1 = _t2 + 1; b = _t1; c = _t2 + 2; d = _t1;
+            a = 3; _t3 = a * a; e = _t3;
+            if (_t3) { _t0 = a * a - c; g = _t0; h = _t0; }
+            return a * a + 1;
+        }
+    """
+    # temporaries are named so that no source can write them
+    expected = parse_function(output.replace("_t", "t"))
+    assert str(node) == str(expected).replace("ID, t", "ID, _t")
+    assert eliminator.eliminated == 4
+
+    # a call may assign a global the operator reads
+    input = "function f(a) { b = a * k; c = g(a); d = a * k; }"
+    assert eliminate_common(input) == parse_function(input)
+    input = "function f(a) { b = a * a; a = 2; d = a * a; }"
+    assert eliminate_common(input) == parse_function(input)
+
+    # hoisted only if it is the first thing of its statement that may raise
+    input = """
+        function main() { a = 0; b = 0; y = 1 / b + (a + "s") * 2; z = (a + "s") * 2; }
+    """
+    assert eliminate_common(input) == parse_function(input)
+    for opt_level in (0, 2):
+        program = ASTParser(Lexer(input).get_tokens()).program()
+        with raises(ZeroDivisionError):
+            ASTVisitor(program, opt_level).visit_Program()
+    input = "function f(a) { y = a * (a + 1); z = 1 + a * (a + 1); }"
+    output = "function f(a) { t0 = a * (a + 1); y = t0; z = 1 + t0; }"
+    assert str(eliminate_common(input)) == str(parse_function(output)).replace(
+        "ID, t", "ID, _t"
+    )
+
+    # only in functions, the temporaries of global code would be globals
+    input = """
+        x = 3; if (x < 5) { y = x * x + 1; z = x * x + 1; }
+        function main() { }
+    """
+    visitor = ASTVisitor(ASTParser(Lexer(input).get_tokens()).program(), opt_level=2)
+    visitor.visit_Program()
+    assert visitor.globals == {"x": 3, "y": 10, "z": 10}
+
+
+def test_common_subexpressions_hashing(monkeypatch):
+    # each node is hashed once, not its whole subtree on each lookup
+    input = "function f(a) { b = (a + 1) * (a + 2); c = (a + 1) * (a + 2); }"
+    expected = eliminate_common(input)
+
+    def fail(node):
+        raise AssertionError("structural hash of a subtree")
+
+    monkeypatch.setattr(ast, "structural_hash", fail)
+    assert eliminate_common(input) == expected
+
+
+def eliminate_common(input):
+    return CommonSubexpressionEliminator().transform(parse_function(input))
+
+
+def test_call_graph():
+    input = """
+        function f(a) { b = g(a) + h(a); return g(b); }
+        function g(a) { if (a) { return f(a); } }
+        function h(a) { return h(a); }
+        function main() { c = h(1); d = f(2); }
+    """
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    graph = call_graph(program)
+    assert graph == {"f": ["g", "h"], "g": ["f"], "h": ["h"], "main": ["h", "f"]}
+    components = [sorted(component) for component in strongly_connected(graph)]
+    assert components == [["h"], ["f", "g"], ["main"]]
+
+
+def inline(input, **kwargs):
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    inliner = Inliner(**kwargs)
+    return inliner.transform(program), inliner.inlined
+
+
+def test_inliner():
+    program, inlined = inline("""
+        k = 1;
+        function sq(a) { b = a * a; return b; }
+        function f(a, c) { return sq(a) + sq(c) + k; }
+        function main() { d = f(2, k); sq(3); }
+    """)
+    output = """
+        function main() {
+            fa = 2; fc = k;
+            sqa = fa; sqb = sqa * sqa;
+            d = sqb + sq(fc) + k;
+            sq3a = 3; sq3b = sq3a * sq3a; sq3 = sq3b;
+        }
+    """
+    # sq was inlined in f before f in main, not for sq(c): the statements of
+    # sq would run before sqb, a local of the inlined sq, is read
+    names = (("fa", "_f_1_a"), ("fc", "_f_1_c"), ("sqa", "_f_1__sq_0_a"))
+    names += (("sqb", "_f_1__sq_0_b"),)
+    names += (("sq3a", "_sq_2_a"), ("sq3b", "_sq_2_b"), ("sq3", "_sq_2_"))
+    expected = str(parse_function(output).statements[:-1])
+    for name, renamed in names:
+        expected = expected.replace(f"ID, {name})", f"ID, {renamed})")
+    assert str(program.functions[2].statements[:-1]) == expected
+    assert inlined == 3
+
+    for input in (
+        # recursive
+        "function f(a) { return f(a); } function main() { b = f(1); }",
+        "function f(a) { return g(a); } function g(a) { return f(a); }"
+        "function main() { b = f(1); }",
+        # assigns a global, returns early
+        "k = 1; function f(a) { k = a; return 1; } function main() { b = f(1); }",
+        "function f(a) { if (a) { return 1; } return 2; }"
+        "function main() { b = f(1); }",
+        # no value to use, not enough arguments
+        "function f(a) { b = a; } function main() { b = f(1); }",
+        "function f(a) { return a; } function main() { b = f(); }",
+        # k is a local of main, a global read by f
+        "k = 1; function f(a) { return a + k; } function main() { k = 2; b = f(1); }",
+        # f may change k, read before it is called
+        "k = 1; function g() { k = 2; } function f(a) { g(); return a; }"
+        "function main() { b = k + f(1); }",
+        # what is evaluated before the call may raise
+        "function f(a) { return a; } function main() { b = 1 / 0 + f(1); }",
+    ):
+        program, inlined = inline(input)
+        assert inlined == 0, input
+        assert program == ASTParser(Lexer(input).get_tokens()).program()
+
+    input = """
+        function f(a) { b = a + 1; return b; }
+        function main() { c = f(1); d = f(2); e = f(3); }
+    """
+    assert inline(input, max_size=5)[1] == 0
+    assert inline(input, max_size=6)[1] == 3
+    assert inline(input, max_caller_size=30)[1] == 2
+
+    # the output and errors are the same as without inlining
+    for input in (
+        "function f(a) { return 1 / a; } function g() { print(5); return 1; }"
+        "function main() { z = 0; y = f(z) + g(); }",
+        "function g() { print(7); return 1; } function f(a) { return a + g(); }"
+        'function main() { z = 0; y = -"s" + f(z); }',
+    ):
+        outputs = []
+        for opt_level in (0, 2):
+            program = ASTParser(Lexer(input).get_tokens()).program()
+            output = io.StringIO()
+            with raises((ZeroDivisionError, TypeError)) as error:
+                with contextlib.redirect_stdout(output):
+                    ASTVisitor(program, opt_level).visit_Program()
+            outputs.append((output.getvalue(), error.type))
+        assert outputs[0] == outputs[1] == ("", outputs[0][1]), input
+
+    # errors name the variables of the source
+    input = """
+        function g(c) { if (c) { v = 1; } return v; }
+        function main() { a = g(0); }
+    """
+    for opt_level in (0, 1, 2):
+        program = ASTParser(Lexer(input).get_tokens()).program()
+        with raises(InterpreterError, match="^no such variable v$"):
+            ASTVisitor(program, opt_level).visit_Program()
+
+
+def specialize(input, **kwargs):
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    specializer = Specializer(**kwargs)
+    return specializer.transform(program), specializer.specialized
+
+
+def test_specializer():
+    program, specialized = specialize("""
+        function f(a, m) { if (m == 1) { r = a * 2; } else { r = a + 100; } return r; }
+        function main() { x = f(5, 1); y = f(x, 1); z = f(x, 2); w = f(x, 1); }
+    """)
+    assert specialized == 4
+    main, f0, f1, f2 = program.functions[1:]
+    calls = [stmt.right for stmt in main.statements[:4]]
+    assert [call.name for call in calls] == ["f_0", "f_1", "f_2", "f_1"]
+    assert [len(call.args) for call in calls] == [0, 1, 1, 1]
+    assert (f0.name, f0.args) == ("f_0", [])
+    assert f0.statements == parse_function(
+        "function f() { if (1) { r = 10; } else { r = 105; } return r; }"
+    ).statements
+    assert f2.statements == parse_function(
+        "function f(a) { if (0) { r = a * 2; } else { r = a + 100; } return r; }"
+    ).statements
+
+    # what a branch that falls through assigns is propagated
+    program, specialized = specialize("""
+        function f(a) { if (a < 2) { return 1; } else { b = a * 2; } return b + a; }
+        function main() { c = f(3); }
+    """)
+    assert program.functions[2].statements[-2] == parse_function(
+        "function f() { return 9; }"
+    ).statements[0]
+
+    for input in (
+        # a may still be 1 after the if, k = 2 assigns the global
+        "k = 1; function f(a) { if (k) { a = 2; } return a; }"
+        "function main() { b = f(1); }",
+        "k = 1; function f(k) { k = 2; return k; } function main() { b = f(1); }",
+    ):
+        program, specialized = specialize(input)
+        assert specialized == 1 and len(program.functions[2].args) == 1, input
+    for input in (
+        # f is assigned, not enough arguments, nothing constant
+        "f = 1; function f(a) { return a; } function main() { b = f(1); }",
+        "function f(a) { return a; } function main() { b = f(); }",
+        "function f(a) { return a; } function main() { b = f(b); }",
+    ):
+        program, specialized = specialize(input)
+        assert specialized == 0 and len(program.functions) == 2, input
+
+    input = """
+        b = 0;
+        function f(n) { if (n < 1) { return 0; } m = n - 1; return f(m) + n; }
+        function main() { b = f(20); }
+    """
+    # f(20) -> f_0, its call f(19) -> f_1 and so on
+    program, specialized = specialize(input, max_clones=4)
+    assert specialized == 4 and len(program.functions) == 6
+    assert specialize(input, max_size=10)[1] == 0
+    for opt_level in (0, 2):
+        visitor = ASTVisitor(ASTParser(Lexer(input).get_tokens()).program(), opt_level)
+        visitor.visit_Program()
+        assert visitor.globals["b"] == 210
+
+
+def propagate(input):
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    propagator = ConstantPropagator()
+    return propagator.transform(program), propagator.removed
+
+
+def test_ssa_function():
+    function = parse_function("""
+        function f(x) {
+            a = 1; b = a;
+            if (x) { a = 2; } else { c = 3; }
+            if (1) { d = a; } else { d = b; }
+            return b + c;
+        }
+    """)
+    ssa = SSAFunction(function, {"k"})
+    a1, b, a2, c, d = ssa.definitions.values()
+    assert (a1.value, b.value, b.copy_of) == (Num(Token(TT.INTEGER, 1)), a1.value, a1)
+    # a is 1 or 2, c may not be defined, the else branch of the second if is
+    # never run
+    a_phi, c_phi = sorted(ssa.phis, key=lambda phi: phi.name)
+    assert a_phi.operands == [a2, a1] and a_phi.value is None and a_phi.defined
+    assert c_phi.operands == [None, c] and not c_phi.defined
+    assert d.copy_of is a_phi
+    x = ssa.uses[1].definition
+    assert (x.name, x.assign) == ("x", None)
+    assert [use.definition for use in ssa.uses] == [a1, x, a_phi, b, c_phi]
+
+
+def test_constant_propagation():
+    program, removed = propagate("""
+        k = 1;
+        function f(x, y) {
+            a = 3; b = a + 4; c = b * 2; d = x;
+            if (y) { e = d + c; } else { e = x - 1; c = 14; }
+            q = e;
+            return q + c + d + k;
+        }
+        function main() { r = f(k, 1); }
+    """)
+    assert program.functions[0].statements == eliminate("""
+        function f(x, y) {
+            if (y) { e = x + 14; } else { e = x - 1; }
+            return e + 14 + x + k;
+        }
+    """)[0].statements
+    # a, b, c, d, c = 14 and q with their values, 4 folded in b and c and the
+    # NoOps ending the blocks of f and main
+    assert removed == 3 * 6 + 4 + 4
+
+    for input, output in (
+        # a may not be set, k is a global
+        ("function f(x) { if (x) { a = 1; } return a; }", None),
+        ("k = 1; function f(x) { k = 2; return k; }", None),
+        # x is assigned after c copies it, nothing reads the 2
+        ("function f(x) { c = x; x = 2; return c; }", "{ c = x; return c; }"),
+        ("function f(x) { b = x; c = b; b = 2; return c + b; }", "{ return x + 2; }"),
+    ):
+        program, removed = propagate(input + "function main() { }")
+        output = "function f(x) " + output if output else input[input.index("f"):]
+        expected = eliminate(output)[0].statements
+        assert program.functions[0].statements == expected, input
+
+
+def test_optimizer():
+    input = """
+        a = 2 * 3;
+        function f(b) { return -(b - (4 - 3)); }
+        function main() { c = f(a) + 0; d = --c; }
+    """
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    visitor = ASTVisitor(program, opt_level=1)
+    visitor.visit_Program()
+    # 4 folded, and the NoOps ending f and main
+    assert visitor.optimizer.removed == 6
+    assert program.statements[0].right == Num(Token(TT.INTEGER, 6))
+    assert program.functions[0].statements[0].return_val == parse_expr("-(b - 1)")
+    assert visitor.globals["a"] == 6
+
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    visitor = ASTVisitor(program, opt_level=2)
+    visitor.visit_Program()
+    main = program.functions[1]
+    assert str(main.statements) == str(parse_function(
+        "function main() { fb = a; c = -(fb - 1) + 0; d = --c; }"
+    ).statements[:3]).replace("ID, fb", "ID, _f_0_b")
+    # the same, 4 - 3 folded in the inlined copy, 7 nodes inlined
+    assert visitor.optimizer.removed == 6 + 2 - 7
+
+    lazy = ASTParser(Lexer(input).get_tokens(), lazy=True).program()
+    assert Optimizer(0).optimize(lazy) is lazy and not lazy.functions[0].parsed
+    with raises(ValueError):
+        Optimizer(3)
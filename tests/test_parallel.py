@@ -0,0 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+from pytest import raises
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser, without_eols
+from interpreter.tokenizer import TokenTypes as TT
+from interpreter.parallel import (
+    lex_parallel,
+    split_source,
+    split_functions,
+    parse_parallel,
+)
+from interpreter.exceptions import UnknownSymbolError, ParserError
+
+
+input = """function f(a, b) {
+    x = a * 42 + b; s = "a string
+spanning lines";
+    if (x <= b) { return x; }
+}
+"""
+
+
+def test_split_source():
+    buffer = input * 10
+    bounds = split_source(buffer, 8)
+    assert bounds[0] == 0 and bounds[-1] == len(buffer)
+    assert bounds == sorted(set(bounds))
+    for bound in bounds[1:-1]:
+        assert buffer[bound - 1] == "\n"
+        assert buffer.count('"', 0, bound) % 2 == 0
+
+
+def test_lex_parallel():
+    buffer = input * 50
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        tokens = lex_parallel(buffer, executor, workers=4, min_chunk_size=100)
+    assert tokens == Lexer(buffer).get_tokens()
+
+    assert lex_parallel(input, workers=4) == Lexer(input).get_tokens()
+
+
+def test_lex_parallel_errors():
+    buffer = input * 20 + "a = @b;\n" + input * 20 + "@c"
+    with raises(UnknownSymbolError) as e:
+        lex_parallel(buffer, workers=4, min_chunk_size=100)
+    assert e.value.symbol == {"@b;"}
+
+
+def test_split_functions():
+    tokens = without_eols(Lexer("a = 1;\n" + input * 10).get_tokens())
+    bounds = split_functions(tokens, 4)
+    assert len(bounds) == 5
+    assert bounds[0] == 0 and bounds[-1] == len(tokens)
+    for bound in bounds[1:-1]:
+        assert tokens[bound].type == TT.FUNCTION
+
+
+def test_parse_parallel():
+    buffer = "a = 1; b = 2;\n" + input * 20 + "function main() { a = 3; }\n"
+    tokens = Lexer(buffer).get_tokens()
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        program = parse_parallel(tokens, executor, workers=4, min_chunk_tokens=50)
+    assert str(program) == str(ASTParser(tokens).program())
+    assert len(program.functions) == 21 and len(program.statements) == 3
+
+    tokens = Lexer(buffer).get_token_buffer()
+    program = parse_parallel(tokens, workers=4, min_chunk_tokens=50)
+    assert str(program) == str(ASTParser(tokens).program())
+
+
+def test_parse_parallel_errors():
+    buffer = input * 10 + "function g() { a = 2 +; }\n" + input * 10 + "function h( {"
+    tokens = Lexer(buffer).get_tokens()
+    with raises(ParserError) as e:
+        parse_parallel(tokens, workers=4, min_chunk_tokens=50)
+    with raises(ParserError) as expected:
+        ASTParser(tokens).program()
+    assert e.value.message == expected.value.message
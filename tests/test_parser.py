@@ -1,8 +1,9 @@
 from pytest import raises
 from interpreter.lexer import Lexer
 from interpreter.tokenizer import Token as Token, TokenTypes as TT
-from interpreter.parser import ASTParser
-from interpreter.ast import BinOp, Num, Assign, Var, UnaryOp
+from io import StringIO
+from interpreter.parser import ASTParser, TokenStream, LazyFunction
+from interpreter.ast import BinOp, Num, Assign, Var, UnaryOp, Function, NoOp
 from interpreter.exceptions import ParserError
 
 
@@ -244,3 +245,149 @@ def test_conditions():
     print(tokens)
     parser = ASTParser(tokens)
     node = parser.statement()
+
+
+def test_comparisons():
+    input = "1 + 2 < 3 * 4 == a"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens)
+    node = parser.expr()
+    assert node == BinOp(
+        Token(TT.EQ),
+        BinOp(
+            Token(TT.LT),
+            BinOp(Token(TT.PLUS), Num(Token(TT.INTEGER, 1)), Num(Token(TT.INTEGER, 2))),
+            BinOp(Token(TT.MUL), Num(Token(TT.INTEGER, 3)), Num(Token(TT.INTEGER, 4))),
+        ),
+        Var(Token(TT.ID, "a")),
+    )
+
+    input = "a - (b >= -c) / 2"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens)
+    node = parser.expr()
+    assert node == BinOp(
+        Token(TT.MINUS),
+        Var(Token(TT.ID, "a")),
+        BinOp(
+            Token(TT.DIV),
+            BinOp(
+                Token(TT.GE),
+                Var(Token(TT.ID, "b")),
+                UnaryOp(Token(TT.MINUS), Var(Token(TT.ID, "c"))),
+            ),
+            Num(Token(TT.INTEGER, 2)),
+        ),
+    )
+
+    input = "a <= 2 + 3"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens)
+    node = parser.arithmetic()
+    assert node == Var(Token(TT.ID, "a"))
+    assert parser.current_token == Token(TT.LE)
+
+
+def test_deep_expressions():
+    depth = 5000
+    input = "(" * depth + "-" * depth + "1" + ")" * depth + "+ 2" * depth
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens)
+    node = parser.expr()
+    assert type(node) is BinOp and node.right == Num(Token(TT.INTEGER, 2))
+    assert parser.current_token == Token(TT.EOF)
+
+    input = "((1 + 2)"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens)
+    with raises(ParserError):
+        parser.expr()
+
+
+def test_eols_dropped():
+    input = "function\nmain\n(a,b,c)\n{\n\ta\n=\n2\n*\n(b\n+\n1)\n;\n}\n"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens)
+    node = parser.function()
+    compact = ASTParser(Lexer(input.replace("\n", " ")).get_tokens()).function()
+    assert str(node) == str(compact)
+
+    buffer = Lexer(input).get_token_buffer()
+    assert str(ASTParser(buffer).function()) == str(compact)
+
+    input = "function main() {\n\n  a = 2 +;\n}"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    parser = ASTParser(tokens)
+    with raises(ParserError) as e:
+        parser.program()
+    assert e.value.message.endswith("(line 3)")
+
+
+def test_iter_program():
+    input = """
+        a = 3; z = 42;
+        function f(a) { return a; }
+        function main() { a = f(1); }
+    """
+    lexer = Lexer(input)
+    tokens = TokenStream(lexer.iter_tokens(StringIO(input), chunk_size=8))
+    parser = ASTParser(tokens)
+    nodes = parser.iter_program()
+    assert type(next(nodes)) is Assign
+    assert type(next(nodes)) is Assign
+    assert type(next(nodes)) is NoOp
+    f = next(nodes)
+    assert type(f) is Function and f.id.value == "f"
+    # the tokens of the statements and of f are released
+    assert len(tokens._window) < 8
+    with raises(IndexError):
+        tokens[0]
+    main = next(nodes)
+    assert type(main) is Function and main.id.value == "main"
+    assert next(nodes, None) is None
+
+    compact = ASTParser(Lexer(input).get_tokens()).program()
+    streamed = ASTParser(TokenStream(Lexer(input).iter_tokens())).program()
+    assert str(streamed) == str(compact)
+
+    input = "function main() {\n\n  a = 2 +;\n}"
+    parser = ASTParser(TokenStream(Lexer(input).iter_tokens()))
+    with raises(ParserError) as e:
+        parser.program()
+    assert e.value.message.endswith("(line 3)")
+
+
+def test_lazy_functions():
+    input = """
+        function f(a) { if (a) { return 1; } return 2; }
+        function g() { a = 2 +; }
+        function main() { a = f(1); }
+    """
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    eager = ASTParser(tokens).function()
+    parser = ASTParser(tokens, lazy=True)
+    f, g, main = parser.program().functions
+    assert type(f) is LazyFunction and not f.parsed
+    assert [arg.value for arg in f.args] == ["a"]
+    assert str(f.statements) == str(eager.statements) and f.parsed
+    with raises(ParserError) as e:
+        g.statements
+    assert e.value.message.endswith("(in function g)")
+
+    buffer = Lexer(input).get_token_buffer()
+    f = ASTParser(buffer, lazy=True).function()
+    assert str(f.statements) == str(eager.statements)
+
+    input = "function main() { if (a) { b = 1; }"
+    lexer = Lexer(input)
+    tokens = lexer.get_tokens()
+    with raises(ParserError):
+        ASTParser(tokens, lazy=True).program()
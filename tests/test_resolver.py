@@ -0,0 +1,99 @@
+from pytest import raises
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter.ast import Var
+from interpreter.exceptions import InterpreterError
+from interpreter.interpreter import ASTVisitor
+from interpreter.resolver import GLOBAL, ScopeResolver
+from interpreter.visitor import NodeVisitor
+
+
+def parse_function(input):
+    return ASTParser(Lexer(input).get_tokens()).function()
+
+
+class Slots(NodeVisitor):
+    def __init__(self):
+        self.slots = []
+
+    def visit_Var(self, node):
+        self.slots.append((node.value, node.slot))
+
+
+def slots(function):
+    visitor = Slots()
+    visitor.walk(function)
+    return visitor.slots
+
+
+def test_resolve():
+    function = parse_function("""
+        function f(a, k) {
+            if (a) { b = k; } else { k = a + g; }
+            c = b + k;
+            return c;
+        }
+    """)
+    ScopeResolver({"k", "g"}).resolve(function)
+    assert function.locals == {"a": 0, "k": 1, "b": 2, "c": 3}
+    # k is read from the parameter and assigned to the global
+    assert slots(function) == [
+        ("a", 0), ("k", 1), ("a", 0), ("b", 2), ("k", 1), ("k", GLOBAL),
+        ("a", 0), ("g", GLOBAL), ("c", 3), ("b", 2), ("k", 1), ("c", 3),
+    ]
+
+    # main() gets no arguments, reading c before it is set raises at run time
+    function = parse_function("function main(a, g) { b = a + g + c; c = b; }")
+    assert ScopeResolver({"g"}).unknown(function, bound=False) == ["a"]
+    assert ScopeResolver({"g", "a"}).unknown(function, bound=False) == []
+    ScopeResolver({"g"}).resolve(function, bound=False)
+    assert function.locals == {"b": 0, "c": 1, "a": 2}
+    assert slots(function) == [
+        ("a", None), ("g", None),
+        ("b", 0), ("a", 2), ("g", GLOBAL), ("c", 1), ("c", 1), ("b", 0),
+    ]
+
+
+def run(input, opt_level=0):
+    visitor = ASTVisitor(ASTParser(Lexer(input).get_tokens()).program(), opt_level)
+    visitor.visit_Program()
+    return visitor.globals
+
+
+def test_run():
+    globals = run("""
+        k = 1; r = 0;
+        function f(a, k) { k = a + k; return k; }
+        function main() { b = 2; if (k) { c = f(b, 3); } r = c + k; }
+    """)
+    # f returns its parameter k, it sets the global k
+    assert (globals["k"], globals["r"]) == (5, 8)
+
+    # reported before main runs, even in code that would not run
+    input = "r = 0; function main() { r = 1; if (0) { r = x; } }"
+    visitor = ASTVisitor(ASTParser(Lexer(input).get_tokens()).program())
+    with raises(InterpreterError):
+        visitor.visit_Program()
+    assert visitor.globals["r"] == 0
+    # only known once it runs
+    with raises(InterpreterError):
+        run("function main() { if (0) { a = 1; } b = a; }")
+    # not a global if the global code does not assign it
+    with raises(InterpreterError):
+        run("if (0) { x = 1; } function main() { y = x; }")
+    # known before the optimizer removes its assignment
+    for opt_level in (0, 1, 2):
+        input = "r = 0; function main() { if (r) { r = c; } return 1; c = 1; }"
+        assert run(input, opt_level)["r"] == 0
+
+    lazy = ASTParser(Lexer("""
+        r = 0;
+        function unused() { r = x; }
+        function f(a) { return a + 1; }
+        function main() { r = f(1); }
+    """).get_tokens(), lazy=True).program()
+    visitor = ASTVisitor(lazy)
+    visitor.visit_Program()
+    unused, f, main = lazy.functions
+    assert visitor.globals["r"] == 2 and f.locals == {"a": 0}
+    assert not unused.parsed
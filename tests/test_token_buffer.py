@@ -0,0 +1,81 @@
+from array import array
+from pytest import raises
+from interpreter.lexer import Lexer, MappedLexer
+from interpreter.parser import ASTParser
+from interpreter.tokenizer import Token, TokenTypes as TT
+from interpreter.token_buffer import TokenBuffer
+
+
+input = """
+    a = 3;
+    function main() { b = a + 10; print(b, 42); c = "abc"; b = 42; }
+"""
+
+
+def test_token_buffer():
+    tokens = Lexer(input).get_tokens()
+    buffer = Lexer(input).get_token_buffer()
+    assert len(buffer) == len(tokens)
+    assert list(buffer) == tokens
+    assert buffer[0] == Token(TT.EOL)
+    assert buffer.kind(len(buffer) - 1) == TT.EOF
+    assert buffer.offsets[1] == input.index("a")
+    assert buffer.offsets[-1] == len(input)
+    assert buffer.literals.count(42) == 1
+    assert buffer[5] is buffer[5]
+
+
+def test_mapped_token_buffer(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(input.encode())
+    with MappedLexer(path) as lexer:
+        buffer = lexer.get_token_buffer()
+    expected = Lexer(input).get_token_buffer()
+    assert buffer.tokens() == expected.tokens()
+    assert list(buffer.offsets) == list(expected.offsets)
+
+    # offsets count bytes
+    path.write_bytes('é = "é" ; b'.encode())
+    with MappedLexer(path) as lexer:
+        buffer = lexer.get_token_buffer()
+    assert buffer.tokens() == Lexer('é = "é" ; b').get_tokens()
+    assert list(buffer.offsets) == [0, 3, 5, 10, 12, 13]
+
+
+def test_token_buffer_from_tokens():
+    tokens = Lexer(input).get_tokens()
+    buffer = TokenBuffer.from_tokens(tokens)
+    assert buffer.tokens() == tokens
+    assert isinstance(buffer.kinds, array)
+
+    with raises(ValueError):
+        buffer.extend(tokens[:2], [])
+
+
+def test_token_buffer_slice():
+    tokens = Lexer(input).get_tokens()
+    buffer = Lexer(input).get_token_buffer()
+    view = buffer[3:9]
+    assert view.tokens() == tokens[3:9]
+    assert view.kinds.obj is buffer.kinds
+    assert list(view.offsets) == list(buffer.offsets[3:9])
+
+
+def test_token_buffer_bytes():
+    tokens = Lexer(input).get_tokens()
+    buffer = Lexer(input).get_token_buffer()
+    data = buffer.to_bytes()
+    loaded = TokenBuffer.from_bytes(data)
+    assert loaded.tokens() == tokens
+    assert list(loaded.offsets) == list(buffer.offsets)
+    assert loaded.kinds.obj is data
+    assert TokenBuffer.from_bytes(buffer[3:9].to_bytes()).tokens() == tokens[3:9]
+
+    with raises(ValueError):
+        TokenBuffer.from_bytes(b"TKB")
+
+
+def test_parser_token_buffer():
+    tokens = Lexer(input).get_tokens()
+    buffer = Lexer(input).get_token_buffer()
+    assert str(ASTParser(buffer).program()) == str(ASTParser(tokens).program())
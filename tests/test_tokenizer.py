@@ -1,5 +1,7 @@
+from io import StringIO
 from pytest import raises
-from interpreter.tokenizer import Token, TokenTypes as TT
+from interpreter.tokenizer import Token, TokenTypes as TT, valueless_tokens
+from interpreter.lexer import Lexer
 
 
 def test_token_instanciation():
@@ -117,3 +119,23 @@ def test_token_types_enum():
     for name, val in TokenTypes_dict.items():
         assert name == val[0]
         assert type(val[1]) == bool
+
+
+def test_token_trusted():
+    token = Token.trusted(TT.ID, "name")
+    assert token == Token(TT.ID, "name")
+    assert not hasattr(token, "__dict__")
+    assert Token.trusted(TT.PLUS) == Token(TT.PLUS)
+
+
+def test_lexer_shares_tokens():
+    tokens = Lexer("abc + abc + 42; 42").get_tokens()
+    assert tokens[0] is tokens[2]
+    assert tokens[1] is tokens[3] is valueless_tokens[TT.PLUS]
+    assert tokens[4] is tokens[6]
+    assert tokens[-1] is valueless_tokens[TT.EOF]
+
+    # streamed chunks don't share tokens, nothing is kept from one to the next
+    tokens = list(Lexer().iter_tokens(StringIO('a = "s";\na = "s";'), 8))
+    assert tokens[2] == tokens[7] and tokens[2] is not tokens[7]
+    assert tokens[0] is not tokens[5] and tokens[0].value is tokens[5].value
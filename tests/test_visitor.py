@@ -0,0 +1,92 @@
+from interpreter.tokenizer import Token as Token, TokenTypes as TT
+from interpreter.lexer import Lexer
+from interpreter.parser import ASTParser
+from interpreter.ast import BinOp, Num, Var, NoOp, Function, Assign
+from interpreter.visitor import NodeVisitor, NodeTransformer
+
+
+input = """
+    a = 1 + 2;
+    function f(a, b) { c = a * (b + 1); if (c < 2) { return c; } else { c = 1; } }
+    function main() { c = f(a, 2); }
+"""
+
+
+class Names(NodeVisitor):
+    def __init__(self):
+        self.names = []
+        self.left = []
+
+    def visit_Var(self, node):
+        self.names.append(node.value)
+
+    def leave_Function(self, node):
+        self.left.append(node.name)
+
+
+def test_visit():
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    visitor = Names()
+    visitor.visit(program)
+    names = ["a", "b", "c", "a", "b", "c", "c", "c", "c", "a", "a"]
+    assert visitor.names == names
+
+    walker = Names()
+    walker.walk(program)
+    assert walker.names == names
+    assert walker.left == ["f", "main"]
+
+    # lazy functions are visited by visit_Function
+    lazy = ASTParser(Lexer(input).get_tokens(), lazy=True).program()
+    visitor = Names()
+    visitor.walk(lazy)
+    assert visitor.names == names
+    leave = Names._methods[("leave_", type(lazy.functions[0]))]
+    assert leave is Names.leave_Function
+    assert ("leave_", Function) not in NodeVisitor._methods
+
+
+class Fold(NodeTransformer):
+    def leave_BinOp(self, node):
+        if type(node.left) is Num and type(node.right) is Num and node.op_type is TT.PLUS:
+            return Num(Token(TT.INTEGER, node.left.value + node.right.value))
+        return node
+
+    visit_BinOp = leave_BinOp
+
+    def leave_NoOp(self, node):
+        return None
+
+    def leave_Assign(self, node):
+        if node.left.value == "c":
+            return [node, Assign(Token(TT.ASSIGN), Var(Token(TT.ID, "d")), node.left)]
+        return node
+
+
+def test_transform():
+    depth = 5000
+    input_ = "(" * depth + "1" + "+ 2)" * depth
+    expr = ASTParser(Lexer(input_).get_tokens()).expr()
+    assert Fold().transform(expr) == Num(Token(TT.INTEGER, 2 * depth + 1))
+
+    walker = Names()
+    walker.walk(ASTParser(Lexer(input_.replace("1", "x")).get_tokens()).expr())
+    assert walker.names == ["x"]
+
+    program = ASTParser(Lexer(input).get_tokens()).program()
+    program = Fold().transform(program)
+    f, main = program.functions
+    assert program.statements[0].right == Num(Token(TT.INTEGER, 3))
+    assert NoOp() not in program.statements + main.statements
+    assert [stmt.left.value for stmt in main.statements] == ["c", "d"]
+    assert [stmt.left.value for stmt in f.statements[2].follow_else.statements] == [
+        "c",
+        "d",
+    ]
+
+    # shared nodes are transformed once
+    one = Num(Token(TT.INTEGER, 1))
+    node = BinOp(Token(TT.MUL), BinOp(Token(TT.PLUS), one, one), one)
+    node.right = node.left
+    node = Fold().transform(node)
+    assert node.left is node.right and node.left.value == 2